@@ -1,5 +1,6 @@
 from .api import _render_migration_diffs as _render_migration_diffs
 from .api import compare_metadata as compare_metadata
+from .api import compare_metadata_pair as compare_metadata_pair
 from .api import produce_migrations as produce_migrations
 from .api import render_python_code as render_python_code
 from .api import RevisionContext as RevisionContext
@@ -8,3 +9,5 @@ from .compare import comparators as comparators
 from .render import render_op_text as render_op_text
 from .render import renderers as renderers
 from .rewriter import Rewriter as Rewriter
+from .snapshot import SchemaSnapshot as SchemaSnapshot
+from .snapshot import SnapshotInspector as SnapshotInspector
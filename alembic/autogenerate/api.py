@@ -11,6 +11,7 @@ from sqlalchemy import inspect
 
 from . import compare
 from . import render
+from .snapshot import SnapshotInspector
 from .. import util
 from ..operations import ops
 from ..runtime.plugins import Plugin
@@ -199,6 +200,107 @@ def produce_migrations(
     return migration_script
 
 
+def compare_metadata_pair(
+    metadata_a: MetaData,
+    metadata_b: MetaData,
+    dialect: Dialect | str | None = None,
+    opts: dict[str, Any] | None = None,
+) -> UpgradeOps:
+    """Compare two :class:`~sqlalchemy.schema.MetaData` objects, without
+    a database, and produce the :class:`.UpgradeOps` that migrate a schema
+    created from ``metadata_a`` to that of ``metadata_b``.
+
+    E.g. to compare the models of two releases::
+
+        from alembic.autogenerate import compare_metadata_pair
+        from alembic.autogenerate import render_python_code
+
+        upgrade_ops = compare_metadata_pair(
+            release_1.metadata, release_2.metadata, dialect="postgresql"
+        )
+        print(render_python_code(upgrade_ops))
+
+    The tables of ``metadata_a`` are converted to the form in which
+    ``dialect`` would reflect them, and are then compared to ``metadata_b``
+    by the same comparison functions used by :func:`.produce_migrations`,
+    using a :class:`.SnapshotInspector` in place of a database connection.
+    Details which only a database would produce, such as the types or
+    server defaults normalized by the database, or objects created
+    implicitly along with others, aren't present, so the result may differ
+    from that of comparing ``metadata_b`` to a database created from
+    ``metadata_a``.  Requires SQLAlchemy 2.0 or greater.
+
+    :param metadata_a: a :class:`~sqlalchemy.schema.MetaData` describing
+     the existing schema.
+    :param metadata_b: a :class:`~sqlalchemy.schema.MetaData` describing
+     the target schema.
+    :param dialect: a :class:`~sqlalchemy.engine.Dialect` instance, or the
+     name of a dialect such as ``"postgresql"``; defaults to a generic
+     dialect.
+    :param opts: dictionary of autogenerate options, as accepted by
+     :meth:`.MigrationContext.configure`, e.g. ``compare_server_default``
+     or ``include_object``.  ``include_schemas`` defaults to ``True`` if
+     any table in either :class:`~sqlalchemy.schema.MetaData` specifies a
+     schema.
+
+    .. versionadded:: 1.19.2
+
+    .. seealso::
+
+        :func:`.produce_migrations`
+
+    """
+    from ..runtime.migration import MigrationContext
+    from .snapshot import SchemaSnapshot
+
+    opts = dict(opts or {})
+    opts.setdefault(
+        "include_schemas",
+        any(
+            table.schema is not None
+            for metadata in (metadata_a, metadata_b)
+            for table in metadata.tables.values()
+        ),
+    )
+
+    if isinstance(dialect, str):
+        migration_context = MigrationContext.configure(
+            dialect_name=dialect, opts=opts
+        )
+    else:
+        if dialect is None:
+            from sqlalchemy.engine.default import DefaultDialect
+
+            dialect = DefaultDialect()
+        migration_context = MigrationContext.configure(
+            dialect=dialect, opts=opts
+        )
+    assert migration_context.dialect is not None
+
+    snapshot = SchemaSnapshot.from_metadata(
+        metadata_a, migration_context.dialect
+    )
+    # schemas only present in metadata_b are compared as well, producing
+    # their tables
+    snapshot.schema_names = sorted(
+        {
+            table.schema
+            for metadata in (metadata_a, metadata_b)
+            for table in metadata.tables.values()
+            if table.schema is not None
+        }
+    )
+
+    autogen_context = AutogenContext(migration_context, metadata=metadata_b)
+    autogen_context.inspector = SnapshotInspector(
+        snapshot, migration_context.dialect
+    )
+
+    upgrade_ops = ops.UpgradeOps([])
+    compare._produce_net_changes(autogen_context, upgrade_ops)
+    return upgrade_ops
+
+
 def render_python_code(
     up_or_down_op: UpgradeOps | DowngradeOps,
     sqlalchemy_module_prefix: str = "sa.",
@@ -403,6 +505,10 @@ class AutogenContext:
     @util.memoized_property
     def inspector(self) -> Inspector:
         if self.connection is None:
+            snapshot = self.migration_context._schema_snapshot
+            if snapshot is not None:
+                assert self.dialect is not None
+                return SnapshotInspector(snapshot, self.dialect)
             raise TypeError(
                 "can't return inspector as this "
                 "AutogenContext has no database connection"
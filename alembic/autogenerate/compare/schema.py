@@ -5,13 +5,11 @@ from __future__ import annotations
 import logging
 from typing import TYPE_CHECKING
 
-from sqlalchemy import inspect
-
+from .util import _InspectorConv
+from ..snapshot import _snapshot_file_cache
 from ...util import PriorityDispatchResult
 
 if TYPE_CHECKING:
-    from sqlalchemy.engine.reflection import Inspector
-
     from ...autogenerate.api import AutogenContext
     from ...operations.ops import UpgradeOps
     from ...runtime.plugins import Plugin
@@ -23,16 +21,35 @@ log = logging.getLogger(__name__)
 def _produce_net_changes(
     autogen_context: AutogenContext, upgrade_ops: UpgradeOps
 ) -> PriorityDispatchResult:
-    connection = autogen_context.connection
-    assert connection is not None
-    include_schemas = autogen_context.opts.get("include_schemas", False)
+    snapshot_file = autogen_context.opts.get("reflection_snapshot_file")
+    if snapshot_file:
+        with _snapshot_file_cache(autogen_context, snapshot_file):
+            return _produce_schema_changes(autogen_context, upgrade_ops)
+    else:
+        return _produce_schema_changes(autogen_context, upgrade_ops)
+
+
+def _produce_schema_changes(
+    autogen_context: AutogenContext, upgrade_ops: UpgradeOps
+) -> PriorityDispatchResult:
+    schemas = _schemas_to_compare(autogen_context)
+
+    assert autogen_context.dialect is not None
+    autogen_context.comparators.dispatch(
+        "schema", qualifier=autogen_context.dialect.name
+    )(autogen_context, upgrade_ops, schemas)
+
+    return PriorityDispatchResult.CONTINUE
 
-    inspector: Inspector = inspect(connection)
 
-    default_schema = connection.dialect.default_schema_name
+def _schemas_to_compare(autogen_context: AutogenContext) -> set[str | None]:
+    include_schemas = autogen_context.opts.get("include_schemas", False)
+
+    inspector = autogen_context.inspector
+    default_schema = inspector.default_schema_name
     schemas: set[str | None]
     if include_schemas:
-        schemas = set(inspector.get_schema_names())
+        schemas = set(_InspectorConv(inspector).get_schema_names())
         # replace default schema name with None
         schemas.discard("information_schema")
         # replace the "default" schema with None
@@ -41,17 +58,10 @@ def _produce_net_changes(
     else:
         schemas = {None}
 
-    schemas = {
+    return {
         s for s in schemas if autogen_context.run_name_filters(s, "schema", {})
     }
 
-    assert autogen_context.dialect is not None
-    autogen_context.comparators.dispatch(
-        "schema", qualifier=autogen_context.dialect.name
-    )(autogen_context, upgrade_ops, schemas)
-
-    return PriorityDispatchResult.CONTINUE
-
 
 def setup(plugin: Plugin) -> None:
     plugin.add_autogenerate_comparator(
@@ -3,17 +3,20 @@
 from __future__ import annotations
 
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
 import logging
 from typing import TYPE_CHECKING
 
 from sqlalchemy import event
+from sqlalchemy import inspect
 from sqlalchemy import schema as sa_schema
 from sqlalchemy.util import OrderedSet
 
 from .util import _InspectorConv
 from ...operations import ops
 from ...util import PriorityDispatchResult
+from ...util import sqla_compat
 
 if TYPE_CHECKING:
     from sqlalchemy.engine.reflection import Inspector
@@ -36,33 +39,12 @@ def _autogen_for_tables(
 ) -> PriorityDispatchResult:
     inspector = autogen_context.inspector
 
-    conn_table_names: set[tuple[str | None, str]] = set()
-
     version_table_schema = (
         autogen_context.migration_context.version_table_schema
     )
     version_table = autogen_context.migration_context.version_table
 
-    for schema_name in schemas:
-        tables = available = set(inspector.get_table_names(schema=schema_name))
-        if schema_name == version_table_schema:
-            tables = tables.difference(
-                [autogen_context.migration_context.version_table]
-            )
-
-        tablenames = [
-            tname
-            for tname in tables
-            if autogen_context.run_name_filters(
-                tname, "table", {"schema_name": schema_name}
-            )
-        ]
-
-        conn_table_names.update((schema_name, tname) for tname in tablenames)
-
-        inspector = autogen_context.inspector
-        insp = _InspectorConv(inspector)
-        insp.pre_cache_tables(schema_name, tablenames, available)
+    conn_table_names = _pre_cache_schemas(autogen_context, schemas)
 
     metadata_table_names = OrderedSet(
         [(table.schema, table.name) for table in autogen_context.sorted_tables]
@@ -79,6 +61,135 @@ def _autogen_for_tables(
     return PriorityDispatchResult.CONTINUE
 
 
+def _pre_cache_schemas(
+    autogen_context: AutogenContext, schemas: set[str | None]
+) -> set[tuple[str | None, str]]:
+    """Pre-cache the reflection of the tables of the given schemas which
+    pass the name filters, and return their names."""
+
+    conn_table_names: set[tuple[str | None, str]] = set()
+
+    workers = autogen_context.opts.get("reflection_workers")
+    if (
+        workers
+        and workers > 1
+        and len(schemas) > 1
+        and autogen_context.connection is not None
+        and sqla_compat.sqla_2
+    ):
+        conn_table_names.update(
+            _reflect_schemas_concurrently(autogen_context, schemas, workers)
+        )
+    else:
+        insp = _InspectorConv(autogen_context.inspector)
+        for schema_name in schemas:
+            available = set(insp.get_table_names(schema_name))
+            tablenames = _filter_table_names(
+                autogen_context, schema_name, available
+            )
+
+            conn_table_names.update(
+                (schema_name, tname) for tname in tablenames
+            )
+
+            insp.pre_cache_tables(schema_name, tablenames, available)
+
+    return conn_table_names
+
+
+def _filter_table_names(
+    autogen_context: AutogenContext,
+    schema_name: str | None,
+    available: set[str],
+) -> list[str]:
+    tables = available
+    if schema_name == autogen_context.migration_context.version_table_schema:
+        tables = tables.difference(
+            [autogen_context.migration_context.version_table]
+        )
+
+    return [
+        tname
+        for tname in tables
+        if autogen_context.run_name_filters(
+            tname, "table", {"schema_name": schema_name}
+        )
+    ]
+
+
+def _reflect_schemas_concurrently(
+    autogen_context: AutogenContext,
+    schemas: set[str | None],
+    workers: int,
+) -> list[tuple[str | None, str]]:
+    """Reflect the tables of each schema using a pool of threads, each
+    using its own connection from the engine of the migration connection.
+
+    The reflected information is copied into the pre-cache of the
+    autogenerate inspector, so that the comparison itself runs as usual
+    on the migration connection.  Name filters are run in the calling
+    thread only.
+
+    """
+    connection = autogen_context.connection
+    assert connection is not None
+    engine = connection.engine
+    execution_options = connection.get_execution_options()
+
+    @contextlib.contextmanager
+    def worker_inspector() -> Iterator[Inspector]:
+        with engine.connect() as conn:
+            if execution_options:
+                conn = conn.execution_options(**execution_options)
+            yield inspect(conn)
+
+    def get_table_names(schema_name: str | None) -> set[str]:
+        if not insp.is_pre_cached(schema_name):
+            with worker_inspector() as worker_insp:
+                _InspectorConv(worker_insp).get_table_names(schema_name)
+                insp.copy_pre_cache(worker_insp, schema_name)
+        return set(insp.get_table_names(schema_name))
+
+    def pre_cache(
+        schema_name: str | None, tablenames: list[str], available: set[str]
+    ) -> Inspector:
+        with worker_inspector() as worker_insp:
+            _InspectorConv(worker_insp).pre_cache_tables(
+                schema_name, tablenames, available
+            )
+            return worker_insp
+
+    insp = _InspectorConv(autogen_context.inspector)
+    ordered = sorted(schemas, key=lambda s: (s is not None, s or ""))
+    conn_table_names: list[tuple[str | None, str]] = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        available_by_schema = dict(
+            zip(ordered, pool.map(get_table_names, ordered))
+        )
+        futures = {}
+        for schema_name in ordered:
+            available = available_by_schema[schema_name]
+            tablenames = _filter_table_names(
+                autogen_context, schema_name, available
+            )
+            conn_table_names.extend(
+                (schema_name, tname) for tname in tablenames
+            )
+            if insp.is_pre_cached(schema_name):
+                # fetches only tables missing from e.g. a schema snapshot
+                insp.pre_cache_tables(schema_name, tablenames, available)
+            else:
+                futures[schema_name] = pool.submit(
+                    pre_cache, schema_name, tablenames, available
+                )
+
+        for schema_name, future in futures.items():
+            insp.copy_pre_cache(future.result(), schema_name)
+
+    return conn_table_names
+
+
 def _compare_tables(
     conn_table_names: set[tuple[str | None, str]],
     metadata_table_names: set[tuple[str | None, str]],
@@ -86,7 +197,7 @@ def _compare_tables(
     upgrade_ops: UpgradeOps,
     autogen_context: AutogenContext,
 ) -> None:
-    default_schema = inspector.bind.dialect.default_schema_name
+    default_schema = inspector.default_schema_name
 
     # tables coming from the connection will not have "schema"
     # set if it matches default_schema_name; so we need a list
@@ -139,7 +250,10 @@ def _compare_tables(
                 upgrade_ops.ops.append(modify_table_ops)
 
     removal_metadata = sa_schema.MetaData()
-    for s, tname in conn_table_names.difference(metadata_table_names):
+    for s, tname in sorted(
+        conn_table_names.difference(metadata_table_names),
+        key=lambda x: (x[0] or "", x[1]),
+    ):
         name = sa_schema._get_table_key(tname, s)
 
         # a name might be present already if a previous reflection pulled
@@ -170,7 +284,10 @@ def _compare_tables(
             upgrade_ops.ops.append(ops.DropTableOp.from_table(t))
             log.info("Detected removed table %r", name)
 
-    existing_tables = conn_table_names.intersection(metadata_table_names)
+    existing_tables = sorted(
+        conn_table_names.intersection(metadata_table_names),
+        key=lambda x: (x[0] or "", x[1]),
+    )
 
     existing_metadata = sa_schema.MetaData()
     conn_column_info = {}
@@ -194,7 +311,7 @@ def _compare_tables(
 
         conn_column_info[(s, tname)] = t
 
-    for s, tname in sorted(existing_tables, key=lambda x: (x[0] or "", x[1])):
+    for s, tname in existing_tables:
         s = s or None
         name = "%s.%s" % (s, tname) if s else tname
         metadata_table = tname_to_table[(s, tname)]
@@ -64,6 +64,18 @@ class _InspectorConv:
     ) -> None:
         pass
 
+    def get_schema_names(self) -> list[str]:
+        return self.inspector.get_schema_names()
+
+    def get_table_names(self, schema: str | None) -> list[str]:
+        return self.inspector.get_table_names(schema=schema)
+
+    def is_pre_cached(self, schema: str | None) -> bool:
+        return False
+
+    def copy_pre_cache(self, source: Inspector, schema: str | None) -> None:
+        pass
+
     def get_unique_constraints(
         self, tname: str, schema: str | None
     ) -> list[ReflectedUniqueConstraint]:
@@ -154,8 +166,21 @@ class _SQLA2InspectorConv(_InspectorConv):
         inspector_method: Any,
     ) -> None:
 
-        if info_key in self.inspector.info_cache:
+        # keyed per schema, as the multi methods are invoked once for each
+        # schema being compared
+        cache_key = (info_key, schema)
+        cached = self.inspector.info_cache.get(cache_key)
+        if cached is NotImplementedError:
             return
+        elif cached is not None:
+            # e.g. loaded from a schema snapshot; fetch only the tables
+            # that aren't present
+            tablenames = [
+                tname for tname in tablenames if (schema, tname) not in cached
+            ]
+            if not tablenames:
+                return
+            all_available_tablenames = ()
 
         # heuristic vendored from SQLAlchemy 2.0
         # if more than 50% of the tables in the db are in filter_names load all
@@ -183,9 +208,11 @@ class _SQLA2InspectorConv(_InspectorConv):
                 schema=schema, filter_names=optimized_filter_names
             )
         except NotImplementedError:
-            self.inspector.info_cache[info_key] = NotImplementedError
+            self.inspector.info_cache[cache_key] = NotImplementedError
         else:
-            self.inspector.info_cache[info_key] = elements
+            if cached is not None:
+                elements = {**cached, **elements}
+            self.inspector.info_cache[cache_key] = elements
 
     def _return_from_cache(
         self,
@@ -198,8 +225,9 @@ class _SQLA2InspectorConv(_InspectorConv):
     ) -> Any:
         not_in_cache = object()
 
-        if info_key in self.inspector.info_cache:
-            cache = self.inspector.info_cache[info_key]
+        cache_key = (info_key, schema)
+        if cache_key in self.inspector.info_cache:
+            cache = self.inspector.info_cache[cache_key]
             if cache is NotImplementedError:
                 if optional:
                     return {}
@@ -305,6 +333,41 @@ class _SQLA2InspectorConv(_InspectorConv):
                 meth,
             )
 
+    def get_schema_names(self) -> list[str]:
+        cache_key = ("alembic_schema_names", None)
+        if cache_key not in self.inspector.info_cache:
+            self.inspector.info_cache[cache_key] = (
+                self.inspector.get_schema_names()
+            )
+        return self.inspector.info_cache[cache_key]
+
+    def get_table_names(self, schema: str | None) -> list[str]:
+        cache_key = ("alembic_table_names", schema)
+        if cache_key not in self.inspector.info_cache:
+            self.inspector.info_cache[cache_key] = (
+                self.inspector.get_table_names(schema=schema)
+            )
+        return self.inspector.info_cache[cache_key]
+
+    def is_pre_cached(self, schema: str | None) -> bool:
+        return all(
+            cache_key in self.inspector.info_cache
+            for cache_key in [("alembic_table_names", schema)]
+            + [(f"alembic_{key}", schema) for key in _INSP_KEYS]
+        )
+
+    def copy_pre_cache(self, source: Inspector, schema: str | None) -> None:
+        """copy the results of :meth:`.pre_cache_tables` for the given
+        schema from another inspector, e.g. one that reflected the schema
+        on another connection."""
+
+        for key in ("table_names",) + _INSP_KEYS:
+            cache_key = (f"alembic_{key}", schema)
+            if cache_key in source.info_cache:
+                self.inspector.info_cache[cache_key] = source.info_cache[
+                    cache_key
+                ]
+
     def _make_reflection_info(
         self, tname: str, schema: str | None
     ) -> _ReflectionInfo:
@@ -331,6 +394,12 @@ class _SQLA2InspectorConv(_InspectorConv):
     def reflect_table(self, table: Table) -> None:
         ri = self._make_reflection_info(table.name, table.schema)
 
+        # the column_reflect event may modify the column dictionaries;
+        # don't modify the ones in the cache
+        for table_key, cols in ri.columns.items():
+            if isinstance(cols, list):
+                ri.columns[table_key] = [col.copy() for col in cols]
+
         self.inspector.reflect_table(
             table,
             include_columns=None,
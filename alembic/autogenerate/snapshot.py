@@ -0,0 +1,663 @@
+# mypy: allow-untyped-defs, allow-incomplete-defs, allow-untyped-calls
+# mypy: no-warn-return-any, allow-any-generics
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from collections.abc import Sequence
+import contextlib
+import importlib
+import inspect
+import json
+import logging
+import os
+from typing import Any
+from typing import cast
+from typing import TYPE_CHECKING
+
+from sqlalchemy import Column
+from sqlalchemy import exc
+from sqlalchemy import types as sqltypes
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.sql.elements import quoted_name
+
+from .compare.util import _INSP_KEYS
+from .. import util
+from ..util import sqla_compat
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Dialect
+    from sqlalchemy.sql.schema import MetaData
+    from sqlalchemy.sql.schema import Table
+
+    from .api import AutogenContext
+    from ..runtime.migration import MigrationContext
+
+log = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+
+
+class SchemaSnapshot:
+    """A serializable copy of the database schema information reflected
+    by autogenerate.
+
+    The snapshot contains the schema and table names, as well as the
+    columns, types, constraints, indexes, comments and table options of
+    each table, as returned by the ``get_multi_*`` methods of the
+    SQLAlchemy :class:`~sqlalchemy.engine.reflection.Inspector`.  It's
+    written as JSON; column types are stored using their class and
+    constructor arguments.
+
+    A snapshot is used by the
+    :paramref:`.EnvironmentContext.configure.reflection_snapshot_file`
+    parameter.  Requires SQLAlchemy 2.0 or greater.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    def __init__(
+        self,
+        dialect_name: str,
+        fingerprint: str | None,
+        schema_names: list[str] | None,
+        schemas: dict[str | None, dict[str, Any]],
+        default_schema_name: str | None = None,
+        heads: Sequence[str] | None = None,
+    ) -> None:
+        self.dialect_name = dialect_name
+        self.fingerprint = fingerprint
+        self.schema_names = schema_names
+        self.schemas = schemas
+        self.default_schema_name = default_schema_name
+        self.heads = tuple(heads) if heads is not None else None
+
+    @classmethod
+    def from_inspector(
+        cls,
+        inspector: Inspector,
+        fingerprint: str | None = None,
+        heads: Sequence[str] | None = None,
+    ) -> SchemaSnapshot:
+        """Produce a :class:`.SchemaSnapshot` from the information cached
+        by autogenerate on the given inspector, along with the given
+        version table heads."""
+
+        info_cache = inspector.info_cache
+        schemas: dict[str | None, dict[str, Any]] = {}
+
+        for key in _INSP_KEYS + ("table_names",):
+            for cache_key, value in info_cache.items():
+                if (
+                    not isinstance(cache_key, tuple)
+                    or len(cache_key) != 2
+                    or cache_key[0] != f"alembic_{key}"
+                ):
+                    continue
+                schema = cache_key[1]
+                entry = schemas.setdefault(schema, {})
+                if key == "table_names" or value is NotImplementedError:
+                    entry[key] = value
+                else:
+                    entry[key] = {
+                        tname: element for (_, tname), element in value.items()
+                    }
+
+        return cls(
+            inspector.dialect.name,
+            fingerprint,
+            info_cache.get(("alembic_schema_names", None)),
+            schemas,
+            default_schema_name=inspector.default_schema_name,
+            heads=heads,
+        )
+
+    @classmethod
+    def from_metadata(
+        cls, metadata: MetaData, dialect: Dialect
+    ) -> SchemaSnapshot:
+        """Produce a :class:`.SchemaSnapshot` from the tables of the given
+        :class:`~sqlalchemy.schema.MetaData`, in the form in which the
+        given dialect would reflect them after they were created.
+
+        This is used by :func:`.compare_metadata_pair`.
+
+        """
+
+        ddl_compiler = dialect.ddl_compiler(
+            dialect, None  # type: ignore[arg-type]
+        )
+        schemas: dict[str | None, dict[str, Any]] = {}
+        for table in metadata.tables.values():
+            entry = schemas.setdefault(
+                table.schema,
+                {"table_names": [], **{key: {} for key in _INSP_KEYS}},
+            )
+            entry["table_names"].append(table.name)
+            for key, value in _reflected_table(table, ddl_compiler).items():
+                entry[key][table.name] = value
+
+        return cls(
+            dialect.name,
+            None,
+            sorted(schema for schema in schemas if schema is not None),
+            schemas,
+        )
+
+    def apply_to(self, inspector: Inspector) -> None:
+        """Populate the autogenerate cache of the given inspector with the
+        contents of this snapshot."""
+
+        info_cache = inspector.info_cache
+        if self.schema_names is not None:
+            info_cache[("alembic_schema_names", None)] = list(
+                self.schema_names
+            )
+
+        for schema, entry in self.schemas.items():
+            for key, value in entry.items():
+                if key == "table_names" or value is NotImplementedError:
+                    info_cache[(f"alembic_{key}", schema)] = value
+                else:
+                    info_cache[(f"alembic_{key}", schema)] = {
+                        (schema, tname): element
+                        for tname, element in value.items()
+                    }
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the snapshot as a JSON-serializable dictionary."""
+
+        return {
+            "version": _FORMAT_VERSION,
+            "dialect": self.dialect_name,
+            "fingerprint": self.fingerprint,
+            "schema_names": self.schema_names,
+            "default_schema_name": self.default_schema_name,
+            "heads": list(self.heads) if self.heads is not None else None,
+            "schemas": [
+                {
+                    "schema": schema,
+                    **{
+                        key: (
+                            None
+                            if value is NotImplementedError
+                            else _encode(value)
+                        )
+                        for key, value in entry.items()
+                    },
+                }
+                for schema, entry in self.schemas.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(
+        cls, data: dict[str, Any], dialect: Dialect
+    ) -> SchemaSnapshot:
+        """Produce a :class:`.SchemaSnapshot` from the dictionary returned
+        by :meth:`.SchemaSnapshot.to_dict`; types are created for the
+        given dialect."""
+
+        if data.get("version") != _FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported schema snapshot version %r"
+                % (data.get("version"),)
+            )
+
+        schemas: dict[str | None, dict[str, Any]] = {}
+        for entry in data["schemas"]:
+            schemas[entry["schema"]] = {
+                key: (
+                    NotImplementedError
+                    if value is None
+                    else _decode(value, dialect)
+                )
+                for key, value in entry.items()
+                if key != "schema"
+            }
+        return cls(
+            data["dialect"],
+            data["fingerprint"],
+            data["schema_names"],
+            schemas,
+            default_schema_name=data.get("default_schema_name"),
+            heads=data.get("heads"),
+        )
+
+    def write(self, path: str | os.PathLike[str]) -> None:
+        """Write the snapshot as JSON to the given path."""
+
+        util.write_json(path, self.to_dict(), indent=1)
+
+    @classmethod
+    def load(
+        cls, path: str | os.PathLike[str], dialect: Dialect
+    ) -> SchemaSnapshot:
+        """Load a snapshot written by :meth:`.SchemaSnapshot.write`."""
+
+        with open(path, encoding="utf-8") as file_:
+            return cls.from_dict(json.load(file_), dialect)
+
+
+class SnapshotInspector(Inspector):
+    """An :class:`~sqlalchemy.engine.reflection.Inspector` that returns the
+    schema information stored in a :class:`.SchemaSnapshot`, rather than
+    querying a database.
+
+    Autogenerate uses this inspector when the :class:`.MigrationContext` is
+    configured with the
+    :paramref:`.EnvironmentContext.configure.reflection_snapshot_file`
+    parameter but without a database connection, as well as within
+    :func:`.compare_metadata_pair`.  Only the methods used by autogenerate
+    are supported.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    def __init__(self, snapshot: SchemaSnapshot, dialect: Dialect) -> None:
+        self.snapshot = snapshot
+        self.dialect = dialect
+        self.bind = self.engine = cast(Any, _SnapshotBind(dialect))
+        self._op_context_requires_connect = False
+        self.info_cache = {}
+        snapshot.apply_to(self)
+
+    @property
+    def default_schema_name(self) -> str | None:
+        return self.snapshot.default_schema_name
+
+    @contextlib.contextmanager
+    def _operation_context(self) -> Iterator[Any]:
+        yield self.bind
+
+    def _entry(self, schema: str | None, key: str) -> Any:
+        value = self.snapshot.schemas.get(schema, {}).get(key, {})
+        if value is NotImplementedError:
+            raise NotImplementedError()
+        return value
+
+    def get_schema_names(self, **kw: Any) -> list[str]:
+        if self.snapshot.schema_names is not None:
+            return list(self.snapshot.schema_names)
+        return [
+            schema for schema in self.snapshot.schemas if schema is not None
+        ]
+
+    def get_table_names(self, schema: str | None = None, **kw: Any) -> Any:
+        return list(self._entry(schema, "table_names") or ())
+
+    def has_table(
+        self, table_name: str, schema: str | None = None, **kw: Any
+    ) -> bool:
+        return table_name in self.get_table_names(schema)
+
+    def _get_multi(
+        self,
+        key: str,
+        schema: str | None = None,
+        filter_names: Sequence[str] | None = None,
+        **kw: Any,
+    ) -> Any:
+        return {
+            (schema, tname): value
+            for tname, value in self._entry(schema, key).items()
+            if filter_names is None or tname in filter_names
+        }
+
+    def _get(
+        self, key: str, table_name: str, schema: str | None = None, **kw: Any
+    ) -> Any:
+        entry = self._entry(schema, key)
+        if table_name not in entry:
+            raise exc.NoSuchTableError(table_name)
+        return entry[table_name]
+
+
+class _SnapshotBind:
+    """Stands in for the connection of a :class:`.SnapshotInspector` within
+    :meth:`~sqlalchemy.engine.reflection.Inspector.reflect_table`."""
+
+    def __init__(self, dialect: Dialect) -> None:
+        self.dialect = dialect
+
+    def schema_for_object(self, obj: Any) -> str | None:
+        return obj.schema
+
+
+def _snapshot_methods(key: str) -> None:
+    def get_multi(self, schema=None, filter_names=None, **kw):
+        return self._get_multi(key, schema, filter_names)
+
+    def get(self, table_name, schema=None, **kw):
+        return self._get(key, table_name, schema)
+
+    setattr(SnapshotInspector, f"get_multi_{key}", get_multi)
+    setattr(SnapshotInspector, f"get_{key}", get)
+
+
+for _key in _INSP_KEYS:
+    _snapshot_methods(_key)
+
+
+def _reflected_table(table: Table, ddl_compiler: Any) -> dict[str, Any]:
+    """Return the information reflection would return for the given table,
+    keyed on the names in ``_INSP_KEYS``."""
+
+    dialect = ddl_compiler.dialect
+
+    def sql(expression: Any) -> str:
+        return ddl_compiler.sql_compiler.process(
+            expression, include_table=False, literal_binds=True
+        )
+
+    def name(constraint: Any) -> str | None:
+        return sqla_compat._get_constraint_final_name(constraint, dialect)
+
+    columns = []
+    for column in table.columns:
+        col: dict[str, Any] = {
+            "name": column.name,
+            "type": column.type.copy(),
+            "nullable": column.nullable,
+            "default": None,
+            "comment": column.comment,
+        }
+        if column.computed is not None:
+            col["computed"] = {
+                "sqltext": sql(column.computed.sqltext),
+                "persisted": column.computed.persisted,
+            }
+        elif column.identity is not None:
+            col["identity"] = sqla_compat._get_identity_options_dict(
+                column.identity
+            )
+        elif column.server_default is not None:
+            col["default"] = ddl_compiler.get_column_default_string(column)
+        columns.append(col)
+
+    foreign_keys = []
+    for fk in table.foreign_key_constraints:
+        (
+            _,
+            _,
+            source_columns,
+            target_schema,
+            target_table,
+            target_columns,
+            onupdate,
+            ondelete,
+            deferrable,
+            initially,
+        ) = sqla_compat._fk_spec(fk)
+        options = {
+            key: value
+            for key, value in [
+                ("onupdate", onupdate),
+                ("ondelete", ondelete),
+                ("deferrable", deferrable),
+                ("initially", initially),
+                ("match", fk.match),
+            ]
+            if value is not None
+        }
+        foreign_keys.append(
+            {
+                "name": name(fk),
+                "constrained_columns": source_columns,
+                "referred_schema": target_schema,
+                "referred_table": target_table,
+                "referred_columns": target_columns,
+                "options": options,
+            }
+        )
+
+    indexes = []
+    for index in table.indexes:
+        column_names: list[str | None] = []
+        expressions = []
+        for expr in index.expressions:
+            if isinstance(expr, Column) and expr.table is table:
+                column_names.append(expr.name)
+                expressions.append(expr.name)
+            else:
+                column_names.append(None)
+                expressions.append(sql(expr))
+        idx: dict[str, Any] = {
+            "name": name(index),
+            "column_names": column_names,
+            "unique": index.unique,
+            "dialect_options": dict(index.dialect_kwargs),
+        }
+        if None in column_names:
+            idx["expressions"] = expressions
+        indexes.append(idx)
+
+    return {
+        "columns": columns,
+        "pk_constraint": {
+            "name": name(table.primary_key),
+            "constrained_columns": [
+                column.name for column in table.primary_key.columns
+            ],
+        },
+        "foreign_keys": foreign_keys,
+        "indexes": indexes,
+        "unique_constraints": [
+            {
+                "name": name(uq),
+                "column_names": [column.name for column in uq.columns],
+            }
+            for uq in table.constraints
+            if isinstance(uq, UniqueConstraint)
+        ],
+        "table_comment": {"text": table.comment},
+        "check_constraints": [
+            {"name": name(ck), "sqltext": sql(ck.sqltext)}
+            for ck in sqla_compat.all_table_check_constraints(table)
+        ],
+        "table_options": {},
+    }
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    elif isinstance(value, quoted_name) and value.quote is not None:
+        return {"__quoted_name__": [str(value), value.quote]}
+    elif isinstance(value, str):
+        return str(value)
+    elif isinstance(value, (list, tuple)):
+        return [_encode(elem) for elem in value]
+    elif isinstance(value, dict):
+        if not all(type(key) is str for key in value):
+            raise _Unsupported(value)
+        return {key: _encode(elem) for key, elem in value.items()}
+    elif isinstance(value, sqltypes.TypeEngine):
+        return {"__type__": _encode_type(value)}
+    else:
+        raise _Unsupported(value)
+
+
+def _encode_type(type_: sqltypes.TypeEngine) -> Any:
+    cls = type(type_)
+    path = f"{cls.__module__}:{cls.__qualname__}"
+
+    try:
+        if isinstance(type_, sqltypes.Enum):
+            return [
+                path,
+                _encode(list(type_.enums)),
+                _encode({"name": type_.name, "schema": type_.schema}),
+            ]
+
+        kw = {}
+        for name, default in _init_params(cls):
+            if name not in kw and hasattr(type_, name):
+                value = getattr(type_, name)
+                if value is not default:
+                    kw[name] = _encode(value)
+        return [path, [], kw]
+    except _Unsupported:
+        # types are compared by autogenerate only when the reflected
+        # type is known
+        return None
+
+
+def _init_params(cls: type) -> Iterator[tuple[str, Any]]:
+    for base in cls.__mro__:
+        if "__init__" not in base.__dict__:
+            continue
+        try:
+            params = inspect.signature(base.__dict__["__init__"]).parameters
+        except (TypeError, ValueError):
+            return
+        has_kw = False
+        for param in list(params.values())[1:]:
+            if param.kind is param.VAR_KEYWORD:
+                has_kw = True
+            elif param.kind is not param.VAR_POSITIONAL:
+                yield param.name, param.default
+        if not has_kw:
+            return
+
+
+def _decode(value: Any, dialect: Dialect) -> Any:
+    if isinstance(value, list):
+        return [_decode(elem, dialect) for elem in value]
+    elif isinstance(value, dict):
+        if len(value) == 1:
+            if "__quoted_name__" in value:
+                return quoted_name(*value["__quoted_name__"])
+            elif "__type__" in value:
+                return _decode_type(value["__type__"], dialect)
+        return {key: _decode(elem, dialect) for key, elem in value.items()}
+    else:
+        return value
+
+
+def _decode_type(value: Any, dialect: Dialect) -> sqltypes.TypeEngine:
+    if value is None:
+        return sqltypes.NULLTYPE
+
+    path, args, kw = value
+    modname, _, clsname = path.partition(":")
+
+    # only import the modules of SQLAlchemy, or of the dialect in use
+    allowed = {"sqlalchemy", type(dialect).__module__.split(".")[0]}
+    if modname.split(".")[0] not in allowed:
+        log.warning("Ignoring type %s from schema snapshot", path)
+        return sqltypes.NULLTYPE
+
+    try:
+        obj: Any = importlib.import_module(modname)
+        for attr in clsname.split("."):
+            obj = getattr(obj, attr)
+        if not (
+            isinstance(obj, type) and issubclass(obj, sqltypes.TypeEngine)
+        ):
+            raise TypeError(path)
+        return obj(*_decode(args, dialect), **_decode(kw, dialect))
+    except (ImportError, AttributeError, TypeError) as err:
+        log.warning(
+            "Can't restore type %s from schema snapshot: %s", path, err
+        )
+        return sqltypes.NULLTYPE
+
+
+@contextlib.contextmanager
+def _snapshot_file_cache(
+    autogen_context: AutogenContext, path: str
+) -> Iterator[None]:
+    """Use the snapshot file at the given path as the reflection cache of
+    autogenerate, if it was written for the current fingerprint of the
+    database, and otherwise write it after the comparison."""
+
+    migration_context = autogen_context.migration_context
+    if not sqla_compat.sqla_2 or migration_context.connection is None:
+        # without a connection, the snapshot is used in place of the
+        # database; see SnapshotInspector
+        yield
+        return
+
+    fingerprint = migration_context.impl.reflection_fingerprint()
+    if fingerprint is None:
+        log.info(
+            "The %s dialect has no schema fingerprint; "
+            "not using the schema snapshot",
+            migration_context.dialect.name,
+        )
+        yield
+        return
+
+    inspector = autogen_context.inspector
+    existing = None
+    if os.path.exists(path):
+        try:
+            existing = SchemaSnapshot.load(path, migration_context.dialect)
+        except (ValueError, KeyError, TypeError) as err:
+            log.warning("Ignoring schema snapshot %s: %s", path, err)
+        else:
+            if (
+                existing.fingerprint == fingerprint
+                and existing.dialect_name == migration_context.dialect.name
+            ):
+                log.info("Using schema snapshot %s", path)
+                existing.apply_to(inspector)
+            else:
+                existing = None
+
+    yield
+
+    snapshot = SchemaSnapshot.from_inspector(
+        inspector, fingerprint, heads=migration_context.get_current_heads()
+    )
+    try:
+        data = snapshot.to_dict()
+    except _Unsupported as err:
+        log.warning(
+            "Not writing schema snapshot %s; can't serialize %r", path, err
+        )
+        return
+
+    # with a snapshot in use, only tables not found in the snapshot would
+    # have been reflected
+    if existing is None or data != existing.to_dict():
+        util.write_json(path, data, indent=1)
+
+
+def _write_snapshot_file(
+    migration_context: MigrationContext, path: str
+) -> None:
+    """Reflect the schema compared by autogenerate and write it to the
+    snapshot file at the given path, e.g. after migrations were run."""
+
+    from .api import AutogenContext
+    from .compare.schema import _schemas_to_compare
+    from .compare.tables import _pre_cache_schemas
+
+    if not sqla_compat.sqla_2:
+        return
+
+    autogen_context = AutogenContext(migration_context, autogenerate=False)
+    _pre_cache_schemas(autogen_context, _schemas_to_compare(autogen_context))
+
+    snapshot = SchemaSnapshot.from_inspector(
+        autogen_context.inspector,
+        migration_context.impl.reflection_fingerprint(),
+        heads=migration_context.get_current_heads(),
+    )
+    try:
+        data = snapshot.to_dict()
+    except _Unsupported as err:
+        log.warning(
+            "Not writing schema snapshot %s; can't serialize %r", path, err
+        )
+    else:
+        util.write_json(path, data, indent=1)
@@ -2,18 +2,25 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+import copy
 import os
 import pathlib
+import time
+from typing import NamedTuple
 from typing import TYPE_CHECKING
 
 from . import autogenerate as autogen
 from . import util
+from .operations import Operations
 from .runtime.environment import EnvironmentContext
 from .script import ScriptDirectory
 from .util import compat
 
 if TYPE_CHECKING:
     from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.runtime.migration import RevisionStep
     from alembic.script.base import Script
     from alembic.script.revision import _RevIdType
     from .runtime.environment import ProcessRevisionDirectiveFn
@@ -448,6 +455,7 @@ def upgrade(
     revision: str,
     sql: bool = False,
     tag: str | None = None,
+    profile: str | None = None,
 ) -> None:
     """Upgrade to a later version.
 
@@ -462,6 +470,13 @@ def upgrade(
      ``env.py`` scripts via the :meth:`.EnvironmentContext.get_tag_argument`
      method.
 
+    :param profile: path of a file to which a timing report of the
+     migrations run is written, as CSV if the path ends with ``.csv``, or
+     otherwise as JSON.  See
+     :paramref:`.EnvironmentContext.configure.profile_file`.
+
+     .. versionadded:: 1.19.2
+
     """
 
     script = ScriptDirectory.from_config(config)
@@ -483,15 +498,173 @@ def upgrade(
         starting_rev=starting_rev,
         destination_rev=revision,
         tag=tag,
+        profile_file=profile,
     ):
         script.run_env()
 
 
+class UpgradeOutcome(NamedTuple):
+    """The outcome of upgrading one database with :func:`.upgrade_many`.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    url: str
+    """The database URL."""
+
+    from_heads: tuple[str, ...] | None
+    """The heads of the database before the upgrade, or None if the
+    upgrade failed before they were read."""
+
+    revisions: tuple[str, ...]
+    """The revisions to be applied, in order.  If :attr:`.error` is set,
+    not all of these may have been applied."""
+
+    error: Exception | None
+    """The exception raised by the upgrade, if any."""
+
+    elapsed: float
+    """The time taken by the upgrade, including the ``env.py`` script, in
+    seconds."""
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def _config_for_url(config: Config, url: str) -> Config:
+    db_config = copy.copy(config)
+    db_config.__dict__["file_config"] = copy.deepcopy(config.file_config)
+    db_config.__dict__["attributes"] = dict(config.attributes)
+    db_config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return db_config
+
+
+def upgrade_many(
+    config: Config,
+    revision: str,
+    urls: list[str],
+    workers: int | None = None,
+    tag: str | None = None,
+) -> list[UpgradeOutcome]:
+    """Upgrade several databases to a later version, concurrently.
+
+    The ``env.py`` script is run for each database, in a pool of threads,
+    with the ``sqlalchemy.url`` option of the configuration set to the URL
+    of that database.  The script directory and its revision map are
+    loaded only once, and the upgrade plan computed for one database is
+    reused for others at the same heads.  Within each thread, the
+    ``context`` and ``op`` proxies refer to the migration environment of
+    that thread's database.
+
+    A failure to upgrade one database doesn't stop the others; the outcome
+    of each is printed, after which :class:`.CommandError` is raised naming
+    the databases which failed, if any.
+
+    :param config: a :class:`.Config` instance.
+
+    :param revision: string revision target. May be ``"heads"`` to target
+     the most recent revision(s).
+
+    :param urls: the URLs of the databases to upgrade.
+
+    :param workers: the maximum number of databases upgraded at once;
+     defaults to the default of
+     :class:`concurrent.futures.ThreadPoolExecutor`.
+
+    :param tag: an arbitrary "tag" that can be intercepted by custom
+     ``env.py`` scripts via the :meth:`.EnvironmentContext.get_tag_argument`
+     method.
+
+    :return: a list of :class:`.UpgradeOutcome` objects, in the order of
+     ``urls``, if all of the upgrades succeeded.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    script = ScriptDirectory.from_config(config)
+    if ":" in revision:
+        raise util.CommandError("Range revision not allowed")
+
+    # build the revision map before it's shared between threads
+    script.get_heads()
+
+    def upgrade_one(url: str) -> UpgradeOutcome:
+        db_config = _config_for_url(config, url)
+        from_heads: tuple[str, ...] | None = None
+        revisions: tuple[str, ...] = ()
+
+        def upgrade(
+            rev: tuple[str, ...], context: MigrationContext
+        ) -> list[RevisionStep]:
+            nonlocal from_heads, revisions
+            from_heads = tuple(rev)
+            steps = script._upgrade_revs(revision, rev)
+            revisions = tuple(step.revision.revision for step in steps)
+            return steps
+
+        error: Exception | None = None
+        start = time.perf_counter()
+        try:
+            with EnvironmentContext(
+                db_config,
+                script,
+                fn=upgrade,
+                destination_rev=revision,
+                tag=tag,
+            ):
+                script.run_env()
+        except Exception as err:
+            error = err
+        return UpgradeOutcome(
+            url, from_heads, revisions, error, time.perf_counter() - start
+        )
+
+    with (
+        EnvironmentContext._thread_local_proxy(),
+        Operations._thread_local_proxy(),
+        ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        outcomes = list(executor.map(upgrade_one, urls))
+
+    for outcome in outcomes:
+        url = util.obfuscate_url_pw(outcome.url)
+        if outcome.error is not None:
+            config.print_stdout(
+                "%s: FAILED after %.2fs: %s",
+                url,
+                outcome.elapsed,
+                outcome.error,
+            )
+        else:
+            config.print_stdout(
+                "%s: applied %d revision(s) in %.2fs",
+                url,
+                len(outcome.revisions),
+                outcome.elapsed,
+            )
+
+    failed = [
+        util.obfuscate_url_pw(outcome.url)
+        for outcome in outcomes
+        if outcome.error is not None
+    ]
+    if failed:
+        raise util.CommandError(
+            "%d of %d database(s) failed to upgrade: %s"
+            % (len(failed), len(outcomes), ", ".join(failed))
+        )
+    return outcomes
+
+
 def downgrade(
     config: Config,
     revision: str,
     sql: bool = False,
     tag: str | None = None,
+    profile: str | None = None,
 ) -> None:
     """Revert to a previous version.
 
@@ -506,6 +679,13 @@ def downgrade(
      ``env.py`` scripts via the :meth:`.EnvironmentContext.get_tag_argument`
      method.
 
+    :param profile: path of a file to which a timing report of the
+     migrations run is written, as CSV if the path ends with ``.csv``, or
+     otherwise as JSON.  See
+     :paramref:`.EnvironmentContext.configure.profile_file`.
+
+     .. versionadded:: 1.19.2
+
     """
 
     script = ScriptDirectory.from_config(config)
@@ -530,6 +710,7 @@ def downgrade(
         starting_rev=starting_rev,
         destination_rev=revision,
         tag=tag,
+        profile_file=profile,
     ):
         script.run_env()
 
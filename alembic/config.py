@@ -814,6 +814,21 @@ class CommandLine:
                 "environment and version locations",
             ),
         ),
+        "profile": (
+            "--profile",
+            dict(
+                type=str,
+                help="Write a timing report of the migrations run to this "
+                "file, as CSV if it ends with .csv, or otherwise as JSON",
+            ),
+        ),
+        "workers": (
+            "--workers",
+            dict(
+                type=int,
+                help="Maximum number of databases to upgrade at once",
+            ),
+        ),
         "check_heads": (
             "-c",
             "--check-heads",
@@ -835,6 +850,10 @@ class CommandLine:
             nargs="+",
             help="one or more revisions, or 'heads' for all heads",
         ),
+        "urls": dict(
+            nargs="+",
+            help="one or more database URLs",
+        ),
     }
     _POSITIONAL_TRANSLATIONS: dict[Any, dict[str, str]] = {
         command.stamp: {"revision": "revisions"}
@@ -91,6 +91,12 @@ def configure(
     dialect_opts: dict[str, Any] | None = None,
     transactional_ddl: bool | None = None,
     transaction_per_migration: bool = False,
+    coalesce_version_writes: bool = False,
+    parallel_branch_workers: int | None = None,
+    version_table_tenant: str | None = None,
+    version_table_tenant_column: str = "tenant_id",
+    profile_file: str | None = None,
+    version_history_table: str | None = None,
     output_buffer: TextIO | None = None,
     starting_rev: str | None = None,
     tag: str | None = None,
@@ -145,6 +151,8 @@ def configure(
         | None
     ) = None,
     include_schemas: bool = False,
+    reflection_workers: int | None = None,
+    reflection_snapshot_file: str | None = None,
     process_revision_directives: (
         None
         | Callable[
@@ -258,6 +266,108 @@ def configure(
     :param transaction_per_migration: if True, nest each migration script
      in a transaction rather than the full series of migrations to
      run.
+    :param coalesce_version_writes: if True, and the full series of
+     migrations is run within a single transaction on a backend that
+     supports transactional DDL, changes to the version table are tracked
+     in memory and only the net change is written once all migrations
+     have run, rather than emitting an UPDATE, INSERT or DELETE for each
+     migration.  Pending changes are also written before the transaction
+     is committed by :meth:`.MigrationContext.autocommit_block`.  The
+     :paramref:`.EnvironmentContext.configure.on_version_apply` callbacks
+     still receive the heads in effect after each migration.  Has no
+     effect in "offline" mode or when
+     :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+     is used.
+
+     .. versionadded:: 1.19.2
+
+    :param parallel_branch_workers: when set to a number greater than
+     one, an upgrade whose pending revisions form several independent
+     branches, sharing no pending ancestors nor ``depends_on``
+     relationships, runs each branch in its own thread, using up to this
+     many threads at once.  Each thread checks out its own connection
+     from the :class:`~sqlalchemy.engine.Engine` of the connection passed
+     to :meth:`.EnvironmentContext.configure`, and runs each migration in
+     its own transaction, as with
+     :paramref:`.EnvironmentContext.configure.transaction_per_migration`;
+     only the changes to the version table are serialised between
+     threads.  Worker connections receive the execution options of the
+     given connection, such as ``schema_translate_map``.  The ``op`` and
+     ``context`` proxies refer to the :class:`.Operations` and to a copy
+     of this :class:`.EnvironmentContext` of the current thread, so that
+     e.g. ``context.get_bind()`` returns the connection of the thread.
+     Migrations are run one at a time as usual in "offline" mode, for
+     downgrades, and for upgrades that can't be split into independent
+     branches.  The engine must allow several
+     connections at once, so this is not suitable for e.g. a SQLite
+     ``:memory:`` database.
+
+     .. versionadded:: 1.19.2
+
+    :param version_table_tenant: the name of a tenant, for
+     schema-per-tenant deployments where the same migrations are run
+     against many schemas.  When set, the version table holds the rows
+     of all tenants, keyed on the column named by
+     :paramref:`.EnvironmentContext.configure.version_table_tenant_column`,
+     and this migration context reads and writes the rows of the given
+     tenant only.  The version table is placed in the schema given by
+     :paramref:`.EnvironmentContext.configure.version_table_schema`, or
+     otherwise in the default schema of the connection, named
+     explicitly, so that a ``schema_translate_map`` of the form
+     ``{None: <tenant>}`` set on the connection for the tenant's
+     migrations doesn't apply to it.  Statements compiled for one tenant
+     are then reused from SQLAlchemy's compiled cache for the others.
+     Not supported in "offline" mode.  A loop in ``env.py`` may call
+     :meth:`.EnvironmentContext.configure` and
+     :meth:`.EnvironmentContext.run_migrations` for each tenant on a
+     single connection; see :ref:`cookbook_tenant_version_table`.
+
+     .. versionadded:: 1.19.2
+
+     .. seealso::
+
+        :meth:`.MigrationContext.get_tenant_heads`
+
+    :param version_table_tenant_column: name of the column holding the
+     tenant name in the version table, when
+     :paramref:`.EnvironmentContext.configure.version_table_tenant` is
+     used.  Defaults to ``tenant_id``.
+
+     .. versionadded:: 1.19.2
+
+    :param profile_file: path of a file to which a timing report of the
+     migrations run is written, when the :class:`.EnvironmentContext`
+     is exited.  For each migration, the report includes the time
+     taken, the number and time of the statements emitted through the
+     :class:`.MigrationContext`, the SQL and time of each of these
+     statements, and the remaining time, spent in Python.  Changes to
+     the version table aren't included.  The report is written as CSV,
+     with one row per migration, if the path ends with ``.csv``, and
+     otherwise as JSON.  Also available as the ``--profile`` option of
+     the ``upgrade`` and ``downgrade`` commands.
+
+     .. versionadded:: 1.19.2
+
+     .. seealso::
+
+        :class:`.MigrationProfiler`
+
+    :param version_history_table: name of a table, created if it doesn't
+     exist in the schema of the version table, to which a row is
+     appended for each migration run.  The row holds the revision, the
+     direction, the UTC start and end timestamps, the duration in
+     seconds, the host name, the Alembic version and the outcome of the
+     migration; the direction of a ``stamp`` is recorded as ``"stamp"``.
+     The row is written in the same transaction as the
+     migration, so that it's committed only along with it.  When a
+     migration fails, a row with the outcome ``"failed"`` is written
+     only if the migration's transaction wasn't part of an enclosing
+     transaction, which would be rolled back, e.g. when
+     :paramref:`.EnvironmentContext.configure.transaction_per_migration`
+     is used.  Not used in "offline" mode.
+
+     .. versionadded:: 1.19.2
+
     :param output_buffer: a file-like object that will be used
      for textual output
      when the ``--sql`` option is used to generate SQL scripts.
@@ -516,6 +626,51 @@ def configure(
 
         :paramref:`.EnvironmentContext.configure.include_object`
 
+    :param reflection_workers: when set to a number greater than one,
+     and autogenerate compares more than one schema as a result of
+     :paramref:`.EnvironmentContext.configure.include_schemas`, the
+     tables of each schema are reflected in a separate thread, using up
+     to this many threads at once.  Each thread checks out its own
+     connection from the :class:`~sqlalchemy.engine.Engine` of the
+     connection passed to :meth:`.EnvironmentContext.configure`; the
+     comparison itself, as well as the
+     :paramref:`.EnvironmentContext.configure.include_name` hook, still
+     run on the calling thread, in the same order as without this
+     option.  As the other connections don't take part in the
+     transaction of the migration connection, uncommitted changes on
+     that connection aren't seen.  The engine must allow several
+     connections at once, so this is not suitable for e.g. a SQLite
+     ``:memory:`` database.  Requires SQLAlchemy 2.0 or greater.
+
+     .. versionadded:: 1.19.2
+
+    :param reflection_snapshot_file: path to a file where autogenerate
+     stores the schema it reflected from the database, as a
+     :class:`.SchemaSnapshot`, along with a fingerprint of the database
+     schema.  When the file exists and the fingerprint of the database
+     hasn't changed since it was written, autogenerate, as well as
+     :func:`.compare_metadata` and the ``alembic check`` command, use
+     the snapshot rather than reflecting the database again.  The
+     fingerprint is provided by
+     :meth:`.DefaultImpl.reflection_fingerprint`, which is implemented
+     for SQLite, using the ``schema_version`` of each attached database,
+     and for PostgreSQL, using the row versions of the system catalogs;
+     for other backends the option has no effect.  Tables not found in
+     the snapshot are reflected as usual.  Requires SQLAlchemy 2.0 or
+     greater.
+
+     The snapshot is also written after migrations are applied by
+     ``alembic upgrade`` or ``alembic downgrade``, including the
+     revisions present in the database.  When :meth:`.configure` is
+     then called without a ``connection`` in "online" mode, e.g. with
+     only ``url`` or ``dialect_name``, autogenerate runs against the
+     snapshot in place of the database, so that
+     ``alembic revision --autogenerate`` needs no database; the
+     current revisions are those stored in the snapshot, and running
+     migrations raises an error.
+
+     .. versionadded:: 1.19.2
+
     :param render_item: Callable that can be used to override how
      any schema item, i.e. column, constraint, type,
      etc., is rendered for autogenerate.  The callable receives a
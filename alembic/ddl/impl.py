@@ -6,6 +6,7 @@ from __future__ import annotations
 from collections.abc import Iterable
 from collections.abc import Mapping
 from collections.abc import Sequence
+from contextlib import nullcontext
 import logging
 import re
 from typing import Any
@@ -15,6 +16,9 @@ from typing import TYPE_CHECKING
 
 from sqlalchemy import cast
 from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Float
+from sqlalchemy import Integer
 from sqlalchemy import MetaData
 from sqlalchemy import PrimaryKeyConstraint
 from sqlalchemy import schema
@@ -150,6 +154,7 @@ class DefaultImpl(metaclass=ImplMeta):
         version_table: str,
         version_table_schema: str | None,
         version_table_pk: bool,
+        version_table_tenant_column: str | None = None,
         **kw: Any,
     ) -> Table:
         """Generate a :class:`.Table` object which will be used as the
@@ -159,9 +164,14 @@ class DefaultImpl(metaclass=ImplMeta):
         structure for this :class:`.Table`; requirements are only that it
         be named based on the ``version_table`` parameter and contains
         at least a single string-holding column named ``version_num``.
+        When the ``version_table_tenant`` option is used, the
+        ``version_table_tenant_column`` parameter is passed, and the table
+        must also contain a string-holding column of that name.
 
         .. versionadded:: 1.14
 
+        .. versionchanged:: 1.19.2 added ``version_table_tenant_column``
+
         """
         vt = Table(
             version_table,
@@ -169,15 +179,58 @@ class DefaultImpl(metaclass=ImplMeta):
             Column("version_num", String(32), nullable=False),
             schema=version_table_schema,
         )
+        pk_cols = ["version_num"]
+        if version_table_tenant_column is not None:
+            vt.append_column(
+                Column(
+                    version_table_tenant_column, String(128), nullable=False
+                )
+            )
+            pk_cols.insert(0, version_table_tenant_column)
         if version_table_pk:
             vt.append_constraint(
-                PrimaryKeyConstraint(
-                    "version_num", name=f"{version_table}_pkc"
-                )
+                PrimaryKeyConstraint(*pk_cols, name=f"{version_table}_pkc")
             )
 
         return vt
 
+    def version_history_table_impl(
+        self,
+        *,
+        version_history_table: str,
+        version_table_schema: str | None,
+        version_table_tenant_column: str | None = None,
+        **kw: Any,
+    ) -> Table:
+        """Generate a :class:`.Table` object which will be used as the
+        structure for the version history table, when the
+        ``version_history_table`` option is used.
+
+        Third party dialects may override this hook to provide an alternate
+        structure for this :class:`.Table`, which must contain at least the
+        columns of the default structure, other than ``id``.
+
+        .. versionadded:: 1.19.2
+
+        """
+        vt = Table(
+            version_history_table,
+            MetaData(),
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            Column("revision", String(255), nullable=False),
+            Column("direction", String(16), nullable=False),
+            Column("started_at", DateTime, nullable=False),
+            Column("finished_at", DateTime, nullable=False),
+            Column("duration", Float, nullable=False),
+            Column("outcome", String(16), nullable=False),
+            Column("hostname", String(255)),
+            Column("alembic_version", String(32)),
+            schema=version_table_schema,
+        )
+        if version_table_tenant_column is not None:
+            vt.append_column(Column(version_table_tenant_column, String(128)))
+        return vt
+
     def requires_recreate_in_batch(
         self, batch_op: BatchOperationsImpl
     ) -> bool:
@@ -246,10 +299,17 @@ class DefaultImpl(metaclass=ImplMeta):
                     "Can't send params and multiparams at the same time"
                 )
 
-            if multiparams:
-                return conn.execute(construct, multiparams)
-            else:
-                return conn.execute(construct, params)
+            profiler = self.context_opts.get("profiler")
+            timer = (
+                profiler.statement(construct, self.dialect)
+                if profiler is not None
+                else nullcontext()
+            )
+            with timer:
+                if multiparams:
+                    return conn.execute(construct, multiparams)
+                else:
+                    return conn.execute(construct, params)
 
     def execute(
         self,
@@ -680,6 +740,21 @@ class DefaultImpl(metaclass=ImplMeta):
 
         """
 
+    def reflection_fingerprint(self) -> str | None:
+        """Return a string that changes whenever the schema of the
+        database changes, or None if the backend doesn't provide one.
+
+        This is used by the
+        :paramref:`.EnvironmentContext.configure.reflection_snapshot_file`
+        parameter to determine if the snapshot of the reflected schema is
+        still current, and should be cheap to compute compared to
+        reflecting the schema.
+
+        .. versionadded:: 1.19.2
+
+        """
+        return None
+
     def start_migrations(self) -> None:
         """A hook called when :meth:`.EnvironmentContext.run_migrations`
         is called.
@@ -40,6 +40,7 @@ from .impl import ComparisonResult
 from .impl import DefaultImpl
 from .. import util
 from ..autogenerate import render
+from ..autogenerate.snapshot import SnapshotInspector
 from ..operations import ops
 from ..operations import schemaobj
 from ..operations.base import BatchOperations
@@ -146,7 +147,12 @@ class PostgresqlImpl(DefaultImpl):
         # TODO: this seems quite a bad idea for a default that's a SQL
         # function!   SQL functions are not deterministic!
         conn = self.connection
-        assert conn is not None
+        if conn is None:
+            # e.g. autogenerate against a schema snapshot; compare the SQL
+            # text, as there's no database to evaluate the defaults
+            return conn_col_default != str(
+                metadata_default.compile(dialect=self.dialect)
+            )
         return not conn.scalar(
             select(literal_column(conn_col_default) == metadata_default)
         )
@@ -204,6 +210,46 @@ class PostgresqlImpl(DefaultImpl):
             **kw,
         )
 
+    def reflection_fingerprint(self) -> str | None:
+        # the xmin of a catalog row changes whenever the row is updated,
+        # and rows are added or removed as objects are created or dropped
+        assert self.connection is not None
+        return self.connection.execute(
+            text(
+                "select current_database() || ':' || "
+                "md5(coalesce(string_agg(k, ',' order by k), '')) from ("
+                "select 'n' || n.oid || ':' || n.xmin::text as k "
+                "from pg_catalog.pg_namespace n "
+                "union all "
+                "select 'c' || c.oid || ':' || c.xmin::text "
+                "from pg_catalog.pg_class c "
+                "union all "
+                "select 'a' || a.attrelid || '.' || a.attnum || ':' || "
+                "a.xmin::text from pg_catalog.pg_attribute a "
+                "join pg_catalog.pg_class c on c.oid = a.attrelid "
+                "join pg_catalog.pg_namespace n on n.oid = c.relnamespace "
+                "where a.attnum > 0 and n.nspname not in "
+                "('pg_catalog', 'information_schema') "
+                "and n.nspname not like 'pg_toast%' "
+                "union all "
+                "select 'k' || o.oid || ':' || o.xmin::text "
+                "from pg_catalog.pg_constraint o "
+                "union all "
+                "select 'i' || i.indexrelid || ':' || i.xmin::text "
+                "from pg_catalog.pg_index i "
+                "union all "
+                "select 'f' || f.oid || ':' || f.xmin::text "
+                "from pg_catalog.pg_attrdef f "
+                "union all "
+                "select 'd' || d.objoid || '.' || d.objsubid || ':' || "
+                "d.xmin::text from pg_catalog.pg_description d "
+                "union all "
+                "select 'e' || e.oid || ':' || e.xmin::text "
+                "from pg_catalog.pg_enum e"
+                ") as catalog_rows"
+            )
+        ).scalar()
+
     def autogen_column_reflect(self, inspector, table, column_info):
         if column_info.get("default") and isinstance(
             column_info["type"], (INTEGER, BIGINT)
@@ -211,7 +257,14 @@ class PostgresqlImpl(DefaultImpl):
             seq_match = re.match(
                 r"nextval\('(.+?)'::regclass\)", column_info["default"]
             )
-            if seq_match:
+            if seq_match and isinstance(inspector, SnapshotInspector):
+                # there's no database to look up the owner of the
+                # sequence; assume the name PostgreSQL gives to the
+                # sequence of a SERIAL
+                seqname = seq_match.group(1).split(".")[-1].strip('"')
+                if seqname == "%s_%s_seq" % (table.name, column_info["name"]):
+                    del column_info["default"]
+            elif seq_match:
                 info = sqla_compat._exec_on_inspector(
                     inspector,
                     text(
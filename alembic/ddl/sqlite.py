@@ -157,6 +157,25 @@ class SQLiteImpl(DefaultImpl):
         ):
             column_info["default"] = "(%s)" % (column_info["default"],)
 
+    def reflection_fingerprint(self) -> str | None:
+        # the schema_version of each attached database is incremented by
+        # SQLite whenever its schema changes
+        assert self.connection is not None
+        quote = self.dialect.identifier_preparer.quote_identifier
+        return ";".join(
+            "%s:%s:%s"
+            % (
+                name,
+                file_,
+                self.connection.exec_driver_sql(
+                    "PRAGMA %s.schema_version" % quote(name)
+                ).scalar(),
+            )
+            for _, name, file_ in self.connection.exec_driver_sql(
+                "PRAGMA database_list"
+            ).fetchall()
+        )
+
     def render_ddl_sql_expr(
         self, expr: ClauseElement, is_server_default: bool = False, **kw
     ) -> str:
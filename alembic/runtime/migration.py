@@ -6,16 +6,29 @@ from __future__ import annotations
 from collections.abc import Collection
 from collections.abc import Iterable
 from collections.abc import Iterator
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from contextlib import nullcontext
+import copy
+import datetime
+import itertools
 import logging
+import operator
+import os
+import socket
 import sys
+import threading
+import time
 from typing import Any
 from typing import Callable
 from typing import cast
+from typing import NamedTuple
 from typing import Optional
 from typing import TYPE_CHECKING
 
+from sqlalchemy import bindparam
+from sqlalchemy import exc as sqla_exc
 from sqlalchemy import literal_column
 from sqlalchemy import select
 from sqlalchemy.engine import Engine
@@ -35,8 +48,13 @@ if TYPE_CHECKING:
     from sqlalchemy.engine.base import Transaction
     from sqlalchemy.engine.mock import MockConnection
     from sqlalchemy.sql import Executable
+    from sqlalchemy.sql import Select
+    from sqlalchemy.sql.elements import ColumnElement
+    from sqlalchemy.sql.schema import Table
 
     from .environment import EnvironmentContext
+    from .profiling import MigrationProfiler
+    from ..autogenerate.snapshot import SchemaSnapshot
     from ..config import Config
     from ..script.base import Script
     from ..script.base import ScriptDirectory
@@ -141,7 +159,14 @@ class MigrationContext:
             "transaction_per_migration", False
         )
         self.on_version_apply_callbacks = opts.get("on_version_apply", ())
+        self._coalesce_version_writes = opts.get(
+            "coalesce_version_writes", False
+        )
+        self._parallel_branch_workers: int = (
+            opts.get("parallel_branch_workers") or 0
+        )
         self._transaction: Transaction | None = None
+        self._head_maintainer: HeadMaintainer | None = None
 
         if as_sql:
             self.connection = cast(
@@ -155,6 +180,25 @@ class MigrationContext:
                 sqla_compat._get_connection_in_transaction(connection)
             )
 
+        # without a connection in "online" mode, autogenerate may run
+        # against a schema snapshot in place of the database
+        self._snapshot_path: str | None = (
+            opts.get("reflection_snapshot_file")
+            if connection is None and not as_sql
+            else None
+        )
+
+        self._version_tenant: str | None = opts.get("version_table_tenant")
+        self._version_tenant_column: str = opts.get(
+            "version_table_tenant_column", "tenant_id"
+        )
+        if self._version_tenant is not None:
+            if as_sql:
+                raise util.CommandError(
+                    "The version_table_tenant option can't be used "
+                    "in --sql mode"
+                )
+
         self._migrations_fn: None | (Callable[..., Iterable[RevisionStep]]) = (
             opts.get("fn")
         )
@@ -185,6 +229,12 @@ class MigrationContext:
         self.version_table_schema = version_table_schema = opts.get(
             "version_table_schema", None
         )
+        if self._version_tenant is not None and version_table_schema is None:
+            # the version table is shared by all tenants, so it's given an
+            # explicit schema that the schema_translate_map doesn't apply to
+            self.version_table_schema = version_table_schema = (
+                dialect.default_schema_name
+            )
 
         self._start_from_rev: str | None = opts.get("starting_rev")
         self.impl = ddl.DefaultImpl.get_by_dialect(dialect)(
@@ -196,11 +246,31 @@ class MigrationContext:
             opts,
         )
 
-        self._version = self.impl.version_table_impl(
-            version_table=version_table,
-            version_table_schema=version_table_schema,
-            version_table_pk=opts.get("version_table_pk", True),
-        )
+        if self._version_tenant is not None:
+            self._version = self.impl.version_table_impl(
+                version_table=version_table,
+                version_table_schema=version_table_schema,
+                version_table_pk=opts.get("version_table_pk", True),
+                version_table_tenant_column=self._version_tenant_column,
+            )
+        else:
+            self._version = self.impl.version_table_impl(
+                version_table=version_table,
+                version_table_schema=version_table_schema,
+                version_table_pk=opts.get("version_table_pk", True),
+            )
+
+        self._version_history: Table | None = None
+        if opts.get("version_history_table") and not as_sql:
+            self._version_history = self.impl.version_history_table_impl(
+                version_history_table=opts["version_history_table"],
+                version_table_schema=version_table_schema,
+                version_table_tenant_column=(
+                    self._version_tenant_column
+                    if self._version_tenant is not None
+                    else None
+                ),
+            )
 
         log.info("Context impl %s.", self.impl.__class__.__name__)
         if self.as_sql:
@@ -317,6 +387,11 @@ class MigrationContext:
         """
         _in_connection_transaction = self._in_connection_transaction()
 
+        if self._head_maintainer is not None:
+            # the transaction is about to be committed; write out version
+            # changes that have been deferred up until now
+            self._head_maintainer.flush()
+
         if self.impl.transactional_ddl and self.as_sql:
             self.impl.emit_commit()
 
@@ -408,7 +483,7 @@ class MigrationContext:
 
         """
 
-        if self._in_external_transaction:
+        if self._in_external_transaction or self._snapshot_path is not None:
             return nullcontext()
 
         if self.impl.transactional_ddl:
@@ -520,6 +595,8 @@ class MigrationContext:
                     if sfr not in (None, "base")
                 ]
             return util.to_tuple(start_from_rev, default=())
+        elif self._schema_snapshot is not None:
+            return self._schema_snapshot.heads or ()
         else:
             if self._start_from_rev:
                 raise util.CommandError(
@@ -532,17 +609,169 @@ class MigrationContext:
         return tuple(
             row[0]
             for row in self.connection.execute(
-                select(self._version.c.version_num)
+                select(self._version.c.version_num).where(
+                    *self._version_tenant_criteria
+                )
             )
         )
 
+    def get_heads_status(
+        self, script_directory: ScriptDirectory
+    ) -> HeadsStatus:
+        """Compare the head versions present in the target database with
+        the head revisions of the given :class:`.ScriptDirectory`.
+
+        This is intended to be used as a lightweight check, such as a
+        readiness probe, that a database is up to date, without running
+        ``env.py``::
+
+            from alembic.config import Config
+            from alembic.runtime.migration import MigrationContext
+            from alembic.script import ScriptDirectory
+
+            script = ScriptDirectory.from_config(Config("alembic.ini"))
+
+            with engine.connect() as connection:
+                context = MigrationContext.configure(connection)
+                status = context.get_heads_status(script)
+                if not status.is_current:
+                    print("missing revisions: %s" % (status.missing,))
+
+        The version table is read with a single SELECT; unlike
+        :meth:`.MigrationContext.get_current_heads`, the existence of the
+        table is only checked if that SELECT fails.  If the revisions of the
+        :class:`.ScriptDirectory` haven't been loaded yet, their identifiers
+        are read from the source of each revision file, as with the
+        ``parse_revision_headers`` option, rather than by importing them;
+        the :class:`.ScriptDirectory` itself is left unchanged, so that
+        this is repeated on each call.  Configuring ``revision_index_file``
+        reduces the time taken further.
+
+        .. versionadded:: 1.19.2
+
+        """
+        current_heads = self._select_current_heads()
+
+        heads = script_directory._get_heads_from_headers()
+        return HeadsStatus(current_heads, heads)
+
+    def _select_current_heads(self) -> tuple[str, ...]:
+        rows = self._select_versions(
+            select(self._version.c.version_num).where(
+                *self._version_tenant_criteria
+            )
+        )
+        return tuple(row[0] for row in rows)
+
+    def _select_versions(self, stmt: Select[Any]) -> Sequence[Sequence[Any]]:
+        """Run a SELECT against the version table, returning no rows if the
+        table doesn't exist.
+
+        The existence of the table is only checked if the SELECT fails.
+
+        """
+        assert self.connection is not None
+        connection = self.connection
+        in_transaction = sqla_compat._get_connection_in_transaction(connection)
+        try:
+            if in_transaction:
+                # a failed statement would otherwise spoil the enclosing
+                # transaction on some backends
+                with connection.begin_nested():
+                    rows = connection.execute(stmt).all()
+            else:
+                rows = connection.execute(stmt).all()
+        except sqla_exc.DBAPIError:
+            if not in_transaction:
+                sqla_compat._safe_rollback_connection_transaction(connection)
+            if self._has_version_table():
+                raise
+            return ()
+        return rows
+
     def _ensure_version_table(self, purge: bool = False) -> None:
         with sqla_compat._ensure_scope_for_ddl(self.connection):
             assert self.connection is not None
             self._version.create(self.connection, checkfirst=True)
+            if self._version_history is not None:
+                self._version_history.create(self.connection, checkfirst=True)
             if purge:
                 assert self.connection is not None
-                self.connection.execute(self._version.delete())
+                self.connection.execute(
+                    self._version.delete().where(
+                        *self._version_tenant_criteria
+                    )
+                )
+
+    @util.memoized_property
+    def _version_tenant_criteria(self) -> tuple[ColumnElement[bool], ...]:
+        if self._version_tenant is None:
+            return ()
+        return (
+            self._version.c[self._version_tenant_column]
+            == self._version_tenant,
+        )
+
+    @util.memoized_property
+    def _version_tenant_values(self) -> dict[str, str]:
+        if self._version_tenant is None:
+            return {}
+        return {self._version_tenant_column: self._version_tenant}
+
+    def get_tenant_heads(self) -> dict[str, tuple[str, ...]]:
+        """Return the current heads of every tenant in the version table
+        shared by tenants, read with a single SELECT.
+
+        The version table is located as with the ``version_table_tenant``
+        option, with the tenant column named by the
+        ``version_table_tenant_column`` option; the ``version_table_tenant``
+        option itself isn't needed, and is otherwise ignored.  Tenants with
+        no rows in the version table aren't included.  If the version table
+        doesn't exist, an empty dictionary is returned.
+
+        .. versionadded:: 1.19.2
+
+        """
+        version = self._tenant_version
+        tenant_col = version.c[self._version_tenant_column]
+        rows = self._select_versions(
+            select(tenant_col, version.c.version_num).order_by(
+                tenant_col, version.c.version_num
+            )
+        )
+        return {
+            tenant: tuple(row[1] for row in tenant_rows)
+            for tenant, tenant_rows in itertools.groupby(
+                rows, key=operator.itemgetter(0)
+            )
+        }
+
+    @util.memoized_property
+    def _tenant_version(self) -> Table:
+        if self._version_tenant is not None:
+            return self._version
+        return self.impl.version_table_impl(
+            version_table=self.version_table,
+            version_table_schema=(
+                self.version_table_schema or self.dialect.default_schema_name
+            ),
+            version_table_pk=self.opts.get("version_table_pk", True),
+            version_table_tenant_column=self._version_tenant_column,
+        )
+
+    @util.memoized_property
+    def _schema_snapshot(self) -> SchemaSnapshot | None:
+        if self._snapshot_path is None:
+            return None
+
+        from ..autogenerate.snapshot import SchemaSnapshot
+
+        if not os.path.exists(self._snapshot_path):
+            raise util.CommandError(
+                "No database connection, and schema snapshot file %s "
+                "does not exist" % self._snapshot_path
+            )
+        return SchemaSnapshot.load(self._snapshot_path, self.dialect)
 
     def _has_version_table(self) -> bool:
         assert self.connection is not None
@@ -588,8 +817,22 @@ class MigrationContext:
 
         """
         self.impl.start_migrations()
+        assert self._migrations_fn is not None
+
+        if self._snapshot_path is not None:
+            # e.g. "alembic revision --autogenerate" against a schema
+            # snapshot; there's no database to migrate
+            for step in self._migrations_fn(self.get_current_heads(), self):
+                raise util.CommandError(
+                    "Can't run migrations without a database connection; "
+                    "the reflection_snapshot_file option may only be used "
+                    "without a connection for autogenerate"
+                )
+            return
 
         heads: tuple[str, ...]
+        steps: Iterable[RevisionStep] | None = None
+        chains: list[list[RevisionStep]] | None = None
         if self.purge:
             if self.as_sql:
                 raise util.CommandError("Can't use --purge with --sql mode")
@@ -598,15 +841,79 @@ class MigrationContext:
         else:
             heads = self.get_current_heads()
 
+            if self._parallel_branch_workers > 1 and not self.as_sql:
+                # the plan is needed up front to know if it can be split
+                steps = list(self._migrations_fn(heads, self))
+                chains = _independent_chains(steps)
+
             dont_mutate = self.opts.get("dont_mutate", False)
 
-            if not self.as_sql and not heads and not dont_mutate:
-                self._ensure_version_table()
+            if (
+                not self.as_sql
+                and not dont_mutate
+                # the history table may be enabled for an existing database
+                and (not heads or self._version_history is not None)
+            ):
+                if chains:
+                    # the tables must be committed before they're used by
+                    # the connections of the parallel workers
+                    assert self.connection is not None
+                    with self.connection.engine.begin() as connection:
+                        self._version.create(connection, checkfirst=True)
+                        if self._version_history is not None:
+                            self._version_history.create(
+                                connection, checkfirst=True
+                            )
+                else:
+                    self._ensure_version_table()
+
+        head_maintainer = self._head_maintainer = HeadMaintainer(
+            self,
+            heads,
+            coalesce=self._coalesce_version_writes
+            and not self.as_sql
+            and self.impl.transactional_ddl
+            and not self._transaction_per_migration
+            and not chains,
+        )
 
-        head_maintainer = HeadMaintainer(self, heads)
+        applied = bool(chains)
+        try:
+            if chains:
+                self._run_parallel_chains(chains, head_maintainer, kw)
+            else:
+                if steps is None:
+                    steps = self._migrations_fn(heads, self)
+                for step in steps:
+                    self._run_step(step, head_maintainer, kw)
+                    applied = True
 
-        assert self._migrations_fn is not None
-        for step in self._migrations_fn(heads, self):
+            head_maintainer.flush()
+        finally:
+            self._head_maintainer = None
+
+        snapshot_path = self.opts.get("reflection_snapshot_file")
+        if applied and snapshot_path and not self.as_sql:
+            from ..autogenerate.snapshot import _write_snapshot_file
+
+            _write_snapshot_file(self, snapshot_path)
+
+        # NOTE: offline ("--sql") mode intentionally does not emit a DROP
+        # of the version table when ending at base.  Online mode never drops
+        # the version table (e.g. ``downgrade base`` only deletes its row),
+        # so dropping it in offline mode only was an inconsistency present
+        # since the version table was first introduced.  See #1822.
+
+    def _run_step(
+        self,
+        step: RevisionStep,
+        head_maintainer: HeadMaintainer,
+        kw: dict[str, Any],
+        version_lock: ContextManager[Any] = nullcontext(),
+    ) -> None:
+        started_at = _utcnow()
+        start = time.perf_counter()
+        try:
             with self.begin_transaction(_per_migration=True):
                 if self.as_sql and not head_maintainer.heads:
                     # for offline mode, include a CREATE TABLE from
@@ -618,27 +925,153 @@ class MigrationContext:
                     self.impl.static_output(
                         "-- Running %s" % (step.short_log,)
                     )
-                step.migration_fn(**kw)
+                profiler: MigrationProfiler | None = self.opts.get("profiler")
+                with (
+                    profiler.step(step)
+                    if profiler is not None
+                    else nullcontext()
+                ):
+                    step.migration_fn(**kw)
 
                 # previously, we wouldn't stamp per migration
                 # if we were in a transaction, however given the more
                 # complex model that involves any number of inserts
-                # and row-targeted updates and deletes, it's simpler for now
-                # just to run the operations on every version
-                head_maintainer.update_to_step(step)
-                for callback in self.on_version_apply_callbacks:
-                    callback(
-                        ctx=self,
-                        step=step.info,
-                        heads=set(head_maintainer.heads),
-                        run_args=kw,
+                # and row-targeted updates and deletes, it's simpler for
+                # now just to run the operations on every version, unless
+                # coalesce_version_writes is set
+                with version_lock:
+                    head_maintainer.update_to_step(step)
+                    for callback in self.on_version_apply_callbacks:
+                        callback(
+                            ctx=self,
+                            step=step.info,
+                            heads=set(head_maintainer.heads),
+                            run_args=kw,
+                        )
+
+                if self._version_history is not None:
+                    # written in the same transaction as the migration
+                    self._record_history(step, started_at, start, "success")
+        except Exception:
+            if self._version_history is not None:
+                self._record_failed_step(step, started_at, start)
+            raise
+
+    def _record_history(
+        self,
+        step: MigrationStep,
+        started_at: datetime.datetime,
+        start: float,
+        outcome: str,
+    ) -> None:
+        from .. import __version__
+
+        assert self._version_history is not None
+        self.impl._exec(
+            self._version_history.insert().values(
+                revision=", ".join(
+                    step.to_revisions_no_deps
+                    if step.is_upgrade
+                    else step.from_revisions_no_deps
+                ),
+                direction=(
+                    "stamp"
+                    if isinstance(step, StampStep)
+                    else "upgrade" if step.is_upgrade else "downgrade"
+                ),
+                started_at=started_at,
+                finished_at=_utcnow(),
+                duration=time.perf_counter() - start,
+                outcome=outcome,
+                hostname=socket.gethostname(),
+                alembic_version=__version__,
+                **self._version_tenant_values,
+            )
+        )
+
+    def _record_failed_step(
+        self, step: MigrationStep, started_at: datetime.datetime, start: float
+    ) -> None:
+        assert self.connection is not None
+        if self._in_external_transaction or (
+            sqla_compat._get_connection_in_transaction(self.connection)
+        ):
+            # the row would be rolled back along with the enclosing
+            # transaction
+            return
+        try:
+            with self.connection.begin():
+                self._record_history(step, started_at, start, "failed")
+        except Exception as err:
+            log.warning("Could not record failed migration %s: %s", step, err)
+
+    def _run_parallel_chains(
+        self,
+        chains: list[list[RevisionStep]],
+        head_maintainer: HeadMaintainer,
+        kw: dict[str, Any],
+    ) -> None:
+        from ..operations import Operations
+        from .environment import EnvironmentContext
+
+        assert self.connection is not None
+        engine = self.connection.engine
+        execution_options = self.connection.get_execution_options()
+
+        # each chain runs in its own thread, on its own connection and in
+        # its own transaction per migration; only the version table
+        # updates, which touch heads shared between chains, are serialised
+        version_lock = threading.Lock()
+        failed = threading.Event()
+        opts = dict(self.opts, transaction_per_migration=True)
+
+        def run_chain(chain: list[RevisionStep]) -> None:
+            with engine.connect() as connection:
+                if execution_options:
+                    connection = connection.execution_options(
+                        **execution_options
                     )
+                context = MigrationContext(
+                    self.dialect, connection, opts, self.environment_context
+                )
+                context.impl.start_migrations()
+                chain_maintainer = HeadMaintainer(context, ())
+                chain_maintainer.heads = head_maintainer.heads
+                operations.set(Operations(context))
+                if self.environment_context is not None:
+                    # "context" within the migration scripts refers to
+                    # the connection of this chain
+                    environment_context = copy.copy(self.environment_context)
+                    environment_context._migration_context = context
+                    environment_contexts.set(environment_context)
+                for step in chain:
+                    if failed.is_set():
+                        return
+                    try:
+                        context._run_step(
+                            step, chain_maintainer, kw, version_lock
+                        )
+                    except BaseException:
+                        failed.set()
+                        raise
 
-        # NOTE: offline ("--sql") mode intentionally does not emit a DROP
-        # of the version table when ending at base.  Online mode never drops
-        # the version table (e.g. ``downgrade base`` only deletes its row),
-        # so dropping it in offline mode only was an inconsistency present
-        # since the version table was first introduced.  See #1822.
+        log.info(
+            "Running %d independent branches with %d workers",
+            len(chains),
+            self._parallel_branch_workers,
+        )
+        with (
+            EnvironmentContext._thread_local_proxy() as environment_contexts,
+            Operations._thread_local_proxy() as operations,
+        ):
+            with ThreadPoolExecutor(
+                max_workers=self._parallel_branch_workers
+            ) as executor:
+                futures = [
+                    executor.submit(run_chain, chain) for chain in chains
+                ]
+            for future in futures:
+                future.result()
 
     def _in_connection_transaction(self) -> bool:
         try:
@@ -703,30 +1136,144 @@ class MigrationContext:
             return None
 
 
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _independent_chains(
+    steps: list[RevisionStep],
+) -> list[list[RevisionStep]] | None:
+    """Split an upgrade plan into chains of steps that share no revisions,
+    either as ancestors or through ``depends_on``, among the steps to be run.
+
+    The steps of each chain retain the order of the plan.  Returns None
+    if the plan is not made up of upgrade steps only, or if it can't be
+    split into more than one chain.
+
+    """
+    # fn may also produce StampStep objects, e.g. for "alembic stamp"
+    if not all(
+        isinstance(step, RevisionStep) and step.is_upgrade for step in steps
+    ):
+        return None
+
+    index = {step.revision.revision: idx for idx, step in enumerate(steps)}
+    parent = list(range(len(steps)))
+
+    def find(idx: int) -> int:
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    for idx, step in enumerate(steps):
+        for down_id in step.revision._all_down_revisions:
+            if down_id in index:
+                parent[find(idx)] = find(index[down_id])
+
+    chains: dict[int, list[RevisionStep]] = {}
+    for idx, step in enumerate(steps):
+        chains.setdefault(find(idx), []).append(step)
+    if len(chains) < 2:
+        return None
+    return list(chains.values())
+
+
 class HeadMaintainer:
-    def __init__(self, context: MigrationContext, heads: Any) -> None:
+    def __init__(
+        self, context: MigrationContext, heads: Any, coalesce: bool = False
+    ) -> None:
         self.context = context
         self.heads = set(heads)
 
+        # when coalescing, changes to the heads are tracked in memory
+        # only, and the net change is written by flush()
+        self.coalesce = coalesce
+        self._written_heads = set(heads)
+
+    def flush(self) -> None:
+        """Write the net change in heads since the last flush to the
+        version table, if changes are being coalesced."""
+
+        if not self.coalesce:
+            return
+
+        removed = sorted(self._written_heads.difference(self.heads))
+        added = sorted(self.heads.difference(self._written_heads))
+        self._written_heads = set(self.heads)
+
+        for from_, to_ in zip(removed, added):
+            self._emit_update(from_, to_)
+        for version in removed[len(added) :]:
+            self._emit_delete(version)
+        for version in added[len(removed) :]:
+            self._emit_insert(version)
+
+    # in online mode, version numbers are given as bound parameters to the
+    # same three statements for every step, so that they're compiled only
+    # once and the same SQL string is sent for each of them
+
+    @util.memoized_property
+    def _insert_stmt(self) -> Executable:
+        return self.context._version.insert().values(
+            version_num=bindparam("version_num"),
+            **self.context._version_tenant_values,
+        )
+
+    @util.memoized_property
+    def _delete_stmt(self) -> Executable:
+        return self.context._version.delete().where(
+            self.context._version.c.version_num == bindparam("from_version"),
+            *self.context._version_tenant_criteria,
+        )
+
+    @util.memoized_property
+    def _update_stmt(self) -> Executable:
+        return (
+            self.context._version.update()
+            .values(version_num=bindparam("to_version"))
+            .where(
+                self.context._version.c.version_num
+                == bindparam("from_version"),
+                *self.context._version_tenant_criteria,
+            )
+        )
+
     def _insert_version(self, version: str) -> None:
         assert version not in self.heads
         self.heads.add(version)
-
-        self.context.impl._exec(
-            self.context._version.insert().values(
-                version_num=literal_column("'%s'" % version)
+        if not self.coalesce:
+            self._emit_insert(version)
+
+    def _emit_insert(self, version: str) -> None:
+        if self.context.as_sql:
+            self.context.impl._exec(
+                self.context._version.insert().values(
+                    version_num=literal_column("'%s'" % version)
+                )
+            )
+        else:
+            self.context.impl._exec(
+                self._insert_stmt, params={"version_num": version}
             )
-        )
 
     def _delete_version(self, version: str) -> None:
         self.heads.remove(version)
-
-        ret = self.context.impl._exec(
-            self.context._version.delete().where(
-                self.context._version.c.version_num
-                == literal_column("'%s'" % version)
+        if not self.coalesce:
+            self._emit_delete(version)
+
+    def _emit_delete(self, version: str) -> None:
+        if self.context.as_sql:
+            ret = self.context.impl._exec(
+                self.context._version.delete().where(
+                    self.context._version.c.version_num
+                    == literal_column("'%s'" % version)
+                )
+            )
+        else:
+            ret = self.context.impl._exec(
+                self._delete_stmt, params={"from_version": version}
             )
-        )
 
         if (
             not self.context.as_sql
@@ -745,15 +1292,24 @@ class HeadMaintainer:
         assert to_ not in self.heads
         self.heads.remove(from_)
         self.heads.add(to_)
-
-        ret = self.context.impl._exec(
-            self.context._version.update()
-            .values(version_num=literal_column("'%s'" % to_))
-            .where(
-                self.context._version.c.version_num
-                == literal_column("'%s'" % from_)
+        if not self.coalesce:
+            self._emit_update(from_, to_)
+
+    def _emit_update(self, from_: str, to_: str) -> None:
+        if self.context.as_sql:
+            ret = self.context.impl._exec(
+                self.context._version.update()
+                .values(version_num=literal_column("'%s'" % to_))
+                .where(
+                    self.context._version.c.version_num
+                    == literal_column("'%s'" % from_)
+                )
+            )
+        else:
+            ret = self.context.impl._exec(
+                self._update_stmt,
+                params={"from_version": from_, "to_version": to_},
             )
-        )
 
         if (
             not self.context.as_sql
@@ -814,6 +1370,34 @@ class HeadMaintainer:
             self._update_version(from_, to_)
 
 
+class HeadsStatus(NamedTuple):
+    """The result of :meth:`.MigrationContext.get_heads_status`.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    current_heads: tuple[str, ...]
+    """The head versions present in the database."""
+
+    heads: tuple[str, ...]
+    """The head revisions of the script directory."""
+
+    @property
+    def missing(self) -> tuple[str, ...]:
+        """The head revisions of the script directory which are not present
+        in the database."""
+        return tuple(
+            head for head in self.heads if head not in self.current_heads
+        )
+
+    @property
+    def is_current(self) -> bool:
+        """True if the database is at exactly the head revisions of the
+        script directory."""
+        return set(self.current_heads) == set(self.heads)
+
+
 class MigrationInfo:
     """Exposes information about a migration step to a callback listener.
 
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import csv
+import json
+import os
+import re
+import threading
+import time
+from typing import Any
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Dialect
+    from sqlalchemy.sql import Executable
+
+    from .migration import MigrationStep
+
+_SQL_LENGTH = 500
+
+_CSV_FIELDS = [
+    "revision",
+    "direction",
+    "description",
+    "elapsed",
+    "python_elapsed",
+    "db_elapsed",
+    "statement_count",
+    "slowest_statement",
+    "slowest_statement_elapsed",
+]
+
+
+class MigrationProfiler:
+    """Records the time taken by each migration step, and by each statement
+    emitted by the step through the migration context.
+
+    The time of a step that's not spent executing statements is reported
+    as ``python_elapsed``; this includes time spent within the database
+    driver, as well as statements emitted directly on the connection,
+    e.g. via ``op.get_bind().execute()``.
+
+    The profiler is enabled using the
+    :paramref:`.EnvironmentContext.configure.profile_file` parameter, or the
+    ``--profile`` option of the ``upgrade`` and ``downgrade`` commands.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    def __init__(self) -> None:
+        self.steps: list[dict[str, Any]] = []
+        self._local = threading.local()
+
+    @contextmanager
+    def step(self, step: MigrationStep) -> Iterator[None]:
+        statements: list[dict[str, Any]] = []
+        record: dict[str, Any] = {
+            "revision": ", ".join(
+                step.to_revisions_no_deps
+                if step.is_upgrade
+                else step.from_revisions_no_deps
+            ),
+            "direction": "upgrade" if step.is_upgrade else "downgrade",
+            "description": step.short_log,
+            "statements": statements,
+        }
+
+        # steps of independent branches may be run in several threads
+        self._local.statements = statements
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.statements = None
+            db_elapsed = sum(stmt["elapsed"] for stmt in statements)
+            record.update(
+                elapsed=elapsed,
+                db_elapsed=db_elapsed,
+                python_elapsed=elapsed - db_elapsed,
+                statement_count=len(statements),
+            )
+            self.steps.append(record)
+
+    @contextmanager
+    def statement(
+        self, construct: Executable, dialect: Dialect
+    ) -> Iterator[None]:
+        statements = getattr(self._local, "statements", None)
+        if statements is None:
+            # e.g. statements emitted for the version table outside of
+            # any step
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # taken before the statement is described, which may compile it
+            elapsed = time.perf_counter() - start
+            statements.append(
+                {"sql": _describe(construct, dialect), "elapsed": elapsed}
+            )
+
+    def write(self, path: str | os.PathLike[str]) -> None:
+        """Write the report to the given path, as CSV if the path ends with
+        ``.csv``, or otherwise as JSON."""
+
+        if os.fspath(path).lower().endswith(".csv"):
+            with open(path, "w", encoding="utf-8", newline="") as file_:
+                writer = csv.DictWriter(file_, _CSV_FIELDS)
+                writer.writeheader()
+                for record in self.steps:
+                    slowest = max(
+                        record["statements"],
+                        key=lambda stmt: stmt["elapsed"],
+                        default=None,
+                    )
+                    writer.writerow(
+                        {
+                            **{
+                                key: record[key]
+                                for key in _CSV_FIELDS
+                                if key in record
+                            },
+                            "slowest_statement": slowest and slowest["sql"],
+                            "slowest_statement_elapsed": slowest
+                            and slowest["elapsed"],
+                        }
+                    )
+        else:
+            with open(path, "w", encoding="utf-8") as file_:
+                json.dump({"steps": self.steps}, file_, indent=2)
+                file_.write("\n")
+
+
+def _describe(construct: Executable, dialect: Dialect) -> str:
+    try:
+        sql = str(construct.compile(dialect=dialect))  # type: ignore
+    except Exception:
+        return construct.__class__.__name__
+    sql = re.sub(r"\s+", " ", sql).strip()
+    if len(sql) > _SQL_LENGTH:
+        sql = sql[: _SQL_LENGTH - 3] + "..."
+    return sql
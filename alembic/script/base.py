@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import ast
+from collections.abc import Callable
+from collections.abc import Iterable
 from collections.abc import Iterator
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import datetime
+import functools
 import os
 from pathlib import Path
 import re
@@ -15,11 +20,14 @@ from typing import cast
 from typing import Optional
 from typing import TYPE_CHECKING
 
+from typing_extensions import TypedDict
+
 from . import revision
 from . import write_hooks
+from .index import RevisionIndex
+from .plans import PlanCache
 from .. import util
 from ..runtime import migration
-from ..util import compat
 from ..util import not_none
 from ..util.pyfiles import _preserving_path_as_str
 
@@ -44,6 +52,21 @@ _only_source_rev_file = re.compile(r"(?!\.\#|__init__)(.*\.py)$")
 _legacy_rev = re.compile(r"([a-f0-9]+)\.py$")
 _slug_re = re.compile(r"\w+")
 _default_file_template = "%(rev)s_%(slug)s"
+_FileKey = Optional[tuple[int, int]]
+_header_names = frozenset(
+    ["revision", "down_revision", "branch_labels", "depends_on"]
+)
+
+
+class _ScriptHeader(TypedDict):
+    """The identifying values of a revision file, which are enough to
+    place it in the :class:`.RevisionMap` without running the module."""
+
+    revision: str
+    down_revision: _RevIdType | None
+    branch_labels: _RevIdType | None
+    depends_on: _RevIdType | None
+    doc: str
 
 
 class ScriptDirectory:
@@ -80,6 +103,10 @@ class ScriptDirectory:
         messaging_opts: MessagingOptions = cast(
             "MessagingOptions", util.EMPTY_DICT
         ),
+        revision_index_file: str | os.PathLike[str] | None = None,
+        parse_revision_headers: bool = False,
+        revision_load_workers: int | None = None,
+        revision_plan_cache_file: str | os.PathLike[str] | None = None,
     ) -> None:
         self.dir = _preserving_path_as_str(dir)
         self.version_locations = [
@@ -94,6 +121,19 @@ class ScriptDirectory:
         self.hooks = hooks
         self.recursive_version_locations = recursive_version_locations
         self.messaging_opts = messaging_opts
+        self.revision_index_file = (
+            _preserving_path_as_str(revision_index_file)
+            if revision_index_file
+            else None
+        )
+        self.parse_revision_headers = parse_revision_headers
+        self.revision_load_workers = revision_load_workers
+        self.revision_plan_cache_file = (
+            _preserving_path_as_str(revision_plan_cache_file)
+            if revision_plan_cache_file
+            else None
+        )
+        self._loaded_files: dict[Path, tuple[_FileKey, Script | None]] = {}
 
         if not os.access(dir, os.F_OK):
             raise util.CommandError(
@@ -131,25 +171,176 @@ class ScriptDirectory:
         else:
             return [Path(self.dir, "versions").absolute()]
 
-    def _load_revisions(self) -> Iterator[Script]:
+    @util.memoized_property
+    def _revision_index(self) -> RevisionIndex | None:
+        if self.revision_index_file is None:
+            return None
+        return RevisionIndex(self.revision_index_file)
+
+    @util.memoized_property
+    def _plan_cache(self) -> PlanCache:
+        return PlanCache(self.revision_plan_cache_file)
+
+    def _list_revision_files(self, warn: bool = True) -> list[Path]:
         paths = [vers for vers in self._version_locations if vers.exists()]
 
         dupes = set()
+        file_paths = []
         for vers in paths:
-            for file_path in Script._list_py_dir(self, vers):
-                real_path = file_path.resolve()
+            for real_path in Script._list_py_dir(self, vers):
                 if real_path in dupes:
-                    util.warn(
-                        f"File {real_path} loaded twice! ignoring. "
-                        "Please ensure version_locations is unique."
-                    )
+                    if warn:
+                        util.warn(
+                            f"File {real_path} loaded twice! ignoring. "
+                            "Please ensure version_locations is unique."
+                        )
                     continue
                 dupes.add(real_path)
+                file_paths.append(real_path)
+        return file_paths
 
-                script = Script._from_path(self, real_path)
-                if script is None:
-                    continue
-                yield script
+    def _load_scripts(
+        self,
+        file_paths: Sequence[Path],
+        parse_revision_headers: bool | None = None,
+    ) -> Iterable[Script | None]:
+        if parse_revision_headers is None:
+            parse_revision_headers = self.parse_revision_headers
+        from_path = functools.partial(
+            Script._from_path,
+            self,
+            parse_revision_headers=parse_revision_headers,
+        )
+
+        workers = self.revision_load_workers
+        if workers is not None and workers > 1 and len(file_paths) > 1:
+            # files are read and compiled concurrently; executor.map()
+            # returns results in the order of file_paths so that the
+            # revision map is built in the same order as when loading
+            # serially
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(from_path, file_paths))
+        else:
+            return (from_path(real_path) for real_path in file_paths)
+
+    def _load_revisions(self) -> Iterator[Script]:
+        file_paths = self._list_revision_files()
+
+        # files are stat'ed before they're read, so that a change made
+        # while loading is seen by the next refresh()
+        file_keys = [_file_key(real_path) for real_path in file_paths]
+        self._loaded_files = loaded_files = {}
+
+        for real_path, file_key, script in zip(
+            file_paths, file_keys, self._load_scripts(file_paths)
+        ):
+            loaded_files[real_path] = (file_key, script)
+            if script is None:
+                continue
+            yield script
+
+        if self._revision_index is not None:
+            self._revision_index.save(retain=file_paths)
+
+    def _get_heads_from_headers(self) -> tuple[str, ...]:
+        """Return the head revisions, reading the identifiers of each
+        revision file from its source rather than importing it if the
+        revision map hasn't been loaded.
+
+        The revision map itself is left as is.
+
+        """
+        if "_revision_map" in self.revision_map.__dict__:
+            return tuple(self.get_heads())
+
+        def load_revisions() -> Iterator[Script]:
+            file_paths = self._list_revision_files()
+            for script in self._load_scripts(
+                file_paths, parse_revision_headers=True
+            ):
+                if script is not None:
+                    yield script
+
+            if self._revision_index is not None:
+                self._revision_index.save(retain=file_paths)
+
+        return tuple(revision.RevisionMap(load_revisions).heads)
+
+    def refresh(self) -> bool:
+        """Update the revision map with the revision files which have been
+        added, removed or modified since the revisions were loaded.
+
+        This is intended for long-lived processes which keep a
+        :class:`.ScriptDirectory` in memory while new revision files may be
+        deployed.  Files are detected as modified based on their size and
+        modification time.  Only the files which have changed are loaded,
+        and where possible the existing revision map is patched in place,
+        including its heads and bases; changes which affect labeled
+        branches, or which remove revisions that other revisions still
+        refer to, cause the revision map to be rebuilt in full instead.
+
+        If the revision map hasn't yet been loaded, this method does
+        nothing.
+
+        :return: True if any revision files were added, removed or
+         modified.
+
+        .. versionadded:: 1.19.2
+
+        """
+        revision_map = self.revision_map
+        if "_revision_map" not in revision_map.__dict__:
+            return False
+
+        loaded_files = self._loaded_files
+        current = {
+            real_path: _file_key(real_path)
+            for real_path in self._list_revision_files(warn=False)
+        }
+        removed_paths = [path for path in loaded_files if path not in current]
+        new_paths = [
+            path
+            for path, file_key in current.items()
+            if path not in loaded_files or loaded_files[path][0] != file_key
+        ]
+        if not removed_paths and not new_paths:
+            return False
+
+        removed = []
+        added = []
+        for path in removed_paths:
+            _, script = loaded_files.pop(path)
+            if script is not None:
+                removed.append(script.revision)
+
+        for path, script in zip(new_paths, self._load_scripts(new_paths)):
+            old_script = (
+                loaded_files[path][1] if path in loaded_files else None
+            )
+            if (
+                old_script is not None
+                and script is not None
+                and old_script._header_matches(script)
+            ):
+                # same position in the revision graph; only the docstring
+                # or the migration functions have changed
+                old_script._update_from(script)
+                script = old_script
+            else:
+                if old_script is not None:
+                    removed.append(old_script.revision)
+                if script is not None:
+                    added.append(script)
+            loaded_files[path] = (current[path], script)
+
+        if self._revision_index is not None:
+            self._revision_index.save(retain=current)
+
+        if (removed or added) and not revision_map._update(removed, added):
+            # the map was reset and will be rebuilt in full; do so now, so
+            # that errors are reported here
+            revision_map.heads
+        return True
 
     @classmethod
     def from_config(cls, config: Config) -> ScriptDirectory:
@@ -172,6 +363,13 @@ class ScriptDirectory:
         else:
             truncate_slug_length = None
 
+        revision_load_workers: int | None
+        rlw = config.get_alembic_option("revision_load_workers")
+        if rlw is not None:
+            revision_load_workers = int(rlw)
+        else:
+            revision_load_workers = None
+
         prepend_sys_path = config.get_prepend_sys_paths_list()
         if prepend_sys_path:
             sys.path[:0] = prepend_sys_path
@@ -192,6 +390,16 @@ class ScriptDirectory:
             hooks=config.get_hooks_list(),
             recursive_version_locations=rvl,
             messaging_opts=config.messaging_opts,
+            revision_index_file=config.get_alembic_option(
+                "revision_index_file"
+            ),
+            parse_revision_headers=config.get_alembic_boolean_option(
+                "parse_revision_headers"
+            ),
+            revision_load_workers=revision_load_workers,
+            revision_plan_cache_file=config.get_alembic_option(
+                "revision_plan_cache_file"
+            ),
         )
 
     @contextmanager
@@ -409,21 +617,30 @@ class ScriptDirectory:
         return list(self.revision_map.bases)
 
     def _upgrade_revs(
-        self, destination: str, current_rev: str
+        self, destination: str, current_rev: str | tuple[str, ...]
     ) -> list[RevisionStep]:
         with self._catch_revision_errors(
             ancestor="Destination %(end)s is not a valid upgrade "
             "target from current head(s)",
             end=destination,
         ):
-            revs = self.iterate_revisions(
-                destination, current_rev, implicit_base=True
+            scripts = self._plan(
+                "upgrade",
+                current_rev,
+                destination,
+                lambda: reversed(
+                    list(
+                        self.iterate_revisions(
+                            destination, current_rev, implicit_base=True
+                        )
+                    )
+                ),
             )
             return [
                 migration.MigrationStep.upgrade_from_script(
                     self.revision_map, script
                 )
-                for script in reversed(list(revs))
+                for script in scripts
             ]
 
     def _downgrade_revs(
@@ -434,16 +651,66 @@ class ScriptDirectory:
             "target from current head(s)",
             end=destination,
         ):
-            revs = self.iterate_revisions(
-                current_rev, destination, select_for_downgrade=True
+            scripts = self._plan(
+                "downgrade",
+                current_rev,
+                destination,
+                lambda: self.iterate_revisions(
+                    current_rev, destination, select_for_downgrade=True
+                ),
             )
             return [
                 migration.MigrationStep.downgrade_from_script(
                     self.revision_map, script
                 )
-                for script in revs
+                for script in scripts
             ]
 
+    def _plan(
+        self,
+        direction: str,
+        current_rev: _RevIdType | None,
+        destination: _RevIdType | None,
+        fn: Callable[[], Iterable[Script]],
+    ) -> list[Script]:
+        """Return the scripts to be run for an upgrade or downgrade from
+        ``current_rev`` to ``destination``, as produced by ``fn``, using the
+        plan cache where possible.
+
+        """
+        current = util.to_tuple(current_rev, default=())
+        dest = util.to_tuple(destination, default=())
+        if not all(isinstance(rev, str) for rev in current + dest):
+            return list(fn())
+        elif any(
+            revision._relative_destination.match(rev) is not None
+            for rev in dest
+        ):
+            # relative destinations such as "-1" depend on the order of
+            # the current heads, and may warn of that ambiguity
+            return list(fn())
+
+        revision_map = self.revision_map
+        # the plan doesn't depend on the order in which the current heads
+        # are given, which varies with the order rows come back from the
+        # version table
+        key = (
+            revision_map._fingerprint,
+            direction,
+            tuple(sorted(current)),
+            dest,
+        )
+        plan = self._plan_cache.get(key)
+        if plan is not None:
+            return [
+                cast(Script, revision_map.get_revision(rev_id))
+                for rev_id in plan
+            ]
+
+        scripts = list(fn())
+        self._plan_cache.set(key, tuple(script.revision for script in scripts))
+        return scripts
+
     def _stamp_revs(
         self, revision: _RevIdType, heads: _RevIdType
     ) -> list[StampStep]:
@@ -763,6 +1030,10 @@ class ScriptDirectory:
                 % (script.revision, branch_labels, script.path)
             )
         self.revision_map.add_revision(script)
+        self._loaded_files[Path(script.path).resolve()] = (
+            _file_key(Path(script.path)),
+            script,
+        )
         return script
 
     def _rev_path(
@@ -803,25 +1074,35 @@ class Script(revision.Revision):
 
     def __init__(
         self,
-        module: ModuleType,
+        module: ModuleType | None,
         rev_id: str,
         path: str | os.PathLike[str],
+        header: _ScriptHeader | None = None,
     ):
-        self.module = module
+        if module is not None:
+            self.module = module
         self.path = _preserving_path_as_str(path)
+        if header is None:
+            assert module is not None
+            header = _header_from_module(module, rev_id)
+        self._longdoc = header["doc"]
         super().__init__(
             rev_id,
-            module.down_revision,
-            branch_labels=util.to_tuple(
-                getattr(module, "branch_labels", None), default=()
-            ),
-            dependencies=util.to_tuple(
-                getattr(module, "depends_on", None), default=()
-            ),
+            util.to_tuple(header["down_revision"]),
+            branch_labels=util.to_tuple(header["branch_labels"], default=()),
+            dependencies=util.to_tuple(header["depends_on"], default=()),
         )
 
-    module: ModuleType
-    """The Python module representing the actual script itself."""
+    @util.memoized_property
+    def module(self) -> ModuleType:
+        """The Python module representing the actual script itself.
+
+        When the :class:`.Script` was produced from a revision index, the
+        module is imported the first time this attribute is accessed.
+
+        """
+        script_path = self._script_path
+        return util.load_python_file(script_path.parent, script_path.name)
 
     path: str
     """Filesystem path of the script."""
@@ -830,6 +1111,20 @@ class Script(revision.Revision):
     def _script_path(self) -> Path:
         return Path(self.path)
 
+    def _header_matches(self, other: Script) -> bool:
+        return (
+            self.revision == other.revision
+            and self.down_revision == other.down_revision
+            and self._orig_branch_labels == other._orig_branch_labels
+            and self.dependencies == other.dependencies
+        )
+
+    def _update_from(self, other: Script) -> None:
+        self._longdoc = other._longdoc
+        util.memoized_property.reset(self, "module")
+        if "module" in other.__dict__:
+            self.module = other.module
+
     _db_current_indicator: bool | None = None
     """Utility variable which when set will cause string output to indicate
     this is a "current" version in some database"""
@@ -844,15 +1139,7 @@ class Script(revision.Revision):
     def longdoc(self) -> str:
         """Return the docstring given in the script."""
 
-        doc = self.module.__doc__
-        if doc:
-            if hasattr(self.module, "_alembic_source_encoding"):
-                doc = doc.decode(  # type: ignore[attr-defined]
-                    self.module._alembic_source_encoding
-                )
-            return doc.strip()
-        else:
-            return ""
+        return self._longdoc
 
     @property
     def log_entry(self) -> str:
@@ -965,46 +1252,72 @@ class Script(revision.Revision):
     def _list_py_dir(
         cls, scriptdir: ScriptDirectory, path: Path
     ) -> list[Path]:
-        paths = []
-        for root, dirs, files in compat.path_walk(path, top_down=True):
-            if root.name.endswith("__pycache__"):
-                # a special case - we may include these files
-                # if a `sourceless` option is specified
-                continue
+        """Return the resolved paths of all files within a version
+        location, in a deterministic order."""
 
-            for filename in sorted(files):
-                paths.append(root / filename)
-
-            if scriptdir.sourceless:
-                # look for __pycache__
-                py_cache_path = root / "__pycache__"
-                if py_cache_path.exists():
-                    # add all files from __pycache__ whose filename is not
-                    # already in the names we got from the version directory.
-                    # add as relative paths including __pycache__ token
-                    names = {
-                        Path(filename).name.split(".")[0] for filename in files
-                    }
-                    paths.extend(
-                        py_cache_path / pyc
-                        for pyc in py_cache_path.iterdir()
-                        if pyc.name.split(".")[0] not in names
-                    )
+        paths: list[Path] = []
+        if not path.name.endswith("__pycache__"):
+            cls._scan_py_dir(scriptdir, path.resolve(), paths)
+        return paths
 
-            if not scriptdir.recursive_version_locations:
-                break
+    @classmethod
+    def _scan_py_dir(
+        cls, scriptdir: ScriptDirectory, root: Path, paths: list[Path]
+    ) -> None:
+        files = []
+        dirs = []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dirs.append(entry)
+                else:
+                    files.append(entry)
 
-            # the real script order is defined by revision,
-            # but it may be undefined if there are many files with a same
-            # `down_revision`, for a better user experience (ex. debugging),
-            # we use a deterministic order
-            dirs.sort()
+        # root is already resolved, so only files which are themselves
+        # symlinks need to be resolved individually
+        for entry in sorted(files, key=lambda entry: entry.name):
+            paths.append(_resolved_entry(root, entry))
 
-        return paths
+        if scriptdir.sourceless and any(
+            entry.name == "__pycache__" for entry in dirs
+        ):
+            # add all files from __pycache__ whose filename is not
+            # already in the names we got from the version directory.
+            # add as relative paths including __pycache__ token
+            names = {entry.name.split(".")[0] for entry in files}
+            py_cache_path = root / "__pycache__"
+            with os.scandir(py_cache_path) as entries:
+                paths.extend(
+                    _resolved_entry(py_cache_path, entry)
+                    for entry in sorted(entries, key=lambda entry: entry.name)
+                    if entry.name.split(".")[0] not in names
+                )
+
+        if not scriptdir.recursive_version_locations:
+            return
+
+        # the real script order is defined by revision,
+        # but it may be undefined if there are many files with a same
+        # `down_revision`, for a better user experience (ex. debugging),
+        # we use a deterministic order
+        for entry in sorted(dirs, key=lambda entry: entry.name):
+            # symlinked directories are not followed, a special case is
+            # __pycache__, which we may include files from if a
+            # `sourceless` option is specified
+            if entry.is_symlink() or entry.name.endswith("__pycache__"):
+                continue
+            cls._scan_py_dir(scriptdir, root / entry.name, paths)
 
     @classmethod
     def _from_path(
-        cls, scriptdir: ScriptDirectory, path: str | os.PathLike[str]
+        cls,
+        scriptdir: ScriptDirectory,
+        path: str | os.PathLike[str],
+        parse_revision_headers: bool | None = None,
     ) -> Script | None:
 
         path = Path(path)
@@ -1036,6 +1349,20 @@ class Script(revision.Revision):
             if py_exists or is_o and pyc_exists:
                 return None
 
+        index = scriptdir._revision_index
+        header = index.get(path) if index is not None else None
+
+        if parse_revision_headers is None:
+            parse_revision_headers = scriptdir.parse_revision_headers
+        if header is None and parse_revision_headers:
+            if not (is_c or is_o):
+                header = _header_from_source(path)
+            if header is not None and index is not None:
+                index.set(path, header)
+
+        if header is not None:
+            return Script(None, header["revision"], path, header=header)
+
         module = util.load_python_file(dir_, filename)
 
         if not hasattr(module, "revision"):
@@ -1054,4 +1381,108 @@ class Script(revision.Revision):
                 revision = m.group(1)
         else:
             revision = module.revision
-        return Script(module, revision, dir_ / filename)
+
+        header = _header_from_module(module, revision)
+        if index is not None:
+            index.set(path, header)
+        return Script(module, revision, path, header=header)
+
+
+def _file_key(path: Path) -> _FileKey:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _resolved_entry(root: Path, entry: os.DirEntry[str]) -> Path:
+    if entry.is_symlink():
+        return Path(entry.path).resolve()
+    else:
+        return root / entry.name
+
+
+def _header_from_module(module: ModuleType, rev_id: str) -> _ScriptHeader:
+    doc = module.__doc__
+    if doc:
+        if hasattr(module, "_alembic_source_encoding"):
+            doc = doc.decode(  # type: ignore[attr-defined]
+                module._alembic_source_encoding
+            )
+        doc = doc.strip()
+    else:
+        doc = ""
+
+    return {
+        "revision": rev_id,
+        "down_revision": module.down_revision,
+        "branch_labels": getattr(module, "branch_labels", None),
+        "depends_on": getattr(module, "depends_on", None),
+        "doc": doc,
+    }
+
+
+def _header_from_source(path: Path) -> _ScriptHeader | None:
+    """Extract the revision header of a revision file without running it.
+
+    The file is parsed, and the ``revision``, ``down_revision``,
+    ``branch_labels`` and ``depends_on`` identifiers are read from
+    module-level assignments of literal values.   If any of these are
+    assigned in some other way, or ``revision`` / ``down_revision`` are
+    missing, None is returned so that the module is loaded normally.
+
+    """
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    values: dict[str, Any] = {}
+    for stmt in tree.body:
+        target: ast.expr | None
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+            target, value = stmt.targets[0], stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            target, value = stmt.target, stmt.value
+        else:
+            target = None
+
+        if isinstance(target, ast.Name) and target.id in _header_names:
+            try:
+                values[target.id] = ast.literal_eval(value)
+            except (ValueError, TypeError, SyntaxError):
+                return None
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        elif isinstance(stmt, ast.ImportFrom) and any(
+            alias.name == "*" for alias in stmt.names
+        ):
+            return None
+        elif any(
+            (isinstance(node, ast.Name) and node.id in _header_names)
+            or (
+                isinstance(node, ast.alias)
+                and (node.asname or node.name.partition(".")[0])
+                in _header_names
+            )
+            for node in ast.walk(stmt)
+        ):
+            # the name is bound or used in some way we can't evaluate
+            # statically
+            return None
+
+    if (
+        not isinstance(values.get("revision"), str)
+        or "down_revision" not in values
+    ):
+        return None
+
+    doc = ast.get_docstring(tree, clean=False)
+    return {
+        "revision": values["revision"],
+        "down_revision": values["down_revision"],
+        "branch_labels": values.get("branch_labels"),
+        "depends_on": values.get("depends_on"),
+        "doc": doc.strip() if doc else "",
+    }
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from collections.abc import Collection
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Any
+from typing import cast
+from typing import TYPE_CHECKING
+
+from .. import util
+
+if TYPE_CHECKING:
+    from .base import _ScriptHeader
+
+_INDEX_FORMAT = 1
+
+
+class RevisionIndex:
+    """A persistent cache of the header values of revision files.
+
+    The index is stored as a JSON file and holds, for each revision file,
+    the ``revision``, ``down_revision``, ``branch_labels`` and
+    ``depends_on`` identifiers as well as the docstring of the file.
+    Entries are keyed on the path of the file and are only considered valid
+    when the size and modification time of the file match those recorded
+    when the entry was written.
+
+    This allows a :class:`.ScriptDirectory` to build its
+    :class:`.RevisionMap` without importing each revision module; the
+    module itself is then imported only when its ``upgrade()`` or
+    ``downgrade()`` function is needed.
+
+    The index is enabled using the ``revision_index_file`` configuration
+    option.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as file_:
+                data = json.load(file_)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            util.warn(
+                f"Could not read revision index {self.path}; "
+                "the index will be rebuilt"
+            )
+            self._dirty = True
+            return
+
+        if (
+            isinstance(data, dict)
+            and data.get("format") == _INDEX_FORMAT
+            and isinstance(data.get("entries"), dict)
+        ):
+            self._entries = data["entries"]
+        else:
+            self._dirty = True
+
+    @staticmethod
+    def _stat(path: Path) -> tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, path: Path) -> _ScriptHeader | None:
+        """Return the header stored for the given revision file, or None
+        if no entry exists or the file has changed since it was indexed.
+
+        """
+        entry = self._entries.get(str(path))
+        if entry is None:
+            return None
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return None
+        if entry.get("size") != size or entry.get("mtime_ns") != mtime_ns:
+            return None
+        return cast("_ScriptHeader", entry["header"])
+
+    def set(self, path: Path, header: _ScriptHeader) -> None:
+        """Record the header for the given revision file."""
+
+        size, mtime_ns = self._stat(path)
+        with self._lock:
+            # revision files may be loaded from several threads at once
+            self._entries[str(path)] = {
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "header": dict(header),
+            }
+            self._dirty = True
+
+    def save(self, retain: Collection[Path] | None = None) -> None:
+        """Write the index to disk if it has changed.
+
+        :param retain: if given, entries for paths not present in this
+         collection are removed before writing, so that deleted revision
+         files don't accumulate in the index.
+
+        """
+        if retain is not None:
+            keep = {str(path) for path in retain}
+            stale = set(self._entries).difference(keep)
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._dirty = True
+
+        if not self._dirty:
+            return
+
+        data = {"format": _INDEX_FORMAT, "entries": self._entries}
+        try:
+            util.write_json(self.path, data)
+        except OSError as err:
+            util.warn(f"Could not write revision index {self.path}: {err}")
+        else:
+            self._dirty = False
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Any
+
+from sqlalchemy import util as sqlautil
+
+from .. import util
+
+_PLANS_FORMAT = 1
+_plan_cache_size = 100
+
+_PlanKey = tuple[str, str, tuple[str, ...], tuple[str, ...]]
+"""fingerprint of the revision map, direction, current heads and
+destination of a plan."""
+
+
+class PlanCache:
+    """A cache of the revisions to be run by upgrade and downgrade
+    operations.
+
+    A plan is the ordered sequence of revision identifiers which
+    :meth:`.ScriptDirectory._upgrade_revs` or
+    :meth:`.ScriptDirectory._downgrade_revs` would produce for a given set of
+    current heads and a destination.  Plans are keyed on these along with
+    a fingerprint of the :class:`.RevisionMap`, so that a plan is never used
+    once the revision graph has changed.
+
+    Plans are held in memory, and may also be stored in a JSON file, so
+    that they're shared between processes; the file retains only the plans
+    computed for the most recent revision map.
+
+    The file is enabled using the ``revision_plan_cache_file``
+    configuration option.
+
+    .. versionadded:: 1.19.2
+
+    """
+
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self._plans: sqlautil.LRUCache[_PlanKey, tuple[str, ...]] = (
+            sqlautil.LRUCache(_plan_cache_size)
+        )
+        self._lock = threading.Lock()
+        self._fingerprint: str | None = None
+        self._stored: dict[str, list[str]] = {}
+        if self.path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            with open(self.path, encoding="utf-8") as file_:
+                data = json.load(file_)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            util.warn(
+                f"Could not read revision plan cache {self.path}; "
+                "the cache will be rebuilt"
+            )
+            return
+
+        if (
+            isinstance(data, dict)
+            and data.get("format") == _PLANS_FORMAT
+            and isinstance(data.get("plans"), dict)
+        ):
+            self._fingerprint = data.get("fingerprint")
+            self._stored = data["plans"]
+
+    @staticmethod
+    def _stored_key(key: _PlanKey) -> str:
+        _, direction, heads, destination = key
+        return json.dumps([direction, heads, destination])
+
+    def get(self, key: _PlanKey) -> tuple[str, ...] | None:
+        """Return the revision identifiers of the plan with the given key,
+        or None if no such plan has been stored.
+
+        """
+        plan = self._plans.get(key)
+        if plan is None and key[0] == self._fingerprint:
+            stored = self._stored.get(self._stored_key(key))
+            if stored is not None:
+                plan = self._plans[key] = tuple(stored)
+        return plan
+
+    def set(self, key: _PlanKey, plan: tuple[str, ...]) -> None:
+        """Record the revision identifiers of the plan with the given key."""
+
+        self._plans[key] = plan
+        if self.path is None:
+            return
+
+        with self._lock:
+            # pick up plans stored by other processes since the file was
+            # read, then discard those made for a different revision map
+            self._load()
+            if self._fingerprint != key[0]:
+                self._fingerprint = key[0]
+                self._stored = {}
+            self._stored[self._stored_key(key)] = list(plan)
+
+            data: dict[str, Any] = {
+                "format": _PLANS_FORMAT,
+                "fingerprint": self._fingerprint,
+                "plans": self._stored,
+            }
+            try:
+                util.write_json(self.path, data)
+            except OSError as err:
+                util.warn(
+                    f"Could not write revision plan cache {self.path}: {err}"
+                )
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import array
+import bisect
 import collections
 from collections.abc import Collection
 from collections.abc import Iterable
 from collections.abc import Iterator
 from collections.abc import Sequence
+import hashlib
 import re
+import sys
 from typing import Any
 from typing import Callable
 from typing import cast
@@ -39,6 +43,9 @@ _RevisionMapType = dict[Union[None, str, tuple[()]], Optional["Revision"]]
 _T = TypeVar("_T")
 _TR = TypeVar("_TR", bound=Optional[_RevisionOrStr])
 
+_resolution_cache_size = 100
+_missing = object()
+
 _relative_destination = re.compile(r"(?:(.+?)@)?(\w+)?((?:\+|-)\d+)")
 _revision_illegal_chars = ["@", "-", "+", ":"]
 
@@ -118,6 +125,180 @@ class DependencyLoopDetected(DependencyCycleDetected, LoopDetected):
         super().__init__(revision)
 
 
+class _Reachability:
+    """Answer ancestor / descendant questions between revisions without
+    materializing the ancestors of each revision.
+
+    A depth-first traversal from the bases towards the heads gives each
+    revision an interval, from its entry to its exit; a revision whose
+    interval contains that of another is its ancestor along the tree of
+    the traversal.  Each revision also records the lowest exit among
+    itself and its descendants, so that a revision whose range of exits
+    doesn't contain that of another can't be its ancestor; a second
+    traversal visiting children in the opposite order, along with the
+    length of the longest path down to a base, rule out most of the
+    remainder.  Questions left open walk down from the descendant,
+    skipping revisions ruled out in the same way.  Memory used is linear
+    in the number of revisions.
+
+    """
+
+    def __init__(
+        self, map_: _RevisionMapType, include_dependencies: bool
+    ) -> None:
+        self._numbers: dict[str, int] = {}
+        numbers = self._numbers
+        revisions: list[Revision] = []
+        for rev in map_.values():
+            if rev is not None and rev.revision not in numbers:
+                numbers[rev.revision] = len(revisions)
+                revisions.append(rev)
+
+        self._downs = downs = [
+            [
+                numbers[down_id]
+                for down_id in (
+                    rev._all_down_revisions
+                    if include_dependencies
+                    else rev._versioned_down_revisions
+                )
+            ]
+            for rev in revisions
+        ]
+        children: list[list[int]] = [[] for _ in revisions]
+        roots = []
+        for number, down_numbers in enumerate(downs):
+            for down_number in down_numbers:
+                children[down_number].append(number)
+            if not down_numbers:
+                roots.append(number)
+
+        size = 8 * len(revisions)
+        self._level = level = array.array("q", bytes(size))
+        self._enter = enter = array.array("q", bytes(size))
+        self._exit = exit_ = array.array("q", bytes(size))
+        self._low = low = array.array("q", bytes(size))
+        finished = self._traverse(roots, children, enter, exit_, low)
+
+        self._exit2 = exit2 = array.array("q", bytes(size))
+        self._low2 = low2 = array.array("q", bytes(size))
+        self._traverse(
+            roots[::-1],
+            [number_children[::-1] for number_children in children],
+            None,
+            exit2,
+            low2,
+        )
+
+        # revisions finish after all of their descendants, so the
+        # reverse of that order visits each revision before them
+        for number in reversed(finished):
+            for child in children[number]:
+                if level[child] <= level[number]:
+                    level[child] = level[number] + 1
+
+    @staticmethod
+    def _traverse(
+        roots: list[int],
+        children: list[list[int]],
+        enter: array.array[int] | None,
+        exit_: array.array[int],
+        low: array.array[int],
+    ) -> array.array[int]:
+        """Traverse depth first from ``roots``, filling in ``enter``,
+        ``exit_`` and ``low``; return the revisions in the order they
+        finished."""
+        visited = bytearray(len(children))
+        finished = array.array("q")
+        counter = 0
+        for root in roots:
+            todo = [root]
+            while todo:
+                number = todo.pop()
+                if number >= 0:
+                    if visited[number]:
+                        continue
+                    visited[number] = 1
+                    if enter is not None:
+                        enter[number] = counter
+                    todo.append(~number)
+                    todo.extend(
+                        child
+                        for child in reversed(children[number])
+                        if not visited[child]
+                    )
+                else:
+                    number = ~number
+                    finished.append(number)
+                    exit_[number] = counter
+                    low[number] = min(
+                        [counter] + [low[child] for child in children[number]]
+                    )
+                counter += 1
+        return finished
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Return True if ``ancestor`` is a strict ancestor of
+        ``descendant``."""
+        return self.first_descendant(ancestor, (descendant,)) is not None
+
+    def first_descendant(
+        self, ancestor: str, descendants: Sequence[str]
+    ) -> int | None:
+        """Return the index of the first of ``descendants`` of which
+        ``ancestor`` is a strict ancestor, or None if there isn't one."""
+        numbers = self._numbers
+        target = numbers[ancestor]
+
+        downs, level, enter = self._downs, self._level, self._enter
+        exit_, low, exit2, low2 = (
+            self._exit,
+            self._low,
+            self._exit2,
+            self._low2,
+        )
+        target_level = level[target]
+        target_enter = enter[target]
+        target_exit, target_low = exit_[target], low[target]
+        target_exit2, target_low2 = exit2[target], low2[target]
+
+        for index, descendant in enumerate(descendants):
+            number = numbers[descendant]
+            if (
+                level[number] <= target_level
+                or exit_[number] >= target_exit
+                or low[number] < target_low
+                or exit2[number] >= target_exit2
+                or low2[number] < target_low2
+            ):
+                # ruled out without walking, as is most often the case
+                continue
+            todo = [number]
+            seen = {number}
+            while todo:
+                number = todo.pop()
+                if (
+                    level[number] <= target_level
+                    or exit_[number] >= target_exit
+                    or low[number] < target_low
+                    or exit2[number] >= target_exit2
+                    or low2[number] < target_low2
+                ):
+                    # can't be a descendant of the ancestor
+                    continue
+                elif enter[number] > target_enter:
+                    # a descendant of the ancestor along the first
+                    # traversal's tree
+                    return index
+                for down_number in downs[number]:
+                    if down_number == target:
+                        return index
+                    elif down_number not in seen:
+                        seen.add(down_number)
+                        todo.append(down_number)
+        return None
+
+
 class RevisionMap:
     """Maintains a map of :class:`.Revision` objects.
 
@@ -230,7 +411,12 @@ class RevisionMap:
         # names
         self._add_depends_on(all_revisions, cast(_RevisionMapType, map_))
 
+        # collect the next revisions of each revision first, rather than
+        # growing their frozensets one at a time with add_nextrev()
+        nextrevs: dict[Revision, set[str]] = collections.defaultdict(set)
+        all_nextrevs: dict[Revision, set[str]] = collections.defaultdict(set)
         for rev in map_.values():
+            versioned_down_revisions = rev._versioned_down_revisions
             for downrev in rev._all_down_revisions:
                 if downrev not in map_:
                     util.warn(
@@ -238,16 +424,23 @@ class RevisionMap:
                         % (downrev, rev)
                     )
                 down_revision = map_[downrev]
-                down_revision.add_nextrev(rev)
-                if downrev in rev._versioned_down_revisions:
+                all_nextrevs[down_revision].add(rev.revision)
+                if down_revision.revision in versioned_down_revisions:
+                    nextrevs[down_revision].add(rev.revision)
+                if downrev in versioned_down_revisions:
                     heads.discard(down_revision)
                 _real_heads.discard(down_revision)
 
+        for rev, nextrev in all_nextrevs.items():
+            rev._all_nextrev = frozenset(nextrev)
+        for rev, nextrev in nextrevs.items():
+            rev.nextrev = frozenset(nextrev)
+
         # once the map has downrevisions populated, the dependencies
         # can be further refined to include only those which are not
         # already ancestors
         self._normalize_depends_on(all_revisions, cast(_RevisionMapType, map_))
-        self._detect_cycles(rev_map, heads, bases, _real_heads, _real_bases)
+        self._detect_cycles(rev_map)
 
         revision_map: _RevisionMapType = dict(map_.items())
         revision_map[None] = revision_map[()] = None
@@ -259,57 +452,178 @@ class RevisionMap:
         self._add_branches(has_branch_labels, revision_map)
         return revision_map
 
-    def _detect_cycles(
+    @util.memoized_property
+    def _partial_ids(self) -> list[str]:
+        """memoized attribute, a sorted list of the revision identifiers
+        and branch labels in the revision map which may be matched by a
+        partial identifier.
+
+        """
+        return sorted(
+            key
+            for key in self._revision_map
+            if isinstance(key, str) and len(key) > 3
+        )
+
+    @util.memoized_property
+    def _reachability(self) -> _Reachability:
+        """memoized attribute, answers ancestor / descendant queries
+        following both ``down_revision`` and ``depends_on``.
+
+        """
+        return _Reachability(self._revision_map, include_dependencies=True)
+
+    @util.memoized_property
+    def _versioned_reachability(self) -> _Reachability:
+        """memoized attribute, answers ancestor / descendant queries
+        following ``down_revision`` only.
+
+        """
+        return _Reachability(self._revision_map, include_dependencies=False)
+
+    def _is_ancestor(
         self,
-        rev_map: _InterimRevisionMapType,
-        heads: set[Revision],
-        bases: tuple[Revision, ...],
-        _real_heads: set[Revision],
-        _real_bases: tuple[Revision, ...],
-    ) -> None:
-        if not rev_map:
-            return
-        if not heads or not bases:
-            raise CycleDetected(list(rev_map))
-        total_space = {
-            rev.revision
-            for rev in self._iterate_related_revisions(
-                lambda r: r._versioned_down_revisions,
-                heads,
-                map_=cast(_RevisionMapType, rev_map),
-            )
-        }.intersection(
-            rev.revision
-            for rev in self._iterate_related_revisions(
-                lambda r: r.nextrev,
-                bases,
-                map_=cast(_RevisionMapType, rev_map),
+        ancestor: Revision,
+        descendant: Revision,
+        include_dependencies: bool = True,
+    ) -> bool:
+        """Return True if ``ancestor`` is a strict ancestor of
+        ``descendant``."""
+        if include_dependencies:
+            reachability = self._reachability
+        else:
+            reachability = self._versioned_reachability
+        return reachability.is_ancestor(ancestor.revision, descendant.revision)
+
+    @util.memoized_property
+    def _fingerprint(self) -> str:
+        """memoized attribute, a digest of the revision identifiers,
+        ``down_revision``, ``depends_on`` and ``branch_labels`` of every
+        revision in the map.
+
+        """
+        digest = hashlib.sha256()
+        for key in sorted(
+            key for key in self._revision_map if isinstance(key, str)
+        ):
+            rev = self._revision_map[key]
+            assert rev is not None
+            if rev.revision != key:
+                # a branch label
+                continue
+            digest.update(
+                repr(
+                    (
+                        rev.revision,
+                        rev._versioned_down_revisions,
+                        util.to_tuple(rev.dependencies, default=()),
+                        rev._orig_branch_labels,
+                    )
+                ).encode("utf-8")
             )
+        return digest.hexdigest()
+
+    @util.memoized_property
+    def _resolution_cache(self) -> sqlautil.LRUCache[Any, Any]:
+        """memoized attribute, a bounded cache of the results of resolving
+        symbolic revision arguments such as ``heads``, ``mybranch@head``
+        or a partial identifier.
+
+        """
+        return sqlautil.LRUCache(_resolution_cache_size)
+
+    def _resolve_cached(
+        self, key: tuple[Any, ...], fn: Callable[[], _T]
+    ) -> _T:
+        result = self._resolution_cache.get(key, _missing)
+        if result is _missing:
+            result = self._resolution_cache[key] = fn()
+        return cast(_T, result)
+
+    def _ids_with_prefix(self, prefix: str) -> list[str]:
+        partial_ids = self._partial_ids
+        idx = bisect.bisect_left(partial_ids, prefix)
+        revs = []
+        while idx < len(partial_ids) and partial_ids[idx].startswith(prefix):
+            revs.append(partial_ids[idx])
+            idx += 1
+        return revs
+
+    def _detect_cycles(self, rev_map: _InterimRevisionMapType) -> None:
+        cycles = self._find_cycles(
+            rev_map, lambda rev: rev._versioned_down_revisions
         )
-        deleted_revs = set(rev_map.keys()) - total_space
-        if deleted_revs:
-            raise CycleDetected(sorted(deleted_revs))
-
-        if not _real_heads or not _real_bases:
-            raise DependencyCycleDetected(list(rev_map))
-        total_space = {
-            rev.revision
-            for rev in self._iterate_related_revisions(
-                lambda r: r._all_down_revisions,
-                _real_heads,
-                map_=cast(_RevisionMapType, rev_map),
-            )
-        }.intersection(
-            rev.revision
-            for rev in self._iterate_related_revisions(
-                lambda r: r._all_nextrev,
-                _real_bases,
-                map_=cast(_RevisionMapType, rev_map),
+        if cycles:
+            raise CycleDetected(
+                [rev_id for cycle in cycles for rev_id in cycle]
             )
+
+        cycles = self._find_cycles(
+            rev_map, lambda rev: rev._all_down_revisions
         )
-        deleted_revs = set(rev_map.keys()) - total_space
-        if deleted_revs:
-            raise DependencyCycleDetected(sorted(deleted_revs))
+        if cycles:
+            raise DependencyCycleDetected(
+                [rev_id for cycle in cycles for rev_id in cycle]
+            )
+
+    def _find_cycles(
+        self,
+        rev_map: _InterimRevisionMapType,
+        fn: Callable[[Revision], Iterable[str]],
+    ) -> list[list[str]]:
+        """Return the revision identifiers of each cycle in the graph
+        formed by the given edges, as sorted lists.
+
+        This is Tarjan's strongly connected components algorithm, written
+        iteratively so that long chains of revisions don't exhaust the
+        recursion limit; each strongly connected component having more
+        than one member, or a single member which refers to itself, is a
+        cycle.
+
+        """
+        index: dict[str, int] = {}
+        lowlink: dict[str, int] = {}
+        stack: list[str] = []
+        on_stack: set[str] = set()
+        cycles = []
+
+        for root in rev_map:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            root_edges = tuple(fn(rev_map[root]))
+            work = [(root, root_edges, iter(root_edges))]
+
+            while work:
+                node, node_edges, edges = work[-1]
+                for next_ in edges:
+                    if next_ not in rev_map:
+                        continue
+                    elif next_ not in index:
+                        index[next_] = lowlink[next_] = len(index)
+                        stack.append(next_)
+                        on_stack.add(next_)
+                        next_edges = tuple(fn(rev_map[next_]))
+                        work.append((next_, next_edges, iter(next_edges)))
+                        break
+                    elif next_ in on_stack:
+                        lowlink[node] = min(lowlink[node], index[next_])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = [stack.pop()]
+                        while component[-1] != node:
+                            component.append(stack.pop())
+                        on_stack.difference_update(component)
+                        if len(component) > 1 or node in node_edges:
+                            cycles.append(sorted(component))
+
+        return sorted(cycles)
 
     def _map_branch_labels(
         self, revisions: Collection[Revision], map_: _RevisionMapType
@@ -434,6 +748,7 @@ class RevisionMap:
             raise Exception("revision %s not in map" % revision.revision)
 
         map_[revision.revision] = revision
+        self._invalidate()
 
         revisions = [revision]
         self._add_branches(revisions, map_)
@@ -474,6 +789,152 @@ class RevisionMap:
                 )
             ) + (revision.revision,)
 
+    def _invalidate(self) -> None:
+        """Reset the memoized collections which are derived from the
+        revision map, after the map has been modified in place."""
+
+        for attr in (
+            "_partial_ids",
+            "_reachability",
+            "_versioned_reachability",
+            "_fingerprint",
+            "_resolution_cache",
+        ):
+            util.memoized_property.reset(self, attr)
+
+    def _reset(self) -> None:
+        """Discard the revision map, so that it's rebuilt from the
+        generator the next time it's accessed."""
+
+        for attr in (
+            "_revision_map",
+            "heads",
+            "bases",
+            "_real_heads",
+            "_real_bases",
+        ):
+            util.memoized_property.reset(self, attr)
+        self._invalidate()
+
+    def _update(
+        self, removed: Collection[str], added: Collection[Revision]
+    ) -> bool:
+        """Remove and add the given revisions, patching the existing map
+        in place where possible.
+
+        Revisions can be removed in place only if every revision which
+        refers to them is also being removed, and revisions can be added in
+        place only if all the revisions they refer to are present.  In
+        both cases, the revisions involved and those they refer to must not
+        be part of a labeled branch, as branch labels are propagated across
+        the whole map when it's built.  If these conditions aren't met, the
+        map is reset instead, to be rebuilt in full when next accessed.
+
+        :return: True if the map was updated in place, False if it was
+         reset or had not been loaded.
+
+        """
+        if "_revision_map" not in self.__dict__:
+            return False
+
+        map_ = self._revision_map
+        removed = set(removed)
+        added_ids = {revision.revision for revision in added}
+
+        def refers_to(revision: Revision) -> list[Revision | None]:
+            return [
+                map_.get(rev_id) if rev_id not in removed else None
+                for rev_id in util.to_tuple(revision.down_revision, default=())
+                + util.to_tuple(revision.dependencies, default=())
+                if rev_id not in added_ids
+            ]
+
+        def in_labeled_branch(revision: Revision | None) -> bool:
+            return revision is None or any(
+                rev.branch_labels
+                for rev in [revision]
+                + [map_[rev_id] for rev_id in revision._all_nextrev]
+                if rev is not None
+            )
+
+        to_remove = [map_.get(rev_id) for rev_id in removed]
+        if any(
+            revision is None
+            or revision._all_nextrev.difference(removed)
+            or in_labeled_branch(revision)
+            or any(
+                in_labeled_branch(map_.get(rev_id))
+                for rev_id in revision._all_down_revisions
+                if rev_id not in removed
+            )
+            for revision in to_remove
+        ):
+            self._reset()
+            return False
+
+        if any(
+            (revision.revision in map_ and revision.revision not in removed)
+            or revision._orig_branch_labels
+            or any(in_labeled_branch(rev) for rev in refers_to(revision))
+            for revision in added
+        ):
+            self._reset()
+            return False
+
+        to_add = _order_by_dependency(added)
+        if to_add is None:
+            self._reset()
+            return False
+
+        # remove descendants before their ancestors
+        while to_remove:
+            revision = not_none(
+                next(rev for rev in to_remove if rev and not rev._all_nextrev)
+            )
+            to_remove.remove(revision)
+            self._remove_revision(revision)
+
+        # add ancestors before their descendants
+        for revision in to_add:
+            self.add_revision(revision)
+
+        return True
+
+    def _remove_revision(self, revision: Revision) -> None:
+        map_ = self._revision_map
+        del map_[revision.revision]
+        self._invalidate()
+
+        for down_id in revision._all_down_revisions:
+            down_revision = not_none(map_[down_id])
+            down_revision._all_nextrev = down_revision._all_nextrev.difference(
+                [revision.revision]
+            )
+            down_revision.nextrev = down_revision.nextrev.difference(
+                [revision.revision]
+            )
+
+        self.heads = tuple(
+            head for head in self.heads if head != revision.revision
+        ) + tuple(
+            rev_id
+            for rev_id in revision._versioned_down_revisions
+            if not_none(map_[rev_id]).is_head
+        )
+        self._real_heads = tuple(
+            head for head in self._real_heads if head != revision.revision
+        ) + tuple(
+            rev_id
+            for rev_id in revision._all_down_revisions
+            if not_none(map_[rev_id])._is_real_head
+        )
+        self.bases = tuple(
+            base for base in self.bases if base != revision.revision
+        )
+        self._real_bases = tuple(
+            base for base in self._real_bases if base != revision.revision
+        )
+
     def get_current_head(self, branch_label: str | None = None) -> str | None:
         """Return the current head revision.
 
@@ -533,32 +994,39 @@ class RevisionMap:
 
         if isinstance(id_, (list, tuple, set, frozenset)):
             return sum([self.get_revisions(id_elem) for id_elem in id_], ())
+        elif id_ is None or isinstance(id_, str):
+            return self._resolve_cached(
+                ("get_revisions", id_), lambda: self._get_revisions(id_)
+            )
         else:
-            resolved_id, branch_label = self._resolve_revision_number(id_)
-            if len(resolved_id) == 1:
-                try:
-                    rint = int(resolved_id[0])
-                    if rint < 0:
-                        # branch@-n -> walk down from heads
-                        select_heads = self.get_revisions("heads")
-                        if branch_label is not None:
-                            select_heads = tuple(
-                                head
-                                for head in select_heads
-                                if branch_label
-                                in is_revision(head).branch_labels
-                            )
-                        return tuple(
-                            self._walk(head, steps=rint)
+            return self._get_revisions(id_)
+
+    def _get_revisions(
+        self, id_: _GetRevArg | None
+    ) -> tuple[_RevisionOrBase | None, ...]:
+        resolved_id, branch_label = self._resolve_revision_number(id_)
+        if len(resolved_id) == 1:
+            try:
+                rint = int(resolved_id[0])
+                if rint < 0:
+                    # branch@-n -> walk down from heads
+                    select_heads = self.get_revisions("heads")
+                    if branch_label is not None:
+                        select_heads = tuple(
+                            head
                             for head in select_heads
+                            if branch_label in is_revision(head).branch_labels
                         )
-                except ValueError:
-                    # couldn't resolve as integer
-                    pass
-            return tuple(
-                self._revision_for_ident(rev_id, branch_label)
-                for rev_id in resolved_id
-            )
+                    return tuple(
+                        self._walk(head, steps=rint) for head in select_heads
+                    )
+            except ValueError:
+                # couldn't resolve as integer
+                pass
+        return tuple(
+            self._revision_for_ident(rev_id, branch_label)
+            for rev_id in resolved_id
+        )
 
     def get_revision(self, id_: str | None) -> Revision | None:
         """Return the :class:`.Revision` instance with the given rev id.
@@ -574,6 +1042,14 @@ class RevisionMap:
 
         """
 
+        if id_ is None or isinstance(id_, str):
+            return self._resolve_cached(
+                ("get_revision", id_), lambda: self._get_revision(id_)
+            )
+        else:
+            return self._get_revision(id_)
+
+    def _get_revision(self, id_: str | None) -> Revision | None:
         resolved_id, branch_label = self._resolve_revision_number(id_)
         if len(resolved_id) > 1:
             raise MultipleHeads(resolved_id, id_)
@@ -618,11 +1094,8 @@ class RevisionMap:
         if revision is False:
             assert resolved_id
             # do a partial lookup
-            revs = [
-                x
-                for x in self._revision_map
-                if x and len(x) > 3 and x.startswith(resolved_id)
-            ]
+            assert isinstance(resolved_id, str)
+            revs = self._ids_with_prefix(resolved_id)
 
             if branch_rev:
                 revs = self.filter_for_lineage(revs, check_branch)
@@ -670,9 +1143,12 @@ class RevisionMap:
 
         for rev in list(targets):
             assert rev
-            if targets.intersection(
-                self._get_descendant_nodes([rev], include_dependencies=False)
-            ).difference([rev]):
+            if any(
+                isinstance(other, Revision)
+                and isinstance(rev, Revision)
+                and self._is_ancestor(rev, other, include_dependencies=False)
+                for other in targets
+            ):
                 targets.discard(rev)
         return targets
 
@@ -722,20 +1198,20 @@ class RevisionMap:
             )
         ]
 
-        return bool(
-            set(
-                self._get_descendant_nodes(
-                    [resolved_target],
-                    include_dependencies=include_dependencies,
-                )
+        return any(
+            test_against_rev is resolved_target
+            or self._is_ancestor(
+                test_against_rev,
+                resolved_target,
+                include_dependencies=include_dependencies,
             )
-            .union(
-                self._get_ancestor_nodes(
-                    [resolved_target],
-                    include_dependencies=include_dependencies,
-                )
+            or self._is_ancestor(
+                resolved_target,
+                test_against_rev,
+                include_dependencies=include_dependencies,
             )
-            .intersection(resolved_test_against_revs)
+            for test_against_rev in resolved_test_against_revs
+            if test_against_rev is not None
         )
 
     def _resolve_revision_number(
@@ -930,24 +1406,29 @@ class RevisionMap:
 
         id_to_rev = self._revision_map
 
-        def get_ancestors(rev_id: str) -> set[str]:
-            return {
-                r.revision
-                for r in self._get_ancestor_nodes([id_to_rev[rev_id]])
-            }
-
         todo = {d.revision for d in revisions}
 
+        # the number of revisions in todo not yet emitted which have each
+        # revision as a down revision; a revision with none left may be
+        # emitted, while one with some left is an ancestor of another head
+        pending_descendants = dict.fromkeys(todo, 0)
+        for rev_id in todo:
+            rev = id_to_rev[rev_id]
+            assert rev is not None
+            for down_id in rev._normalized_down_revisions:
+                if down_id in pending_descendants:
+                    pending_descendants[down_id] += 1
+
         # Use revision map (ordered dict) key order to pre-sort.
-        inserted_order = list(self._revision_map)
+        inserted_order = {key: idx for idx, key in enumerate(id_to_rev)}
 
         current_heads = list(
             sorted(
                 {d.revision for d in heads if d.revision in todo},
-                key=inserted_order.index,
+                key=inserted_order.__getitem__,
             )
         )
-        ancestors_by_idx = [get_ancestors(rev_id) for rev_id in current_heads]
+        current_head_set = set(current_heads)
 
         output = []
 
@@ -955,67 +1436,45 @@ class RevisionMap:
         while current_heads:
             candidate = current_heads[current_candidate_idx]
 
-            for check_head_index, ancestors in enumerate(ancestors_by_idx):
-                # scan all the heads.  see if we can continue walking
-                # down the current branch indicated by current_candidate_idx.
-                if (
-                    check_head_index != current_candidate_idx
-                    and candidate in ancestors
-                ):
-                    current_candidate_idx = check_head_index
-                    # nope, another head is dependent on us, they have
-                    # to be traversed first
-                    break
+            if pending_descendants[candidate]:
+                # another head is dependent on us, they have to be
+                # traversed first; continue with the first of them
+                check_head_index = self._reachability.first_descendant(
+                    candidate, current_heads
+                )
+                if check_head_index is None:
+                    raise RevisionError(
+                        "Dependency resolution failed; broken map"
+                    )
+                current_candidate_idx = check_head_index
+                continue
+
+            # we can emit
+            if candidate in todo:
+                output.append(candidate)
+                todo.remove(candidate)
+
+            # now update the heads with our ancestors.
+
+            candidate_rev = id_to_rev[candidate]
+            assert candidate_rev is not None
+
+            heads_to_add = []
+            for r in candidate_rev._normalized_down_revisions:
+                if r in todo:
+                    pending_descendants[r] -= 1
+                    if r not in current_head_set:
+                        heads_to_add.append(r)
+
+            current_head_set.discard(candidate)
+            current_head_set.update(heads_to_add)
+            if not heads_to_add:
+                # no ancestors, so remove this head from the list
+                del current_heads[current_candidate_idx]
+                current_candidate_idx = max(current_candidate_idx - 1, 0)
             else:
-                # yup, we can emit
-                if candidate in todo:
-                    output.append(candidate)
-                    todo.remove(candidate)
-
-                # now update the heads with our ancestors.
-
-                candidate_rev = id_to_rev[candidate]
-                assert candidate_rev is not None
-
-                heads_to_add = [
-                    r
-                    for r in candidate_rev._normalized_down_revisions
-                    if r in todo and r not in current_heads
-                ]
-
-                if not heads_to_add:
-                    # no ancestors, so remove this head from the list
-                    del current_heads[current_candidate_idx]
-                    del ancestors_by_idx[current_candidate_idx]
-                    current_candidate_idx = max(current_candidate_idx - 1, 0)
-                else:
-                    if (
-                        not candidate_rev._normalized_resolved_dependencies
-                        and len(candidate_rev._versioned_down_revisions) == 1
-                    ):
-                        current_heads[current_candidate_idx] = heads_to_add[0]
-
-                        # for plain movement down a revision line without
-                        # any mergepoints, branchpoints, or deps, we
-                        # can update the ancestors collection directly
-                        # by popping out the candidate we just emitted
-                        ancestors_by_idx[current_candidate_idx].discard(
-                            candidate
-                        )
-
-                    else:
-                        # otherwise recalculate it again, things get
-                        # complicated otherwise.  This can possibly be
-                        # improved to not run the whole ancestor thing
-                        # each time but it was getting complicated
-                        current_heads[current_candidate_idx] = heads_to_add[0]
-                        current_heads.extend(heads_to_add[1:])
-                        ancestors_by_idx[current_candidate_idx] = (
-                            get_ancestors(heads_to_add[0])
-                        )
-                        ancestors_by_idx.extend(
-                            get_ancestors(head) for head in heads_to_add[1:]
-                        )
+                current_heads[current_candidate_idx] = heads_to_add[0]
+                current_heads.extend(heads_to_add[1:])
 
         assert not todo
         return output
@@ -1039,6 +1498,21 @@ class RevisionMap:
         A RevisionError is raised if there is no unambiguous revision to
         walk to.
         """
+        start_key = start.revision if isinstance(start, Revision) else start
+        return self._resolve_cached(
+            ("walk", start_key, steps, branch_label, no_overwalk),
+            lambda: self._walk_uncached(
+                start, steps, branch_label, no_overwalk
+            ),
+        )
+
+    def _walk_uncached(
+        self,
+        start: str | Revision | None,
+        steps: int,
+        branch_label: str | None,
+        no_overwalk: bool,
+    ) -> _RevisionOrBase | None:
         initial: _RevisionOrBase | None
         if isinstance(start, str):
             initial = self.get_revision(start)
@@ -1539,15 +2013,28 @@ class Revision:
 
     """
 
-    nextrev: frozenset[str] = frozenset()
+    __slots__ = (
+        "nextrev",
+        "_all_nextrev",
+        "revision",
+        "down_revision",
+        "dependencies",
+        "branch_labels",
+        "_orig_branch_labels",
+        "_resolved_dependencies",
+        "_normalized_resolved_dependencies",
+        "__weakref__",
+    )
+
+    nextrev: frozenset[str]
     """following revisions, based on down_revision only."""
 
-    _all_nextrev: frozenset[str] = frozenset()
+    _all_nextrev: frozenset[str]
 
-    revision: str = None  # type: ignore[assignment]
+    revision: str
     """The string revision number."""
 
-    down_revision: _RevIdType | None = None
+    down_revision: _RevIdType | None
     """The ``down_revision`` identifier(s) within the migration script.
 
     Note that the total set of "down" revisions is
@@ -1555,7 +2042,7 @@ class Revision:
 
     """
 
-    dependencies: _RevIdType | None = None
+    dependencies: _RevIdType | None
     """Additional revisions which this revision is dependent on.
 
     From a migration standpoint, these dependencies are added to the
@@ -1565,10 +2052,11 @@ class Revision:
 
     """
 
-    branch_labels: set[str] = None  # type: ignore[assignment]
+    branch_labels: set[str]
     """Optional string/tuple of symbolic names to apply to this
     revision's branch"""
 
+    _orig_branch_labels: tuple[str, ...]
     _resolved_dependencies: tuple[str, ...]
     _normalized_resolved_dependencies: tuple[str, ...]
 
@@ -1596,11 +2084,17 @@ class Revision:
             raise DependencyLoopDetected(revision)
 
         self.verify_rev_id(revision)
-        self.revision = revision
-        self.down_revision = tuple_rev_as_scalar(util.to_tuple(down_revision))
-        self.dependencies = tuple_rev_as_scalar(util.to_tuple(dependencies))
+        # identifiers are interned, as the same strings are repeated
+        # as keys in the revision map and in the down revisions,
+        # dependencies and next revisions of related revisions
+        self.revision = sys.intern(revision)
+        self.down_revision = tuple_rev_as_scalar(_intern_ids(down_revision))
+        self.dependencies = tuple_rev_as_scalar(_intern_ids(dependencies))
         self._orig_branch_labels = util.to_tuple(branch_labels, default=())
         self.branch_labels = set(self._orig_branch_labels)
+        self.nextrev = self._all_nextrev = _empty_set
+        self._resolved_dependencies = ()
+        self._normalized_resolved_dependencies = ()
 
     def __repr__(self) -> str:
         args = [repr(self.revision), repr(self.down_revision)]
@@ -1695,6 +2189,49 @@ class Revision:
         return len(self._versioned_down_revisions) > 1
 
 
+_empty_set: frozenset[str] = frozenset()
+
+
+def _intern_ids(ids: str | tuple[str, ...] | None) -> tuple[str, ...]:
+    return tuple(sys.intern(rev_id) for rev_id in util.to_tuple(ids, ()))
+
+
+def _order_by_dependency(
+    revisions: Collection[Revision],
+) -> list[Revision] | None:
+    """Order a collection of revisions such that each comes after the
+    revisions within the collection that it refers to, or return None if
+    they refer to each other in a cycle."""
+
+    by_id = {revision.revision: revision for revision in revisions}
+    ordered: list[Revision] = []
+    seen: set[str] = set()
+    for revision in revisions:
+        if revision.revision in seen:
+            continue
+        stack = [(revision, False)]
+        visiting: set[str] = set()
+        while stack:
+            rev, children_done = stack.pop()
+            if children_done:
+                visiting.discard(rev.revision)
+                seen.add(rev.revision)
+                ordered.append(rev)
+                continue
+            if rev.revision in seen:
+                continue
+            if rev.revision in visiting:
+                return None
+            visiting.add(rev.revision)
+            stack.append((rev, True))
+            for rev_id in util.to_tuple(
+                rev.down_revision, default=()
+            ) + util.to_tuple(rev.dependencies, default=()):
+                if rev_id in by_id and rev_id not in seen:
+                    stack.append((by_id[rev_id], False))
+    return ordered
+
+
 @overload
 def tuple_rev_as_scalar(rev: None) -> None: ...
 
@@ -30,4 +30,5 @@ from .pyfiles import coerce_resource_to_filename as coerce_resource_to_filename
 from .pyfiles import load_python_file as load_python_file
 from .pyfiles import pyc_file_from_path as pyc_file_from_path
 from .pyfiles import template_to_file as template_to_file
+from .pyfiles import write_json as write_json
 from .sqla_compat import sqla_2 as sqla_2
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import collections
 from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Mapping
 from collections.abc import MutableMapping
 from collections.abc import Sequence
+from contextlib import contextmanager
 import enum
 import textwrap
+import threading
 from typing import Any
 from typing import Callable
 from typing import cast
@@ -69,6 +72,10 @@ class ModuleClsProxy(metaclass=_ModuleClsMeta):
     def _install_proxy(self) -> None:
         attr_names, modules = self._setups[self.__class__]
         for globals_, locals_ in modules:
+            current = globals_.get("_proxy")
+            if isinstance(current, _ThreadLocalProxy):
+                current.set(self)
+                continue
             globals_["_proxy"] = self
             for attr_name in attr_names:
                 globals_[attr_name] = getattr(self, attr_name)
@@ -76,10 +83,55 @@ class ModuleClsProxy(metaclass=_ModuleClsMeta):
     def _remove_proxy(self) -> None:
         attr_names, modules = self._setups[self.__class__]
         for globals_, locals_ in modules:
+            current = globals_.get("_proxy")
+            if isinstance(current, _ThreadLocalProxy):
+                current.reset()
+                continue
             globals_["_proxy"] = None
             for attr_name in attr_names:
                 del globals_[attr_name]
 
+    @classmethod
+    @contextmanager
+    def _thread_local_proxy(cls) -> Iterator[_ThreadLocalProxy]:
+        """Replace the installed proxy with one that dispatches to an
+        object established per thread, for the duration of the block.
+
+        While in effect, :meth:`._install_proxy` and :meth:`._remove_proxy`
+        apply to the current thread only.  Threads which haven't installed
+        an object use the one that was installed beforehand.  If a
+        thread-local proxy is already in effect, it's used as is.
+
+        """
+        attr_names, modules = cls._setups[cls]
+        current = [globals_.get("_proxy") for globals_, _ in modules]
+        if current and isinstance(current[0], _ThreadLocalProxy):
+            yield current[0]
+            return
+
+        previous = [
+            {
+                name: globals_[name]
+                for name in ["_proxy", *attr_names]
+                if name in globals_
+            }
+            for globals_, _ in modules
+        ]
+        proxy = _ThreadLocalProxy(current[0] if current else None)
+        for globals_, _ in modules:
+            globals_["_proxy"] = proxy
+            for attr_name in attr_names:
+                globals_[attr_name] = _ThreadLocalAttribute(proxy, attr_name)
+        try:
+            yield proxy
+        finally:
+            for (globals_, _), prev in zip(modules, previous):
+                for name in ["_proxy", *attr_names]:
+                    if name in prev:
+                        globals_[name] = prev[name]
+                    else:
+                        globals_.pop(name, None)
+
     @classmethod
     def create_module_class_proxy(
         cls,
@@ -215,6 +267,40 @@ class ModuleClsProxy(metaclass=_ModuleClsMeta):
         return cast("Callable[..., Any]", lcl[name])
 
 
+class _ThreadLocalProxy:
+    """Stands in for the object of a :class:`.ModuleClsProxy` module,
+    dispatching to the object set for the current thread."""
+
+    def __init__(self, default: Any) -> None:
+        self._default = default
+        self._local = threading.local()
+
+    def set(self, target: Any) -> None:
+        self._local.target = target
+
+    def reset(self) -> None:
+        self._local.__dict__.pop("target", None)
+
+    def _target(self) -> Any:
+        return getattr(self._local, "target", self._default)
+
+    def __getattr__(self, key: str) -> Any:
+        return getattr(self._target(), key)
+
+
+class _ThreadLocalAttribute:
+    """Stands in for a non-callable attribute of a :class:`.ModuleClsProxy`
+    module, e.g. ``context.config``, while a :class:`._ThreadLocalProxy`
+    is in effect."""
+
+    def __init__(self, proxy: _ThreadLocalProxy, name: str) -> None:
+        self._proxy = proxy
+        self._name = name
+
+    def __getattr__(self, key: str) -> Any:
+        return getattr(getattr(self._proxy._target(), self._name), key)
+
+
 def _with_legacy_names(translations: Any) -> Any:
     def decorate(fn: _C) -> _C:
         fn._legacy_translations = translations  # type: ignore[attr-defined]
@@ -6,6 +6,7 @@ import importlib
 from importlib import resources
 import importlib.machinery
 import importlib.util
+import json
 import os
 import pathlib
 import re
@@ -133,6 +134,32 @@ def load_module_py(module_id: str, path: str | os.PathLike[str]) -> ModuleType:
     return module
 
 
+def write_json(
+    path: str | os.PathLike[str], data: Any, indent: int | None = None
+) -> None:
+    """Write ``data`` as JSON to the given path, creating its directory
+    if needed.
+
+    The file is written to a temporary file in the same directory, which
+    then replaces the path, so that concurrent readers never see a
+    partially written file.
+
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=path.name, suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file_:
+            json.dump(data, file_, indent=indent, sort_keys=True)
+            file_.write("\n")
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
 def _preserving_path_as_str(path: str | os.PathLike[str]) -> str:
     """receive str/pathlike and return a string.
 
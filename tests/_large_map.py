@@ -1,3 +1,5 @@
+import random
+
 from alembic.script.revision import Revision
 from alembic.script.revision import RevisionMap
 
@@ -147,3 +149,63 @@ data = [
 ]
 
 map_ = RevisionMap(lambda: data)
+
+
+def scaled_data(count):
+    """Return at least ``count`` revisions, formed from successive copies of
+    :data:`data`, where the base of each copy descends from the head of the
+    previous one.
+
+    The revision identifiers of each copy are those of :data:`data` prefixed
+    with the four digit hex copy number.
+
+    """
+    (head,) = map_.heads
+    (base,) = map_.bases
+
+    revisions = []
+    for copy in range((count + len(data) - 1) // len(data)):
+        prefix = "%04x" % copy
+        for rev in data:
+            if rev.revision == base:
+                down_revision = "%04x%s" % (copy - 1, head) if copy else None
+            else:
+                down_revision = tuple(
+                    prefix + down for down in rev._versioned_down_revisions
+                )
+            revisions.append(Revision(prefix + rev.revision, down_revision))
+    return revisions
+
+
+def random_data(count, seed):
+    """Return ``count`` revisions forming a randomly generated graph with
+    many branch points, merge points, bases and ``depends_on``
+    dependencies.
+
+    """
+    rand = random.Random(seed)
+
+    revisions = []
+    ids = []
+    for idx in range(count):
+        if not ids or rand.random() < 0.02:
+            down_revision = ()
+        else:
+            down_revision = tuple(
+                sorted(
+                    {
+                        rand.choice(ids[-30:])
+                        for _ in range(1 if rand.random() < 0.7 else 2)
+                    }
+                )
+            )
+        if ids and rand.random() < 0.05:
+            dependencies = rand.choice(ids)
+        else:
+            dependencies = None
+        rev_id = "r%05d" % idx
+        revisions.append(
+            Revision(rev_id, down_revision, dependencies=dependencies)
+        )
+        ids.append(rev_id)
+    return revisions
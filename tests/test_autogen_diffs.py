@@ -1,3 +1,6 @@
+import os
+import threading
+
 from sqlalchemy import BIGINT
 from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
@@ -8,6 +11,7 @@ from sqlalchemy import DATE
 from sqlalchemy import DateTime
 from sqlalchemy import DECIMAL
 from sqlalchemy import Enum
+from sqlalchemy import event
 from sqlalchemy import FLOAT
 from sqlalchemy import ForeignKey
 from sqlalchemy import ForeignKeyConstraint
@@ -20,6 +24,7 @@ from sqlalchemy import JSON
 from sqlalchemy import LargeBinary
 from sqlalchemy import MetaData
 from sqlalchemy import Numeric
+from sqlalchemy import pool
 from sqlalchemy import PrimaryKeyConstraint
 from sqlalchemy import SmallInteger
 from sqlalchemy import String
@@ -51,6 +56,8 @@ from alembic.testing import is_not_
 from alembic.testing import mock
 from alembic.testing import schemacompare
 from alembic.testing import TestBase
+from alembic.testing.env import _get_staging_directory
+from alembic.testing.env import _sqlite_file_db
 from alembic.testing.env import clear_staging_env
 from alembic.testing.env import staging_env
 from alembic.testing.suite._autogen_fixtures import _default_name_filters
@@ -2223,6 +2230,149 @@ class AutogenInspectorCacheTest(AutogenFixtureTest, TestBase):
             ],
         )
 
+    def test_pre_cache_per_schema(self, connection, models):
+        """test that each schema is pre-cached by its own multi queries,
+        rather than the first schema's results preventing the others
+        from being pre-cached."""
+        from alembic.autogenerate.compare.util import _InspectorConv
+
+        autogen_context, uo = models
+        inspector = autogen_context.inspector
+        default_schema = connection.dialect.default_schema_name
+        tablenames = inspector.get_table_names()
+
+        insp = _InspectorConv(inspector)
+        for schema in (None, default_schema):
+            insp.pre_cache_tables(schema, tablenames, tablenames)
+
+        with (
+            mock.patch.object(
+                inspector, "get_columns", side_effect=AssertionError
+            ),
+            mock.patch.object(
+                inspector, "get_pk_constraint", side_effect=AssertionError
+            ),
+            mock.patch.object(
+                inspector, "get_indexes", side_effect=AssertionError
+            ),
+        ):
+            for schema in (None, default_schema):
+                m = MetaData()
+                t = Table("parent", m, schema=schema)
+                insp.reflect_table(t)
+                eq_(set(t.c.keys()), {"id", "name", "x", "y"})
+                eq_([c.name for c in t.primary_key], ["id"])
+
+
+class ReflectionWorkersTest(TestBase):
+    __only_on__ = "sqlite"
+    __requires__ = ("sqlalchemy_2",)
+
+    def setUp(self):
+        staging_env()
+        self.bind = _sqlite_file_db(poolclass=pool.QueuePool)
+        other = os.path.join(_get_staging_directory(), "scripts", "other.db")
+
+        @event.listens_for(self.bind, "connect")
+        def attach(dbapi_connection, connection_record):
+            dbapi_connection.execute("ATTACH DATABASE '%s' AS other" % other)
+
+        m1 = MetaData()
+        for schema in (None, "other"):
+            Table(
+                "a",
+                m1,
+                Column("id", Integer, primary_key=True),
+                Column("x", String(20)),
+                schema=schema,
+            )
+            Table(
+                "b", m1, Column("id", Integer, primary_key=True), schema=schema
+            )
+        m1.create_all(self.bind)
+
+        self.m2 = m2 = MetaData()
+        for schema in (None, "other"):
+            Table(
+                "a",
+                m2,
+                Column("id", Integer, primary_key=True),
+                Column("x", String(20)),
+                Column("y", Integer),
+                schema=schema,
+            )
+            Table(
+                "c", m2, Column("id", Integer, primary_key=True), schema=schema
+            )
+
+    def tearDown(self):
+        self.bind.dispose()
+        clear_staging_env()
+
+    def _compare(self, **opts):
+        threads = set()
+
+        def include_name(name, type_, parent_names):
+            threads.add(threading.current_thread())
+            return True
+
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(
+                conn,
+                opts=dict(
+                    include_schemas=True, include_name=include_name, **opts
+                ),
+            )
+            diffs = autogenerate.compare_metadata(context, self.m2)
+
+        eq_(threads, {threading.current_thread()})
+        return diffs
+
+    def _diff_keys(self, diffs):
+        return [
+            (
+                diff[0],
+                getattr(diff[-1], "table", diff[-1]).schema or "",
+                getattr(diff[-1], "name", None),
+            )
+            for diff in diffs
+        ]
+
+    def test_same_result_as_serial(self):
+        serial = self._compare()
+        concurrent = self._compare(reflection_workers=2)
+
+        eq_(self._diff_keys(concurrent), self._diff_keys(serial))
+        eq_(
+            self._diff_keys(concurrent),
+            [
+                ("add_table", "", "c"),
+                ("add_table", "other", "c"),
+                ("remove_table", "", "b"),
+                ("remove_table", "other", "b"),
+                ("add_column", "", "y"),
+                ("add_column", "other", "y"),
+            ],
+        )
+
+    def test_reflects_on_worker_connections(self):
+        connections = []
+
+        @event.listens_for(self.bind, "before_cursor_execute")
+        def track(conn, cursor, statement, parameters, context, executemany):
+            if "database_list" not in statement:
+                connections.append(conn.connection.dbapi_connection)
+
+        with self.bind.connect() as conn:
+            main = conn.connection.dbapi_connection
+            context = MigrationContext.configure(
+                conn, opts={"include_schemas": True, "reflection_workers": 2}
+            )
+            autogenerate.compare_metadata(context, self.m2)
+
+        assert connections
+        assert main not in connections
+
 
 class AutogenPlaceholderTableTest(AutogenFixtureTest, TestBase):
     """test for placeholder table creation for non-reflected FK targets (issue
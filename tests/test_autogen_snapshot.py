@@ -0,0 +1,554 @@
+import json
+import os
+from pathlib import Path
+import re
+
+from sqlalchemy import CheckConstraint
+from sqlalchemy import Column
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import Numeric
+from sqlalchemy import String
+from sqlalchemy import Table
+from sqlalchemy import types as sqltypes
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.elements import quoted_name
+
+from alembic import autogenerate
+from alembic import command
+from alembic import util
+from alembic.autogenerate import SchemaSnapshot
+from alembic.autogenerate.snapshot import _decode
+from alembic.autogenerate.snapshot import _encode
+from alembic.ddl.sqlite import SQLiteImpl
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic.testing import assert_raises_message
+from alembic.testing import eq_
+from alembic.testing import is_
+from alembic.testing import mock
+from alembic.testing import TestBase
+from alembic.testing.env import _get_staging_directory
+from alembic.testing.env import _sqlite_file_db
+from alembic.testing.env import _sqlite_testing_config
+from alembic.testing.env import clear_staging_env
+from alembic.testing.env import env_file_fixture
+from alembic.testing.env import staging_env
+from alembic.testing.env import write_script
+
+
+class SnapshotFileCacheTest(TestBase):
+    __only_on__ = "sqlite"
+    __requires__ = ("sqlalchemy_2",)
+
+    def setUp(self):
+        staging_env()
+        self.bind = _sqlite_file_db()
+        self.snapshot_file = os.path.join(
+            _get_staging_directory(), "snapshot.json"
+        )
+
+        m1 = MetaData()
+        Table(
+            "a",
+            m1,
+            Column("id", Integer, primary_key=True),
+            Column("x", String(20), server_default="q"),
+            Column("n", Numeric(10, 2)),
+            UniqueConstraint("x", name="uq_x"),
+            CheckConstraint("id > 0", name="ck_id"),
+        )
+        Table(
+            "b",
+            m1,
+            Column("id", Integer, primary_key=True),
+            Column("a_id", ForeignKey("a.id")),
+            Index("ix_a_id", "a_id"),
+        )
+        m1.create_all(self.bind)
+
+        self.m2 = m2 = MetaData()
+        Table(
+            "a",
+            m2,
+            Column("id", Integer, primary_key=True),
+            Column("x", String(30), server_default="q"),
+            Column("n", Numeric(10, 2)),
+            Column("y", Integer),
+        )
+
+    def tearDown(self):
+        self.bind.dispose()
+        clear_staging_env()
+
+    def _compare(self, **opts):
+        statements = []
+        with self.bind.connect() as conn:
+
+            @event.listens_for(conn, "before_cursor_execute")
+            def track(
+                conn, cursor, statement, parameters, context, executemany
+            ):
+                statements.append(statement)
+
+            context = MigrationContext.configure(
+                conn,
+                opts={
+                    "reflection_snapshot_file": self.snapshot_file,
+                    "compare_type": True,
+                    **opts,
+                },
+            )
+            diffs = autogenerate.compare_metadata(context, self.m2)
+        return [
+            re.sub(r" at 0x[0-9a-f]+", "", repr(diff)) for diff in diffs
+        ], statements
+
+    def test_snapshot_reused(self):
+        first, first_statements = self._compare()
+        assert os.path.exists(self.snapshot_file)
+        mtime = os.stat(self.snapshot_file).st_mtime_ns
+
+        second, second_statements = self._compare()
+
+        eq_(len(first), 6)
+        eq_(second, first)
+        assert len(first_statements) > len(second_statements)
+        # only the fingerprint and the heads are queried
+        assert all(
+            stmt.startswith("PRAGMA")
+            and ("schema_version" in stmt or "alembic_version" in stmt)
+            or stmt == "PRAGMA database_list"
+            for stmt in second_statements
+        ), second_statements
+        eq_(os.stat(self.snapshot_file).st_mtime_ns, mtime)
+
+    def test_snapshot_written_atomically(self):
+        with mock.patch(
+            "alembic.util.pyfiles.os.replace", side_effect=os.replace
+        ) as replace:
+            self._compare()
+
+        eq_(len(replace.mock_calls), 1)
+        eq_(replace.mock_calls[0].args[1], Path(self.snapshot_file))
+        eq_(
+            [
+                name
+                for name in os.listdir(_get_staging_directory())
+                if name.endswith(".tmp")
+            ],
+            [],
+        )
+
+    def test_schema_change_invalidates(self):
+        first, _ = self._compare()
+
+        with self.bind.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE a ADD COLUMN y INTEGER")
+
+        second, second_statements = self._compare()
+        eq_(len(second), len(first) - 1)
+        assert any("table_xinfo" in stmt for stmt in second_statements)
+
+        with open(self.snapshot_file) as file_:
+            data = json.load(file_)
+        eq_(
+            [col["name"] for col in data["schemas"][0]["columns"]["a"]],
+            ["id", "x", "n", "y"],
+        )
+
+    def test_tables_missing_from_snapshot_reflected(self):
+        def include_name(name, type_, parent_names):
+            return name != "b"
+
+        first, _ = self._compare(include_name=include_name)
+        eq_(len(first), 4)
+
+        second, second_statements = self._compare()
+        eq_(len(second), 6)
+        assert any("table_xinfo" in stmt for stmt in second_statements)
+
+        with open(self.snapshot_file) as file_:
+            data = json.load(file_)
+        eq_(sorted(data["schemas"][0]["columns"]), ["a", "b"])
+
+    def test_no_fingerprint(self):
+        with mock.patch.object(
+            SQLiteImpl, "reflection_fingerprint", return_value=None
+        ):
+            first, _ = self._compare()
+        eq_(len(first), 6)
+        assert not os.path.exists(self.snapshot_file)
+
+    def test_corrupt_snapshot_ignored(self):
+        with open(self.snapshot_file, "w") as file_:
+            file_.write('{"version": 0}')
+
+        first, _ = self._compare()
+        eq_(len(first), 6)
+
+        with open(self.snapshot_file) as file_:
+            eq_(json.load(file_)["version"], 1)
+
+    def test_compare_without_connection(self):
+        first, _ = self._compare()
+
+        context = MigrationContext.configure(
+            dialect_name="sqlite",
+            opts={
+                "reflection_snapshot_file": self.snapshot_file,
+                "compare_type": True,
+            },
+        )
+        eq_(context.get_current_heads(), ())
+        diffs = autogenerate.compare_metadata(context, self.m2)
+        eq_(
+            [re.sub(r" at 0x[0-9a-f]+", "", repr(diff)) for diff in diffs],
+            first,
+        )
+
+    def test_no_snapshot_without_connection(self):
+        context = MigrationContext.configure(
+            dialect_name="sqlite",
+            opts={"reflection_snapshot_file": self.snapshot_file},
+        )
+        assert_raises_message(
+            util.CommandError,
+            "No database connection, and schema snapshot file .* "
+            "does not exist",
+            autogenerate.compare_metadata,
+            context,
+            self.m2,
+        )
+
+
+class SnapshotCommandTest(TestBase):
+    __only_on__ = "sqlite"
+    __requires__ = ("sqlalchemy_2",)
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.snapshot_file = os.path.join(
+            _get_staging_directory(), "snapshot.json"
+        )
+
+        self.a = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(self.a, "revision a", refresh=True)
+        write_script(
+            script,
+            self.a,
+            f"""\
+revision = '{self.a}'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        "a",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("x", sa.String(20)),
+    )
+
+
+def downgrade():
+    op.drop_table("a")
+
+""",
+        )
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _online_env(self):
+        env_file_fixture(f"""
+from sqlalchemy import engine_from_config
+
+engine = engine_from_config(
+    config.get_section(config.config_ini_section),
+    prefix="sqlalchemy.",
+)
+
+with engine.connect() as connection:
+    context.configure(
+        connection=connection,
+        reflection_snapshot_file={self.snapshot_file!r},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+engine.dispose()
+""")
+
+    def _snapshot_env(self):
+        env_file_fixture(f"""
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+target_metadata = MetaData()
+Table(
+    "a",
+    target_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("x", String(20)),
+    Column("y", Integer),
+)
+
+context.configure(
+    dialect_name="sqlite",
+    target_metadata=target_metadata,
+    reflection_snapshot_file={self.snapshot_file!r},
+)
+with context.begin_transaction():
+    context.run_migrations()
+""")
+
+    def test_snapshot_written_after_upgrade(self):
+        self._online_env()
+        command.upgrade(self.cfg, "head")
+
+        with open(self.snapshot_file) as file_:
+            data = json.load(file_)
+        eq_(data["heads"], [self.a])
+        eq_(
+            [col["name"] for col in data["schemas"][0]["columns"]["a"]],
+            ["id", "x"],
+        )
+
+    def test_no_snapshot_written_without_upgrade(self):
+        self._online_env()
+        command.upgrade(self.cfg, "head")
+        os.unlink(self.snapshot_file)
+
+        command.upgrade(self.cfg, "head")
+        assert not os.path.exists(self.snapshot_file)
+
+    def test_autogenerate_from_snapshot(self):
+        self._online_env()
+        command.upgrade(self.cfg, "head")
+        os.unlink(os.path.join(_get_staging_directory(), "scripts/foo.db"))
+
+        self._snapshot_env()
+        script = command.revision(self.cfg, autogenerate=True)
+        eq_(script.down_revision, self.a)
+        with open(script.path) as file_:
+            text = file_.read()
+        assert "op.add_column('a', sa.Column('y', sa.Integer()" in text
+        assert "create_table" not in text
+
+        assert_raises_message(
+            util.CommandError,
+            "Can't run migrations without a database connection",
+            command.upgrade,
+            self.cfg,
+            "head",
+        )
+
+
+class SnapshotTypesTest(TestBase):
+    __requires__ = ("sqlalchemy_2",)
+
+    def _round_trip(self, value, dialect=None):
+        if dialect is None:
+            dialect = postgresql.dialect()
+        return _decode(json.loads(json.dumps(_encode(value))), dialect)
+
+    def test_types(self):
+        for type_ in [
+            sqltypes.VARCHAR(20),
+            sqltypes.NUMERIC(10, 2),
+            postgresql.TIMESTAMP(timezone=True, precision=3),
+            postgresql.ARRAY(sqltypes.INTEGER(), dimensions=2),
+            postgresql.INTERVAL(fields="DAY"),
+            mysql.VARCHAR(30, charset="utf8mb4"),
+            mysql.INTEGER(display_width=11, unsigned=True),
+        ]:
+            eq_(repr(self._round_trip(type_)), repr(type_))
+
+    def test_enum(self):
+        type_ = self._round_trip(
+            postgresql.ENUM("a", "b", name="my_enum", schema="s1")
+        )
+        is_(type(type_), postgresql.ENUM)
+        eq_(type_.enums, ["a", "b"])
+        eq_(type_.name, "my_enum")
+        eq_(type_.schema, "s1")
+
+    def test_quoted_name(self):
+        value = self._round_trip(
+            {"name": quoted_name("SomeName", True), "other": "plain"}
+        )
+        is_(value["name"].quote, True)
+        is_(type(value["other"]), str)
+
+    def test_module_not_allowed(self):
+        value = {"__type__": ["os:PathLike", [], {}]}
+        is_(_decode(value, postgresql.dialect()), sqltypes.NULLTYPE)
+
+    def test_snapshot_round_trip(self):
+        snapshot = SchemaSnapshot(
+            "postgresql",
+            "fp",
+            ["public", "s1"],
+            {
+                None: {
+                    "table_names": ["t"],
+                    "columns": {
+                        "t": [
+                            {
+                                "name": "id",
+                                "type": sqltypes.INTEGER(),
+                                "nullable": False,
+                                "default": None,
+                            }
+                        ]
+                    },
+                    "table_comment": NotImplementedError,
+                }
+            },
+        )
+        restored = SchemaSnapshot.from_dict(
+            json.loads(json.dumps(snapshot.to_dict())), postgresql.dialect()
+        )
+        eq_(restored.to_dict(), snapshot.to_dict())
+        is_(restored.schemas[None]["table_comment"], NotImplementedError)
+
+
+class CompareMetadataPairTest(TestBase):
+    __requires__ = ("sqlalchemy_2",)
+
+    def _metadata(self, **kw):
+        m = MetaData()
+        Table(
+            "a",
+            m,
+            Column("id", Integer, primary_key=True),
+            Column("x", String(kw.get("x_length", 20)), server_default="q"),
+            Column("n", Numeric(10, 2), nullable=kw.get("n_nullable", True)),
+            UniqueConstraint("x", name="uq_x"),
+            CheckConstraint("id > 0", name="ck_id"),
+            comment="table a",
+        )
+        Table(
+            "b",
+            m,
+            Column("id", Integer, primary_key=True),
+            Column(
+                "a_id",
+                ForeignKey("a.id", name="fk_a", ondelete=kw.get("ondelete")),
+            ),
+            Index("ix_a_id", "a_id", unique=kw.get("unique", False)),
+        )
+        return m
+
+    def _diffs(self, upgrade_ops):
+        result = []
+        for diff in upgrade_ops.as_diffs():
+            if isinstance(diff, list):
+                result.extend((d[0], d[2], d[3]) for d in diff)
+            elif diff[0] in ("add_table", "remove_table"):
+                result.append((diff[0], diff[1].schema, diff[1].name))
+            elif diff[0] in ("add_column", "remove_column"):
+                result.append((diff[0], diff[2], diff[3].name))
+            else:
+                result.append((diff[0], diff[1].table.name, diff[1].name))
+        return sorted(result)
+
+    def test_no_changes(self):
+        for dialect in ("sqlite", "postgresql", "mysql"):
+            upgrade_ops = autogenerate.compare_metadata_pair(
+                self._metadata(),
+                self._metadata(),
+                dialect=dialect,
+                opts={"compare_server_default": True},
+            )
+            eq_(upgrade_ops.as_diffs(), [])
+
+    def test_changes(self):
+        m2 = self._metadata(
+            x_length=30, n_nullable=False, ondelete="CASCADE", unique=True
+        )
+        m2.remove(m2.tables["a"])
+        Table(
+            "a",
+            m2,
+            Column("id", Integer, primary_key=True),
+            Column("x", String(30), server_default="q"),
+            Column("n", Numeric(10, 2), nullable=False),
+            Column("y", Integer),
+            comment="table a",
+        )
+        Table("c", m2, Column("id", Integer, primary_key=True))
+
+        upgrade_ops = autogenerate.compare_metadata_pair(
+            self._metadata(), m2, dialect=postgresql.dialect()
+        )
+        eq_(
+            self._diffs(upgrade_ops),
+            [
+                ("add_column", "a", "y"),
+                ("add_fk", "b", "fk_a"),
+                ("add_index", "b", "ix_a_id"),
+                ("add_table", None, "c"),
+                ("modify_nullable", "a", "n"),
+                ("modify_type", "a", "x"),
+                ("remove_constraint", "a", "ck_id"),
+                ("remove_constraint", "a", "uq_x"),
+                ("remove_fk", "b", "fk_a"),
+                ("remove_index", "b", "ix_a_id"),
+            ],
+        )
+
+    def test_schemas(self):
+        m1 = self._metadata()
+        Table("s", m1, Column("id", Integer, primary_key=True), schema="s1")
+
+        m2 = self._metadata()
+        Table("t", m2, Column("id", Integer, primary_key=True), schema="s2")
+
+        upgrade_ops = autogenerate.compare_metadata_pair(
+            m1, m2, dialect="postgresql"
+        )
+        eq_(
+            self._diffs(upgrade_ops),
+            [("add_table", "s2", "t"), ("remove_table", "s1", "s")],
+        )
+
+    def test_matches_database(self):
+        m1 = self._metadata()
+        m2 = self._metadata(x_length=30, ondelete="CASCADE", unique=True)
+        Table("c", m2, Column("id", Integer, primary_key=True))
+        m2.remove(m2.tables["a"])
+        Table(
+            "a",
+            m2,
+            Column("id", Integer, primary_key=True),
+            Column("x", String(30), server_default="r"),
+            Column("n", Numeric(10, 2)),
+            UniqueConstraint("x", name="uq_x"),
+        )
+
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            m1.create_all(conn)
+            context = MigrationContext.configure(
+                conn, opts={"compare_server_default": True}
+            )
+            expected = autogenerate.produce_migrations(context, m2)
+
+        upgrade_ops = autogenerate.compare_metadata_pair(
+            m1,
+            m2,
+            dialect=engine.dialect,
+            opts={"compare_server_default": True},
+        )
+        eq_(self._diffs(upgrade_ops), self._diffs(expected.upgrade_ops))
+        eq_(len(upgrade_ops.as_diffs()), 7)
@@ -1,18 +1,23 @@
 from configparser import RawConfigParser
 from contextlib import contextmanager
+import csv
 import inspect
 from io import BytesIO
 from io import StringIO
 from io import TextIOWrapper
+import json
 import os
 import pathlib
 import re
 import shutil
 from typing import cast
 
+from sqlalchemy import create_engine as sqla_create_engine
+from sqlalchemy import event
 from sqlalchemy import exc as sqla_exc
 from sqlalchemy import text
 from sqlalchemy import VARCHAR
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.engine import Engine
 from sqlalchemy.sql.schema import Column
 
@@ -21,14 +26,18 @@ from alembic import command
 from alembic import config
 from alembic import testing
 from alembic import util
+from alembic.runtime.migration import MigrationContext
+from alembic.runtime.profiling import MigrationProfiler
 from alembic.script import ScriptDirectory
 from alembic.testing import assert_raises
 from alembic.testing import assert_raises_message
 from alembic.testing import eq_
+from alembic.testing import expect_raises
 from alembic.testing import expect_raises_message
 from alembic.testing import is_false
 from alembic.testing import is_true
 from alembic.testing import mock
+from alembic.testing import ne_
 from alembic.testing.env import _get_staging_directory
 from alembic.testing.env import _multidb_testing_config
 from alembic.testing.env import _no_sql_testing_config
@@ -410,6 +419,116 @@ class CurrentTest(_BufMixin, TestBase):
         command.stamp(self.cfg, ())
 
 
+class HeadsStatusTest(TestBase):
+    @classmethod
+    def setup_class(cls):
+        cls.bind = _sqlite_file_db(scope="class")
+        cls.env = env = staging_env()
+        cls.cfg = _sqlite_testing_config()
+        cls.a1 = env.generate_revision("a1", "a1")
+        cls.a2 = env.generate_revision("a2", "a2")
+        cls.b1 = env.generate_revision("b1", "b1", head="base")
+
+    @classmethod
+    def teardown_class(cls):
+        clear_staging_env()
+
+    def _status(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(conn)
+            return context.get_heads_status(script)
+
+    def test_no_version_table(self):
+        with self.bind.begin() as conn:
+            conn.exec_driver_sql("drop table if exists alembic_version")
+
+        status = self._status()
+        eq_(status.current_heads, ())
+        eq_(set(status.heads), {self.a2.revision, self.b1.revision})
+        eq_(set(status.missing), {self.a2.revision, self.b1.revision})
+        is_false(status.is_current)
+
+        with self.bind.connect() as conn:
+            is_false(_connectable_has_table(conn, "alembic_version", None))
+
+    def test_no_version_table_in_transaction(self):
+        with self.bind.begin() as conn:
+            conn.exec_driver_sql("drop table if exists alembic_version")
+
+        script = ScriptDirectory.from_config(self.cfg)
+        with self.bind.begin() as conn:
+            conn.exec_driver_sql("create table t (x integer)")
+            context = MigrationContext.configure(conn)
+            eq_(context.get_heads_status(script).current_heads, ())
+            conn.exec_driver_sql("insert into t (x) values (1)")
+            eq_(conn.exec_driver_sql("select x from t").scalar(), 1)
+            conn.exec_driver_sql("drop table t")
+
+    def test_at_heads(self):
+        command.stamp(self.cfg, ())
+        command.stamp(self.cfg, "heads")
+
+        with mock.patch.object(
+            MigrationContext,
+            "_has_version_table",
+            side_effect=Exception("version table was reflected"),
+        ):
+            status = self._status()
+        eq_(set(status.current_heads), {self.a2.revision, self.b1.revision})
+        eq_(status.missing, ())
+        is_true(status.is_current)
+
+    def test_behind(self):
+        command.stamp(self.cfg, ())
+        command.stamp(self.cfg, (self.a1.revision, self.b1.revision))
+
+        status = self._status()
+        eq_(status.missing, (self.a2.revision,))
+        is_false(status.is_current)
+
+    def test_modules_not_loaded(self):
+        command.stamp(self.cfg, ())
+        command.stamp(self.cfg, "heads")
+
+        with mock.patch(
+            "alembic.util.load_python_file",
+            side_effect=Exception("module was loaded"),
+        ):
+            status = self._status()
+        is_true(status.is_current)
+
+    def test_script_directory_unchanged(self):
+        command.stamp(self.cfg, ())
+        command.stamp(self.cfg, "heads")
+
+        script = ScriptDirectory.from_config(self.cfg)
+        with self.bind.connect() as conn:
+            context = MigrationContext.configure(conn)
+            is_true(context.get_heads_status(script).is_current)
+
+        is_false(script.parse_revision_headers)
+        is_false("_revision_map" in script.revision_map.__dict__)
+        is_true(script.get_revision(self.a2.revision).module)
+
+    def test_loaded_revision_map_used(self):
+        command.stamp(self.cfg, ())
+        command.stamp(self.cfg, "heads")
+
+        script = ScriptDirectory.from_config(self.cfg)
+        script.get_heads()
+        with (
+            mock.patch.object(
+                script,
+                "_load_scripts",
+                side_effect=Exception("revisions were loaded"),
+            ),
+            self.bind.connect() as conn,
+        ):
+            context = MigrationContext.configure(conn)
+            is_true(context.get_heads_status(script).is_current)
+
+
 class RevisionTest(TestBase):
     def setUp(self):
         self.env = staging_env()
@@ -770,6 +889,46 @@ for db_name in re.split(r",\\s*", db_names):
 
 
 class _StampTest:
+    @contextmanager
+    def _capture_online_sql(self):
+        statements = []
+
+        def bce(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith(("INSERT", "UPDATE")):
+                statements.append((statement, tuple(parameters)))
+
+        event.listen(Engine, "before_cursor_execute", bce)
+        try:
+            with capture_engine_context_buffer():
+                yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", bce)
+
+    def _assert_online_sql(self, statements, origin, destinations):
+        # version numbers are sent as bound parameters, so that the
+        # same statement is emitted for each of them
+        expected = []
+        destinations = sorted(destinations)
+        if origin:
+            expected.append(
+                (
+                    "UPDATE alembic_version SET version_num=? "
+                    "WHERE alembic_version.version_num = ?",
+                    (mock.ANY, origin),
+                )
+            )
+        expected.extend(
+            [
+                (
+                    "INSERT INTO alembic_version (version_num) VALUES (?)",
+                    (mock.ANY,),
+                )
+            ]
+            * (len(destinations) - len(expected))
+        )
+        eq_(statements, expected)
+        eq_(sorted(params[0] for stmt, params in statements), destinations)
+
     def _assert_sql(self, emitted_sql, origin, destinations):
         ins_expr = (
             r"INSERT INTO alembic_version \(version_num\) "
@@ -864,25 +1023,25 @@ class StampMultipleHeadsTest(TestBase, _StampTest):
         self._assert_sql(buf.getvalue(), None, {self.a, self.e, self.f})
 
     def test_online_stamp_multi_rev_nonsensical(self):
-        with capture_engine_context_buffer() as buf:
+        with self._capture_online_sql() as statements:
             command.stamp(self.cfg, [self.a, self.e, self.f])
 
         # TODO: this shouldn't be possible, because e/f require b as a
         # dependency
-        self._assert_sql(buf.getvalue(), None, {self.a, self.e, self.f})
+        self._assert_online_sql(statements, None, {self.a, self.e, self.f})
 
     def test_online_stamp_multi_rev_from_real_ancestor(self):
         command.stamp(self.cfg, [self.a])
-        with capture_engine_context_buffer() as buf:
+        with self._capture_online_sql() as statements:
             command.stamp(self.cfg, [self.e, self.f])
 
-        self._assert_sql(buf.getvalue(), self.a, {self.e, self.f})
+        self._assert_online_sql(statements, self.a, {self.e, self.f})
 
     def test_online_stamp_version_already_there(self):
         command.stamp(self.cfg, [self.c, self.e])
-        with capture_engine_context_buffer() as buf:
+        with self._capture_online_sql() as statements:
             command.stamp(self.cfg, [self.c, self.e])
-        self._assert_sql(buf.getvalue(), None, {})
+        self._assert_online_sql(statements, None, {})
 
     def test_sql_stamp_multi_rev_from_multi_start(self):
         with capture_context_buffer() as buf:
@@ -925,10 +1084,10 @@ class StampMultipleHeadsTest(TestBase, _StampTest):
             )
             eq_(result.rowcount, 1)
 
-        with capture_engine_context_buffer() as buf:
+        with self._capture_online_sql() as statements:
             command.stamp(self.cfg, [self.a, self.e, self.f], purge=True)
 
-        self._assert_sql(buf.getvalue(), None, {self.a, self.e, self.f})
+        self._assert_online_sql(statements, None, {self.a, self.e, self.f})
 
     def test_stamp_purge_no_sql(self):
         assert_raises_message(
@@ -1142,6 +1301,294 @@ down_revision = '%s'
             )
 
 
+class UpgradeManyTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(
+            script,
+            a,
+            """
+from alembic import op
+
+revision = '%s'
+down_revision = None
+
+
+def upgrade():
+    op.execute("CREATE TABLE foo (id integer)")
+""" % a,
+        )
+        script.generate_revision(b, None, refresh=True)
+        write_script(
+            script,
+            b,
+            """
+from alembic import op
+
+revision = '%s'
+down_revision = '%s'
+
+
+def upgrade():
+    op.execute("CREATE TABLE bar (id integer)")
+""" % (b, a),
+        )
+        self.urls = [
+            "sqlite:///%s/db%d.db" % (_get_staging_directory(), i)
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _heads(self, url):
+        engine = sqla_create_engine(url)
+        try:
+            with engine.connect() as conn:
+                return {
+                    row[0]
+                    for row in conn.execute(
+                        text("select version_num from alembic_version")
+                    )
+                }
+        finally:
+            engine.dispose()
+
+    def test_upgrade_many(self):
+        buf = StringIO()
+        self.cfg.stdout = buf
+        command.upgrade_many(self.cfg, self.a, self.urls[0:1])
+
+        outcomes = command.upgrade_many(
+            self.cfg, "heads", self.urls, workers=3
+        )
+
+        eq_([outcome.url for outcome in outcomes], self.urls)
+        for outcome in outcomes:
+            is_true(outcome.succeeded)
+            eq_(self._heads(outcome.url), {self.b})
+        eq_(outcomes[0].from_heads, (self.a,))
+        eq_(outcomes[0].revisions, (self.b,))
+        for outcome in outcomes[1:]:
+            eq_(outcome.from_heads, ())
+            eq_(outcome.revisions, (self.a, self.b))
+        eq_(buf.getvalue().count("applied 2 revision(s)"), len(self.urls) - 1)
+        eq_(buf.getvalue().count("applied 1 revision(s)"), 2)
+
+        # the configuration passed is unchanged
+        eq_(
+            self.cfg.get_main_option("sqlalchemy.url"),
+            "sqlite:///%s/scripts/foo.db" % _get_staging_directory(),
+        )
+
+    def test_upgrade_many_failure(self):
+        buf = StringIO()
+        self.cfg.stdout = buf
+        bad_url = "sqlite:///%s/nonexistent/db.db" % _get_staging_directory()
+
+        with expect_raises_message(
+            util.CommandError,
+            r"1 of 2 database\(s\) failed to upgrade: %s$"
+            % re.escape(bad_url),
+        ):
+            command.upgrade_many(self.cfg, "heads", [self.urls[0], bad_url])
+
+        eq_(self._heads(self.urls[0]), {self.b})
+        assert "%s: applied 2 revision(s)" % self.urls[0] in buf.getvalue()
+        assert (
+            "%s: FAILED after" % bad_url in buf.getvalue()
+            and "unable to open database file" in buf.getvalue()
+        )
+
+    def test_failure_exit_status(self):
+        bad_url = "sqlite:///%s/nonexistent/db.db" % _get_staging_directory()
+        self.cfg.stdout = StringIO()
+        cmd = config.CommandLine()
+        options = cmd.parser.parse_args(
+            ["upgrade_many", "heads", self.urls[0], bad_url]
+        )
+
+        with (
+            mock.patch("alembic.util.messaging.msg") as msg,
+            expect_raises(SystemExit, check_context=False) as exc,
+        ):
+            cmd.run_cmd(self.cfg, options)
+
+        ne_(exc.error.code, 0)
+        eq_(
+            msg.mock_calls,
+            [
+                mock.call(
+                    "FAILED: 1 of 2 database(s) failed to upgrade: %s"
+                    % bad_url,
+                    quiet=False,
+                )
+            ],
+        )
+        eq_(self._heads(self.urls[0]), {self.b})
+
+    def test_range_not_allowed(self):
+        with expect_raises_message(
+            util.CommandError, "Range revision not allowed"
+        ):
+            command.upgrade_many(
+                self.cfg, "%s:%s" % (self.a, self.b), self.urls
+            )
+
+    def test_argparser(self):
+        cmd = config.CommandLine()
+        options = cmd.parser.parse_args(
+            ["upgrade_many", "heads", *self.urls[0:2], "--workers", "2"]
+        )
+        self.cfg.stdout = StringIO()
+        cmd.run_cmd(self.cfg, options)
+        for url in self.urls[0:2]:
+            eq_(self._heads(url), {self.b})
+
+
+class ProfileTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a = a = util.rev_id()
+        self.b = b = util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        script.generate_revision(a, None, refresh=True)
+        write_script(
+            script,
+            a,
+            """
+from alembic import op
+
+revision = '%s'
+down_revision = None
+
+
+def upgrade():
+    op.execute("CREATE TABLE foo (id integer)")
+    op.execute("CREATE TABLE bar (id integer)")
+
+
+def downgrade():
+    op.execute("DROP TABLE bar")
+    op.execute("DROP TABLE foo")
+""" % a,
+        )
+        script.generate_revision(b, None, refresh=True)
+        write_script(
+            script,
+            b,
+            """
+revision = '%s'
+down_revision = '%s'
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
+""" % (b, a),
+        )
+        self.staging = _get_staging_directory()
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def test_upgrade_json(self):
+        path = os.path.join(self.staging, "profile.json")
+        command.upgrade(self.cfg, "heads", profile=path)
+
+        with open(path) as file_:
+            steps = json.load(file_)["steps"]
+
+        eq_([step["revision"] for step in steps], [self.a, self.b])
+        eq_({step["direction"] for step in steps}, {"upgrade"})
+        eq_([step["statement_count"] for step in steps], [2, 0])
+        eq_(
+            [stmt["sql"] for stmt in steps[0]["statements"]],
+            ["CREATE TABLE foo (id integer)", "CREATE TABLE bar (id integer)"],
+        )
+        for step in steps:
+            is_true(step["elapsed"] >= step["db_elapsed"] >= 0)
+            eq_(
+                step["python_elapsed"],
+                step["elapsed"] - step["db_elapsed"],
+            )
+            eq_(
+                step["db_elapsed"],
+                sum(stmt["elapsed"] for stmt in step["statements"]),
+            )
+
+    def test_downgrade_csv(self):
+        command.upgrade(self.cfg, "heads")
+        path = os.path.join(self.staging, "profile.csv")
+        command.downgrade(self.cfg, "base", profile=path)
+
+        with open(path, newline="") as file_:
+            rows = list(csv.DictReader(file_))
+
+        eq_([row["revision"] for row in rows], [self.b, self.a])
+        eq_({row["direction"] for row in rows}, {"downgrade"})
+        eq_([row["statement_count"] for row in rows], ["0", "2"])
+        eq_(rows[0]["slowest_statement"], "")
+        assert rows[1]["slowest_statement"].startswith("DROP TABLE")
+
+    def test_no_profile(self):
+        command.upgrade(self.cfg, "heads")
+        eq_(
+            [
+                name
+                for name in os.listdir(self.staging)
+                if name.startswith("profile")
+            ],
+            [],
+        )
+
+    def test_statement_elapsed_excludes_describe(self):
+        profiler = MigrationProfiler()
+        profiler._local.statements = statements = []
+        clock = [10.0]
+
+        def describe(construct, dialect):
+            # describing the statement takes time of its own
+            clock[0] += 5.0
+            return "select 1"
+
+        with (
+            mock.patch(
+                "alembic.runtime.profiling.time.perf_counter",
+                side_effect=lambda: clock[0],
+            ),
+            mock.patch("alembic.runtime.profiling._describe", describe),
+        ):
+            with profiler.statement(text("select 1"), sqlite.dialect()):
+                clock[0] += 2.0
+
+        eq_(statements, [{"sql": "select 1", "elapsed": 2.0}])
+
+    def test_argparser(self):
+        path = os.path.join(self.staging, "profile.json")
+        cmd = config.CommandLine()
+        options = cmd.parser.parse_args(
+            ["upgrade", "heads", "--profile", path]
+        )
+        cmd.run_cmd(self.cfg, options)
+
+        with open(path) as file_:
+            eq_(len(json.load(file_)["steps"]), 2)
+
+
 class EditTest(TestBase):
     @classmethod
     def setup_class(cls):
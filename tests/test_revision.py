@@ -1,5 +1,9 @@
+import sys
+from unittest import mock
+
 from sqlalchemy.testing import util as sqla_testing_util
 
+from alembic import testing
 from alembic.script.revision import CycleDetected
 from alembic.script.revision import DependencyCycleDetected
 from alembic.script.revision import DependencyLoopDetected
@@ -11,11 +15,21 @@ from alembic.script.revision import RevisionMap
 from alembic.testing import assert_raises_message
 from alembic.testing import eq_
 from alembic.testing import expect_raises_message
+from alembic.testing import is_
+from alembic.testing import is_false
+from alembic.testing import is_true
 from alembic.testing.fixtures import TestBase
 from . import _large_map
 
 
 class APITest(TestBase):
+    def test_revision_slots(self):
+        rev = Revision("".join(["ab", "cd"]), ("".join(["ef", "gh"]),))
+        is_false(hasattr(rev, "__dict__"))
+        eq_(rev.nextrev, frozenset())
+        is_(rev.revision, sys.intern("abcd"))
+        is_(rev.down_revision, sys.intern("efgh"))
+
     def test_invalid_datatype(self):
         map_ = RevisionMap(
             lambda: [
@@ -75,6 +89,24 @@ class APITest(TestBase):
         map_.add_revision(Revision("d1", ("c1",)))
         eq_(map_.heads, ("c2", "d1"))
 
+    def test_add_revision_partial_id(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("aaaa1", ()),
+                Revision("bbbb1", ("aaaa1",)),
+            ]
+        )
+        eq_(map_.get_revision("bbbb").revision, "bbbb1")
+
+        map_.add_revision(Revision("bbbb2", ("bbbb1",)))
+        eq_(map_.get_revision("bbbb2").revision, "bbbb2")
+        assert_raises_message(
+            RevisionError,
+            "Multiple revisions start with 'bbbb': 'bbbb1', 'bbbb2'...",
+            map_.get_revision,
+            "bbbb",
+        )
+
     def test_get_revision_head_single(self):
         map_ = RevisionMap(
             lambda: [
@@ -1303,6 +1335,424 @@ class LargeMapTest(DownIterateTest):
                 assert remaining.intersection(ancestors)
 
 
+class ReachabilityTest(TestBase):
+    def _dependency_map(self):
+        return RevisionMap(
+            lambda: [
+                Revision("base1", ()),
+                Revision("a1", ("base1",)),
+                Revision("b1", ("a1",), dependencies="a2"),
+                Revision("c1", ("b1",)),
+                Revision("base2", ()),
+                Revision("a2", ("base2",)),
+                Revision("b2", ("a2",)),
+            ]
+        )
+
+    def _assert_matches_traversal(self, map_, include_dependencies):
+        revs = [rev for rev in map_._revision_map.values() if rev is not None]
+        for rev in revs:
+            ancestors = set(
+                map_._get_ancestor_nodes(
+                    [rev], include_dependencies=include_dependencies
+                )
+            ).difference([rev])
+            for other in revs:
+                eq_(
+                    map_._is_ancestor(
+                        other, rev, include_dependencies=include_dependencies
+                    ),
+                    other in ancestors,
+                )
+
+    @testing.combinations(True, False, argnames="include_dependencies")
+    def test_dependency_map(self, include_dependencies):
+        self._assert_matches_traversal(
+            self._dependency_map(), include_dependencies
+        )
+
+    @testing.combinations(True, False, argnames="include_dependencies")
+    def test_large_map(self, include_dependencies):
+        self._assert_matches_traversal(_large_map.map_, include_dependencies)
+
+    @testing.combinations(True, False, argnames="include_dependencies")
+    def test_random_map(self, include_dependencies):
+        for seed in range(3):
+            data = _large_map.random_data(300, seed)
+            self._assert_matches_traversal(
+                RevisionMap(lambda: data), include_dependencies
+            )
+
+    def test_dependencies(self):
+        map_ = self._dependency_map()
+        a2, c1 = map_.get_revision("a2"), map_.get_revision("c1")
+        is_true(map_._is_ancestor(a2, c1))
+        is_false(map_._is_ancestor(a2, c1, include_dependencies=False))
+        is_false(map_._is_ancestor(c1, a2))
+        is_false(map_._is_ancestor(c1, c1))
+
+    def test_first_descendant(self):
+        reachability = self._dependency_map()._reachability
+        eq_(reachability.first_descendant("a2", ["b2", "c1"]), 0)
+        eq_(reachability.first_descendant("a2", ["a1", "c1", "b2"]), 1)
+        eq_(reachability.first_descendant("a2", ["a2", "base1", "a1"]), None)
+        eq_(reachability.first_descendant("a2", []), None)
+
+    def test_add_revision(self):
+        map_ = self._dependency_map()
+        b2 = map_.get_revision("b2")
+        is_false(map_._is_ancestor(b2, map_.get_revision("c1")))
+
+        map_.add_revision(Revision("d1", ("c1", "b2")))
+        is_true(map_._is_ancestor(b2, map_.get_revision("d1")))
+
+
+def _legacy_topological_sort(map_, revisions, heads):
+    """The topological sort used prior to the counting of pending
+    descendants, retained to verify that the ordering is unchanged.
+
+    """
+    id_to_rev = map_._revision_map
+
+    def get_ancestors(rev_id):
+        return {
+            r.revision for r in map_._get_ancestor_nodes([id_to_rev[rev_id]])
+        }
+
+    todo = {d.revision for d in revisions}
+    inserted_order = list(id_to_rev)
+    current_heads = sorted(
+        {d.revision for d in heads if d.revision in todo},
+        key=inserted_order.index,
+    )
+    ancestors_by_idx = [get_ancestors(rev_id) for rev_id in current_heads]
+
+    output = []
+    current_candidate_idx = 0
+    while current_heads:
+        candidate = current_heads[current_candidate_idx]
+        for check_head_index, ancestors in enumerate(ancestors_by_idx):
+            if (
+                check_head_index != current_candidate_idx
+                and candidate in ancestors
+            ):
+                current_candidate_idx = check_head_index
+                break
+        else:
+            if candidate in todo:
+                output.append(candidate)
+                todo.remove(candidate)
+            candidate_rev = id_to_rev[candidate]
+            heads_to_add = [
+                r
+                for r in candidate_rev._normalized_down_revisions
+                if r in todo and r not in current_heads
+            ]
+            if not heads_to_add:
+                del current_heads[current_candidate_idx]
+                del ancestors_by_idx[current_candidate_idx]
+                current_candidate_idx = max(current_candidate_idx - 1, 0)
+            elif (
+                not candidate_rev._normalized_resolved_dependencies
+                and len(candidate_rev._versioned_down_revisions) == 1
+            ):
+                current_heads[current_candidate_idx] = heads_to_add[0]
+                ancestors_by_idx[current_candidate_idx].discard(candidate)
+            else:
+                current_heads[current_candidate_idx] = heads_to_add[0]
+                current_heads.extend(heads_to_add[1:])
+                ancestors_by_idx[current_candidate_idx] = get_ancestors(
+                    heads_to_add[0]
+                )
+                ancestors_by_idx.extend(
+                    get_ancestors(head) for head in heads_to_add[1:]
+                )
+    return output
+
+
+class TopologicalSortTest(TestBase):
+    def _assert_same_as_legacy(self, map_, revisions, heads):
+        eq_(
+            map_._topological_sort(revisions, heads),
+            _legacy_topological_sort(map_, revisions, heads),
+        )
+
+    def _all(self, map_):
+        return (
+            [rev for rev in map_._revision_map.values() if rev is not None],
+            [map_.get_revision(head) for head in map_.heads],
+        )
+
+    def test_large_map(self):
+        self._assert_same_as_legacy(
+            _large_map.map_, *self._all(_large_map.map_)
+        )
+
+    @testing.combinations((1, 300), (2, 500), (3, 800), argnames="seed,count")
+    def test_random_map(self, seed, count):
+        map_ = RevisionMap(lambda: _large_map.random_data(count, seed))
+        self._assert_same_as_legacy(map_, *self._all(map_))
+
+    @testing.combinations((4,), (5,), (6,), argnames="seed")
+    def test_random_map_partial(self, seed):
+        map_ = RevisionMap(lambda: _large_map.random_data(500, seed))
+        revs = [rev for rev in map_._revision_map.values() if rev is not None]
+        for upper, lower in [
+            (revs[450].revision, revs[100].revision),
+            (revs[300].revision, "base"),
+            ("heads", revs[200].revision),
+        ]:
+            revisions, heads = map_._collect_upgrade_revisions(
+                upper,
+                lower,
+                inclusive=False,
+                implicit_base=True,
+                assert_relative_length=True,
+            )
+            self._assert_same_as_legacy(map_, revisions, heads)
+
+    def test_scaled_map(self):
+        """sort a revision map formed of many copies of the large map;
+        larger maps are timed by tools/revision_benchmarks.py."""
+
+        map_ = RevisionMap(lambda: _large_map.scaled_data(5000))
+        revs = list(map_.iterate_revisions("heads", "base"))
+        eq_(len(revs), 5112)
+
+        position = {rev.revision: idx for idx, rev in enumerate(revs)}
+        for rev in revs:
+            for down_revision in rev._normalized_down_revisions:
+                assert position[down_revision] > position[rev.revision]
+
+
+class IncrementalUpdateTest(TestBase):
+    def _map(self, count, seed=7):
+        data = _large_map.random_data(count, seed)
+        map_ = RevisionMap(lambda: data)
+        map_.heads
+        return map_
+
+    def _assert_same_map(self, map_, expected):
+        eq_(set(map_.heads), set(expected.heads))
+        eq_(set(map_.bases), set(expected.bases))
+        eq_(set(map_._real_heads), set(expected._real_heads))
+        eq_(set(map_._real_bases), set(expected._real_bases))
+        eq_(set(map_._revision_map), set(expected._revision_map))
+        for rev in expected._revision_map.values():
+            if rev is None:
+                continue
+            other = map_.get_revision(rev.revision)
+            eq_(other.nextrev, rev.nextrev)
+            eq_(other._all_nextrev, rev._all_nextrev)
+            eq_(
+                set(other._normalized_down_revisions),
+                set(rev._normalized_down_revisions),
+            )
+        eq_(
+            [rev.revision for rev in map_.iterate_revisions("heads", "base")],
+            [
+                rev.revision
+                for rev in expected.iterate_revisions("heads", "base")
+            ],
+        )
+
+    def test_add(self):
+        map_ = self._map(250)
+        added = _large_map.random_data(300, 7)[250:]
+
+        is_true(map_._update([], added))
+        self._assert_same_map(map_, self._map(300))
+
+    def test_remove(self):
+        map_ = self._map(300)
+        removed = [rev.revision for rev in _large_map.random_data(300, 7)]
+
+        is_true(map_._update(removed[250:], []))
+        self._assert_same_map(map_, self._map(250))
+
+    def test_remove_with_descendants_resets(self):
+        map_ = self._map(300)
+
+        is_false(map_._update(["r00100"], []))
+        assert "_revision_map" not in map_.__dict__
+
+    def test_add_missing_down_revision_resets(self):
+        map_ = self._map(10)
+
+        is_false(map_._update([], [Revision("x", "nonexistent")]))
+        assert "_revision_map" not in map_.__dict__
+
+    def test_branch_labels_reset(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("a", ()),
+                Revision("b", "a", branch_labels="bbranch"),
+            ]
+        )
+        map_.heads
+
+        is_false(map_._update([], [Revision("c", "b")]))
+        is_false(map_._update([], []))
+
+    def test_partial_id_after_update(self):
+        map_ = RevisionMap(
+            lambda: [Revision("aaaa1", ()), Revision("bbbb1", "aaaa1")]
+        )
+        map_.heads
+
+        is_true(map_._update(["bbbb1"], [Revision("cccc1", "aaaa1")]))
+        eq_(map_.heads, ("cccc1",))
+        eq_(map_.get_revision("cccc").revision, "cccc1")
+        assert_raises_message(
+            RevisionError,
+            "No such revision or branch 'bbbb'",
+            map_.get_revision,
+            "bbbb",
+        )
+
+
+class ResolutionCacheTest(TestBase):
+    def _map(self):
+        return RevisionMap(
+            lambda: [
+                Revision("aaaa1", ()),
+                Revision("bbbb1", "aaaa1", branch_labels="bbranch"),
+                Revision("cccc1", "bbbb1"),
+            ]
+        )
+
+    def test_repeated_resolution_is_cached(self):
+        map_ = self._map()
+        eq_(map_.get_revisions("heads"), (map_.get_revision("cccc1"),))
+
+        with (
+            mock.patch.object(map_, "_resolve_revision_number") as resolve,
+            mock.patch.object(map_, "_walk_uncached") as walk,
+        ):
+            eq_(map_.get_revisions("heads"), (map_.get_revision("cccc1"),))
+            eq_(map_.get_revision("cccc1").revision, "cccc1")
+            eq_(resolve.mock_calls, [])
+            eq_(walk.mock_calls, [])
+
+    def test_walk_is_cached(self):
+        map_ = self._map()
+        eq_(map_._walk("aaaa1", 2).revision, "cccc1")
+        eq_(map_._walk(map_.get_revision("aaaa1"), 2).revision, "cccc1")
+        eq_(map_.get_revisions("bbranch@-1")[0].revision, "bbbb1")
+
+        with mock.patch.object(map_, "_walk_uncached") as walk:
+            eq_(map_._walk("aaaa1", 2).revision, "cccc1")
+            eq_(map_.get_revisions("bbranch@-1")[0].revision, "bbbb1")
+            eq_(walk.mock_calls, [])
+
+    def test_errors_not_cached(self):
+        map_ = self._map()
+        for _ in range(2):
+            assert_raises_message(
+                RevisionError,
+                "No such revision or branch 'dddd'",
+                map_.get_revisions,
+                "dddd",
+            )
+
+    def test_invalidated_by_add_revision(self):
+        map_ = self._map()
+        eq_(map_.get_revisions("heads")[0].revision, "cccc1")
+        eq_(map_._walk("aaaa1", 2).revision, "cccc1")
+
+        map_.add_revision(Revision("dddd1", "cccc1"))
+        eq_(map_.get_revisions("heads")[0].revision, "dddd1")
+        eq_(map_.get_revision("dddd").revision, "dddd1")
+        eq_(map_._walk("aaaa1", 3).revision, "dddd1")
+
+    def test_invalidated_by_update(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("aaaa1", ()),
+                Revision("bbbb1", "aaaa1"),
+                Revision("cccc1", "bbbb1"),
+            ]
+        )
+        eq_(map_.get_revision("head").revision, "cccc1")
+
+        is_true(map_._update(["cccc1"], []))
+        eq_(map_.get_revision("head").revision, "bbbb1")
+
+    def test_bounded(self):
+        map_ = RevisionMap(
+            lambda: [Revision("r%04d" % idx, ()) for idx in range(500)]
+        )
+        for idx in range(500):
+            map_.get_revision("r%04d" % idx)
+        assert len(map_._resolution_cache) <= 150
+
+
+class PartialIdentifierTest(TestBase):
+    def setUp(self):
+        self.map = RevisionMap(
+            lambda: [
+                Revision("a1b2c3", ()),
+                Revision("a1b2c4", "a1b2c3"),
+                Revision("a1b3", "a1b2c4"),
+                Revision("b0", "a1b3"),
+                Revision("ccccdd", "b0", branch_labels="abcdef"),
+                Revision("ffff01", "ccccdd"),
+            ]
+        )
+
+    def test_partial_ids_sorted(self):
+        eq_(
+            self.map._partial_ids,
+            ["a1b2c3", "a1b2c4", "a1b3", "abcdef", "ccccdd", "ffff01"],
+        )
+
+    def test_ids_with_prefix(self):
+        eq_(self.map._ids_with_prefix("a1b2"), ["a1b2c3", "a1b2c4"])
+        eq_(self.map._ids_with_prefix("a1b2c4"), ["a1b2c4"])
+        eq_(self.map._ids_with_prefix("a1b"), ["a1b2c3", "a1b2c4", "a1b3"])
+
+    def test_ids_with_prefix_at_ends(self):
+        eq_(self.map._ids_with_prefix("a1b2c3"), ["a1b2c3"])
+        eq_(self.map._ids_with_prefix("ffff"), ["ffff01"])
+
+    def test_ids_with_prefix_none(self):
+        eq_(self.map._ids_with_prefix("0"), [])
+        eq_(self.map._ids_with_prefix("a1b4"), [])
+        eq_(self.map._ids_with_prefix("fffff"), [])
+
+    def test_short_ids_not_indexed(self):
+        is_(self.map.get_revision("b0"), self.map._revision_map["b0"])
+        eq_(self.map._ids_with_prefix("b"), [])
+
+    def test_partial_id_resolve(self):
+        is_(self.map.get_revision("a1b3"), self.map._revision_map["a1b3"])
+        is_(self.map.get_revision("cccc"), self.map._revision_map["ccccdd"])
+
+    def test_partial_id_ambiguous(self):
+        assert_raises_message(
+            RevisionError,
+            "Multiple revisions start with 'a1b2': 'a1b2c3', 'a1b2c4'...",
+            self.map.get_revision,
+            "a1b2",
+        )
+
+    def test_partial_id_not_found(self):
+        assert_raises_message(
+            RevisionError,
+            "No such revision or branch 'a1b4'",
+            self.map.get_revision,
+            "a1b4",
+        )
+
+    def test_index_reset_by_add_revision(self):
+        self.map._partial_ids
+        self.map.add_revision(Revision("a1b2c5", "ffff01"))
+        eq_(
+            self.map._ids_with_prefix("a1b2"),
+            ["a1b2c3", "a1b2c4", "a1b2c5"],
+        )
+
+
 class DepResolutionFailedTest(DownIterateTest):
     def setUp(self):
         self.map = RevisionMap(
@@ -1590,6 +2040,79 @@ class GraphWithCycleTest(InvalidRevisionMapTest):
             map_, ["a", "b", "c", "d", "e"]
         )
 
+    def test_revision_map_cycle_exact_revisions(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("a", ()),
+                Revision("b", ("a", "d")),
+                Revision("c", "b"),
+                Revision("d", "c"),
+                Revision("e", "d"),
+                Revision("f", "e"),
+            ]
+        )
+        assert_raises_message(
+            CycleDetected,
+            r"^Cycle is detected in revisions \(b, c, d\)$",
+            lambda: map_._revision_map,
+        )
+
+    def test_revision_map_multiple_cycles(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("a", "c"),
+                Revision("b", "a"),
+                Revision("c", "b"),
+                Revision("d", ()),
+                Revision("e", ("d", "f")),
+                Revision("f", "e"),
+                Revision("g", "f"),
+            ]
+        )
+        assert_raises_message(
+            CycleDetected,
+            r"^Cycle is detected in revisions \(a, b, c, e, f\)$",
+            lambda: map_._revision_map,
+        )
+
+    def test_revision_map_dep_cycle_exact_revisions(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("a", ()),
+                Revision("b", "a", dependencies="d"),
+                Revision("c", "b"),
+                Revision("d", "c"),
+                Revision("e", "d"),
+            ]
+        )
+        assert_raises_message(
+            DependencyCycleDetected,
+            r"^Dependency cycle is detected in revisions \(b, c, d\)$",
+            lambda: map_._revision_map,
+        )
+
+    def test_revision_map_dep_loop_via_branch_label(self):
+        map_ = RevisionMap(
+            lambda: [
+                Revision("a", ()),
+                Revision(
+                    "b", "a", branch_labels="bbranch", dependencies="bbranch"
+                ),
+            ]
+        )
+        assert_raises_message(
+            DependencyCycleDetected,
+            r"^Dependency cycle is detected in revisions \(b\)$",
+            lambda: map_._revision_map,
+        )
+
+    def test_long_chain_no_cycle(self):
+        map_ = RevisionMap(
+            lambda: [Revision("r0", ())]
+            + [Revision("r%d" % i, "r%d" % (i - 1)) for i in range(1, 5000)]
+        )
+        eq_(map_.heads, ("r4999",))
+
 
 class NormalizedDownRevTest(DownIterateTest):
     def setUp(self):
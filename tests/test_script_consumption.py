@@ -1,25 +1,33 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+import json
 import os
 import re
 import shutil
+import sys
 import textwrap
+import types
 
 import sqlalchemy as sa
 from sqlalchemy import pool
 
+from alembic import __version__
 from alembic import command
 from alembic import testing
 from alembic import util
 from alembic.config import Config
 from alembic.environment import EnvironmentContext
+from alembic.script import base
 from alembic.script import Script
 from alembic.script import ScriptDirectory
 from alembic.testing import assert_raises_message
 from alembic.testing import assertions
 from alembic.testing import eq_
 from alembic.testing import expect_raises_message
+from alembic.testing import is_
+from alembic.testing import is_false
+from alembic.testing import is_true
 from alembic.testing import mock
 from alembic.testing.env import _get_staging_directory
 from alembic.testing.env import _multi_dir_testing_config
@@ -397,6 +405,373 @@ class CallbackEnvironmentTest(ApplyVersionsFunctionalTest):
                 assert h is None or isinstance(h, str)
 
 
+class CoalesceVersionWritesTest(ApplyVersionsFunctionalTest):
+    transactional_ddl = True
+    transaction_per_migration = False
+
+    def test_steps(self):
+        conf = EnvironmentContext.configure
+        applied = []
+
+        def on_version_apply(ctx, step, heads, run_args):
+            applied.append(heads)
+
+        def configure(*arg, **opt):
+            opt.update(
+                coalesce_version_writes=True,
+                on_version_apply=on_version_apply,
+            )
+            return conf(*arg, **opt)
+
+        with mock.patch.object(EnvironmentContext, "configure", configure):
+            super().test_steps()
+
+        eq_(
+            applied[0:6],
+            [{self.a}, {self.b}, {self.c}, {self.b}, {self.a}, set()],
+        )
+        with self.bind.connect() as conn:
+            eq_(
+                conn.exec_driver_sql(
+                    "select version_num from alembic_version"
+                ).all(),
+                [(self.c,)],
+            )
+
+
+class ParallelBranchesTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.bind = _sqlite_file_db(poolclass=pool.NullPool)
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _write_revisions(self, depends_on=False):
+        self.a1, self.a2, self.b1, self.b2 = ids = [
+            util.rev_id() for _ in range(4)
+        ]
+        script = ScriptDirectory.from_config(self.cfg)
+        for rev, down, depends in [
+            (self.a1, None, None),
+            (self.a2, self.a1, None),
+            (self.b1, None, None),
+            (self.b2, self.b1, self.a1 if depends_on else None),
+        ]:
+            script.generate_revision(
+                rev, None, head=down or "base", refresh=True
+            )
+            write_script(
+                script,
+                rev,
+                """
+    import threading
+
+    from alembic import context
+    from alembic import op
+
+    revision = %r
+    down_revision = %r
+    depends_on = %r
+
+
+    def upgrade():
+        op.execute("CREATE TABLE t_%s (id integer)")
+        attributes = op.get_context().config.attributes
+        attributes.setdefault("threads", set()).add(threading.get_ident())
+        attributes.setdefault("binds", []).append(
+            (
+                context.get_bind() is op.get_bind(),
+                op.get_bind().get_execution_options().get("test_option"),
+            )
+        )
+
+
+    def downgrade():
+        op.execute("DROP TABLE t_%s")
+
+    """ % (rev, down, depends, rev, rev),
+            )
+        return ids
+
+    @contextmanager
+    def _parallel(self, workers=2, execution_options=None):
+        conf = EnvironmentContext.configure
+        applied = []
+
+        def on_version_apply(ctx, step, heads, run_args):
+            applied.append((step.up_revision_id, heads))
+
+        def configure(*arg, **opt):
+            opt.update(
+                parallel_branch_workers=workers,
+                on_version_apply=on_version_apply,
+            )
+            if execution_options:
+                opt["connection"] = opt["connection"].execution_options(
+                    **execution_options
+                )
+            return conf(*arg, **opt)
+
+        with mock.patch.object(EnvironmentContext, "configure", configure):
+            yield applied
+
+    def _current_heads(self):
+        with self.bind.connect() as conn:
+            return {
+                row[0]
+                for row in conn.exec_driver_sql(
+                    "select version_num from alembic_version"
+                )
+            }
+
+    def _tables(self):
+        return set(sa.inspect(self.bind).get_table_names())
+
+    def test_independent_branches(self):
+        self._write_revisions()
+
+        with self._parallel() as applied:
+            command.upgrade(self.cfg, "heads")
+
+        eq_(self._current_heads(), {self.a2, self.b2})
+        eq_(
+            self._tables(),
+            {"alembic_version"}
+            | {"t_%s" % rev for rev in (self.a1, self.a2, self.b1, self.b2)},
+        )
+        eq_(len(self.cfg.attributes["threads"]), 2)
+
+        # each branch is run in order, and the heads passed to the
+        # callbacks reflect the steps of both branches
+        applied_revs = [rev for rev, heads in applied]
+        is_true(applied_revs.index(self.a1) < applied_revs.index(self.a2))
+        is_true(applied_revs.index(self.b1) < applied_revs.index(self.b2))
+        eq_(applied[-1][1], {self.a2, self.b2})
+
+    def test_context_per_thread(self):
+        self._write_revisions()
+
+        with self._parallel(execution_options={"test_option": "x"}):
+            command.upgrade(self.cfg, "heads")
+
+        eq_(len(self.cfg.attributes["threads"]), 2)
+        eq_(self.cfg.attributes["binds"], [(True, "x")] * 4)
+
+    def test_branch_already_applied(self):
+        self._write_revisions()
+        command.upgrade(self.cfg, self.a1)
+
+        with self._parallel() as applied:
+            command.upgrade(self.cfg, "heads")
+
+        eq_(self._current_heads(), {self.a2, self.b2})
+        eq_(len(applied), 3)
+
+    def test_depends_on_runs_serially(self):
+        self._write_revisions(depends_on=True)
+
+        with self._parallel():
+            command.upgrade(self.cfg, "heads")
+
+        eq_(self._current_heads(), {self.a2, self.b2})
+        eq_(len(self.cfg.attributes["threads"]), 1)
+
+    def test_single_worker_runs_serially(self):
+        self._write_revisions()
+
+        with self._parallel(workers=1):
+            command.upgrade(self.cfg, "heads")
+
+        eq_(self._current_heads(), {self.a2, self.b2})
+        eq_(len(self.cfg.attributes["threads"]), 1)
+
+    def test_failure(self):
+        self._write_revisions()
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(
+            script,
+            self.b2,
+            """
+    from alembic import op
+
+    revision = %r
+    down_revision = %r
+
+
+    def upgrade():
+        op.execute("CREATE TABLE t_%s (id integer)")
+
+
+    def downgrade():
+        pass
+
+    """ % (self.b2, self.b1, self.b1),
+        )
+
+        with self._parallel():
+            with expect_raises_message(sa.exc.OperationalError, "exists"):
+                command.upgrade(self.cfg, "heads")
+
+        # migrations completed before the failure remain committed
+        heads = self._current_heads()
+        is_true(self.b1 in heads)
+        is_false(self.b2 in heads)
+
+    def test_downgrade_runs_serially(self):
+        self._write_revisions()
+        command.upgrade(self.cfg, "heads")
+        self.cfg.attributes.pop("threads")
+
+        with self._parallel():
+            command.downgrade(self.cfg, "base")
+
+        eq_(self._current_heads(), set())
+        eq_(self._tables(), {"alembic_version"})
+
+
+class VersionHistoryTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.bind = _sqlite_file_db(poolclass=pool.NullPool)
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a, self.b = util.rev_id(), util.rev_id()
+        script = ScriptDirectory.from_config(self.cfg)
+        for rev, down, table in [
+            (self.a, None, "foo"),
+            (self.b, self.a, "bar"),
+        ]:
+            script.generate_revision(
+                rev, None, head=down or "base", refresh=True
+            )
+            write_script(
+                script,
+                rev,
+                """
+    from alembic import op
+
+    revision = %r
+    down_revision = %r
+
+
+    def upgrade():
+        op.execute("CREATE TABLE %s (id integer)")
+
+
+    def downgrade():
+        op.execute("DROP TABLE %s")
+
+    """ % (rev, down, table, table),
+            )
+
+    def tearDown(self):
+        clear_staging_env()
+
+    @contextmanager
+    def _history(self, **kw):
+        conf = EnvironmentContext.configure
+
+        def configure(*arg, **opt):
+            opt.update(version_history_table="alembic_history", **kw)
+            return conf(*arg, **opt)
+
+        with mock.patch.object(EnvironmentContext, "configure", configure):
+            yield
+
+    def _rows(self):
+        with self.bind.connect() as conn:
+            return conn.exec_driver_sql(
+                "select revision, direction, outcome, started_at, "
+                "finished_at, duration, hostname, alembic_version "
+                "from alembic_history order by id"
+            ).all()
+
+    def test_upgrade_downgrade(self):
+        with self._history():
+            command.upgrade(self.cfg, "heads")
+            command.downgrade(self.cfg, self.a)
+
+        rows = self._rows()
+        eq_(
+            [row[0:3] for row in rows],
+            [
+                (self.a, "upgrade", "success"),
+                (self.b, "upgrade", "success"),
+                (self.b, "downgrade", "success"),
+            ],
+        )
+        for row in rows:
+            is_true(row.started_at <= row.finished_at)
+            is_true(row.duration >= 0)
+            is_true(row.hostname)
+            eq_(row.alembic_version, __version__)
+
+    def test_stamp(self):
+        with self._history():
+            command.stamp(self.cfg, self.a)
+
+        eq_([row[0:3] for row in self._rows()], [(self.a, "stamp", "success")])
+
+    def test_existing_database(self):
+        command.upgrade(self.cfg, self.a)
+
+        with self._history():
+            command.upgrade(self.cfg, "heads")
+
+        eq_(
+            [row[0:3] for row in self._rows()],
+            [(self.b, "upgrade", "success")],
+        )
+
+    def _fail_b(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(
+            script,
+            self.b,
+            """
+    from alembic import op
+
+    revision = %r
+    down_revision = %r
+
+
+    def upgrade():
+        op.execute("CREATE TABLE foo (id integer)")
+
+    """ % (self.b, self.a),
+        )
+
+    def test_failure_recorded(self):
+        self._fail_b()
+
+        with self._history(transaction_per_migration=True):
+            with expect_raises_message(sa.exc.OperationalError, "foo"):
+                command.upgrade(self.cfg, "heads")
+
+        eq_(
+            [row[0:3] for row in self._rows()],
+            [(self.a, "upgrade", "success"), (self.b, "upgrade", "failed")],
+        )
+
+    def test_failure_rolled_back(self):
+        self._fail_b()
+
+        with self._history(
+            transactional_ddl=True, transaction_per_migration=False
+        ):
+            with expect_raises_message(sa.exc.OperationalError, "foo"):
+                command.upgrade(self.cfg, "heads")
+
+        # the row for the first migration was rolled back along with it,
+        # and no row is written for the failure
+        eq_(self._rows(), [])
+
+
 class OfflineTransactionalDDLTest(TestBase):
     def setUp(self):
         self.env = staging_env()
@@ -1367,3 +1742,528 @@ class ScriptDirectoryMethodsTest(TestBase):
             depends_on_fixture.get_heads(consider_depends_on=False),
             depends_on_fixture.get_heads(),
         )
+
+
+class RevisionIndexTest(TestBase):
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.index_file = os.path.join(
+            _get_staging_directory(), "revision_index.json"
+        )
+        self.cfg.set_main_option("revision_index_file", self.index_file)
+        self.a, self.b, self.c = three_rev_fixture(self.cfg)
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _load_heads(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        return script, script.get_heads()
+
+    def test_index_written(self):
+        script, heads = self._load_heads()
+        eq_(heads, [self.c])
+        assert os.path.exists(self.index_file)
+
+        with open(self.index_file) as file_:
+            data = json.load(file_)
+        eq_(
+            sorted(
+                entry["header"]["revision"]
+                for entry in data["entries"].values()
+            ),
+            sorted([self.a, self.b, self.c]),
+        )
+
+    def test_modules_not_loaded_from_index(self):
+        self._load_heads()
+
+        with mock.patch(
+            "alembic.util.load_python_file",
+            side_effect=Exception("module was loaded"),
+        ):
+            script, heads = self._load_heads()
+            eq_(heads, [self.c])
+            rev = script.get_revision(self.b)
+            eq_(rev.down_revision, self.a)
+            eq_(rev.doc, "Rev B, méil, %3")
+            assert "module" not in rev.__dict__
+
+    def test_module_loaded_lazily(self):
+        self._load_heads()
+        script, heads = self._load_heads()
+        rev = script.get_revision(self.c)
+        assert "module" not in rev.__dict__
+        eq_(rev.module.revision, self.c)
+        assert callable(rev.module.upgrade)
+
+    def test_upgrade_from_index(self):
+        self._load_heads()
+        command.upgrade(self.cfg, self.c, sql=True)
+
+    def test_changed_file_reloaded(self):
+        script, heads = self._load_heads()
+        d = util.rev_id()
+        script.generate_revision(d, "revision d", refresh=True)
+        write_script(
+            script,
+            self.c,
+            f"""\
+"Rev C, changed"
+revision = '{self.c}'
+down_revision = '{self.b}'
+branch_labels = ('cbranch',)
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+
+""",
+        )
+
+        script, heads = self._load_heads()
+        eq_(heads, [d])
+        rev = script.get_revision(self.c)
+        eq_(rev.doc, "Rev C, changed")
+        eq_(rev.branch_labels, {"cbranch"})
+
+    def test_removed_file_pruned(self):
+        script, heads = self._load_heads()
+        os.unlink(script.get_revision(self.c).path)
+
+        script, heads = self._load_heads()
+        eq_(heads, [self.b])
+
+        with open(self.index_file) as file_:
+            data = json.load(file_)
+        eq_(len(data["entries"]), 2)
+
+    def test_corrupt_index_rebuilt(self):
+        with open(self.index_file, "w") as file_:
+            file_.write("not json")
+
+        with assertions.expect_warnings("Could not read revision index"):
+            script, heads = self._load_heads()
+        eq_(heads, [self.c])
+
+        with open(self.index_file) as file_:
+            data = json.load(file_)
+        eq_(len(data["entries"]), 3)
+
+
+class ParseRevisionHeadersTest(TestBase):
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a, self.b, self.c = three_rev_fixture(self.cfg)
+        self.cfg.set_main_option("parse_revision_headers", "true")
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def test_headers_parsed(self):
+        with mock.patch(
+            "alembic.util.load_python_file",
+            side_effect=Exception("module was loaded"),
+        ):
+            script = ScriptDirectory.from_config(self.cfg)
+            eq_(script.get_heads(), [self.c])
+            rev = script.get_revision(self.b)
+            eq_(rev.down_revision, self.a)
+            eq_(rev.doc, "Rev B, méil, %3")
+            assert "module" not in rev.__dict__
+
+    def test_module_loaded_lazily(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        rev = script.get_revision(self.c)
+        assert "module" not in rev.__dict__
+        eq_(rev.module.revision, self.c)
+        command.upgrade(self.cfg, self.c, sql=True)
+
+    def test_annotated_and_sequence_headers(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(
+            script,
+            self.c,
+            f"""\
+from typing import Sequence, Union
+
+revision: str = '{self.c}'
+down_revision: Union[str, Sequence[str], None] = '{self.b}'
+branch_labels: Union[str, Sequence[str], None] = ('cbranch',)
+depends_on: Union[str, Sequence[str], None] = ['{self.a}']
+
+import nonexistent_module_xyz
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+""",
+        )
+
+        script = ScriptDirectory.from_config(self.cfg)
+        rev = script.get_revision(self.c)
+        eq_(rev.branch_labels, {"cbranch"})
+        eq_(rev.dependencies, self.a)
+        eq_(rev.doc, "")
+        assert_raises_message(
+            ImportError, "nonexistent_module_xyz", getattr, rev, "module"
+        )
+
+    def test_non_literal_header_loads_module(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        write_script(
+            script,
+            self.c,
+            f"""\
+"Rev C"
+revision = '{self.c}'
+down_revision = '{self.b}'
+branch_labels = tuple(['cbranch'])
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+""",
+        )
+
+        with mock.patch(
+            "alembic.util.load_python_file",
+            wraps=util.load_python_file,
+        ) as load:
+            script = ScriptDirectory.from_config(self.cfg)
+            rev = script.get_revision(self.c)
+        eq_(rev.branch_labels, {"cbranch"})
+        eq_(
+            [call[0][1] for call in load.call_args_list],
+            [os.path.basename(rev.path)],
+        )
+
+    def test_imported_header_loads_module(self):
+        shared_headers = types.ModuleType("shared_headers")
+        shared_headers.depends_on = self.a
+        with mock.patch.dict(sys.modules, {"shared_headers": shared_headers}):
+            script = ScriptDirectory.from_config(self.cfg)
+            write_script(
+                script,
+                self.c,
+                f"""\
+"Rev C"
+revision = '{self.c}'
+down_revision = '{self.b}'
+
+from shared_headers import depends_on
+
+def upgrade():
+    pass
+
+def downgrade():
+    pass
+""",
+            )
+
+            script = ScriptDirectory.from_config(self.cfg)
+            rev = script.get_revision(self.c)
+            assert "module" in rev.__dict__
+        eq_(rev.dependencies, self.a)
+
+
+class RevisionLoadWorkersTest(TestBase):
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.cfg.set_main_option("recursive_version_locations", "true")
+        revs = list(three_rev_fixture(self.cfg))
+        revs.extend(multi_heads_fixture(self.cfg, *revs[0:3]))
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _load(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        return [
+            (rev.revision, rev.path)
+            for rev in script.revision_map._revision_map.values()
+            if rev is not None
+        ]
+
+    def test_same_order_as_serial(self):
+        serial = self._load()
+        self.cfg.set_main_option("revision_load_workers", "4")
+        with mock.patch(
+            "alembic.script.base.ThreadPoolExecutor",
+            wraps=base.ThreadPoolExecutor,
+        ) as executor:
+            eq_(self._load(), serial)
+        eq_(executor.mock_calls[0], mock.call(max_workers=4))
+
+    def test_load_error_propagates(self):
+        self.cfg.set_main_option("revision_load_workers", "4")
+        with mock.patch(
+            "alembic.util.load_python_file",
+            side_effect=ImportError("some import error"),
+        ):
+            assert_raises_message(ImportError, "some import error", self._load)
+
+
+class RefreshTest(TestBase):
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.a, self.b, self.c = three_rev_fixture(self.cfg)
+        self.script = ScriptDirectory.from_config(self.cfg)
+        eq_(self.script.get_heads(), [self.c])
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _write(self, rev_id, down_revision, doc="a revision", path=None, **kw):
+        if path is None:
+            path = os.path.join(
+                _get_staging_directory(),
+                "scripts",
+                "versions",
+                f"{rev_id}_.py",
+            )
+        extra = "".join(f"{key} = {value!r}\n" for key, value in kw.items())
+        with open(path, "w") as file_:
+            file_.write(f"""\
+"{doc}"
+revision = {rev_id!r}
+down_revision = {down_revision!r}
+{extra}
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
+""")
+        # ensure the modification time differs even on filesystems with
+        # coarse timestamps
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        return path
+
+    @contextmanager
+    def _expect_incremental(self):
+        with mock.patch.object(
+            self.script.revision_map,
+            "_reset",
+            side_effect=AssertionError("revision map was rebuilt"),
+        ):
+            yield
+
+    def test_no_changes(self):
+        with self._expect_incremental():
+            is_false(self.script.refresh())
+
+    def test_not_loaded(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        self._write("d1", self.c)
+        is_false(script.refresh())
+        eq_(script.get_heads(), ["d1"])
+
+    def test_file_added(self):
+        self._write("d1", self.c)
+        self._write("d2", "d1")
+        with self._expect_incremental():
+            is_true(self.script.refresh())
+        eq_(self.script.get_heads(), ["d2"])
+        eq_(self.script.get_revision(self.c).nextrev, frozenset(["d1"]))
+        eq_(
+            [rev.revision for rev in self.script.walk_revisions()],
+            ["d2", "d1", self.c, self.b, self.a],
+        )
+
+    def test_file_removed(self):
+        os.unlink(self.script.get_revision(self.c).path)
+        with self._expect_incremental():
+            is_true(self.script.refresh())
+        eq_(self.script.get_heads(), [self.b])
+        eq_(self.script.get_revision(self.b).nextrev, frozenset())
+        assert_raises_message(
+            util.CommandError,
+            f"Can't locate revision identified by '{self.c}'",
+            self.script.get_revision,
+            self.c,
+        )
+
+    def test_docstring_changed(self):
+        rev = self.script.get_revision(self.c)
+        self._write(self.c, self.b, doc="new docstring", path=rev.path)
+
+        with self._expect_incremental():
+            is_true(self.script.refresh())
+        is_(self.script.get_revision(self.c), rev)
+        eq_(rev.doc, "new docstring")
+        eq_(rev.module.__doc__, "new docstring")
+
+    def test_down_revision_changed(self):
+        path = self.script.get_revision(self.c).path
+        self._write(self.c, self.a, path=path)
+        with self._expect_incremental():
+            is_true(self.script.refresh())
+        eq_(set(self.script.get_heads()), {self.b, self.c})
+        eq_(
+            self.script.get_revision(self.a).nextrev,
+            frozenset([self.b, self.c]),
+        )
+
+    def test_generated_revision_not_reloaded(self):
+        d = util.rev_id()
+        self.script.generate_revision(d, "revision d")
+        with self._expect_incremental():
+            is_false(self.script.refresh())
+        eq_(self.script.get_heads(), [d])
+
+    def test_branch_label_rebuilds(self):
+        self._write("d1", self.c, branch_labels=("dbranch",))
+        is_true(self.script.refresh())
+        eq_(self.script.get_heads(), ["d1"])
+        eq_(self.script.get_revision("dbranch@head").revision, "d1")
+
+    def test_non_leaf_header_changed_rebuilds(self):
+        revision_map = self.script.revision_map
+        path = self.script.get_revision(self.b).path
+        self._write(self.b, self.a, path=path, branch_labels=("bbranch",))
+        self._write("d1", self.b)
+
+        with mock.patch.object(
+            revision_map, "_reset", wraps=revision_map._reset
+        ) as reset:
+            is_true(self.script.refresh())
+        eq_(reset.mock_calls, [mock.call()])
+        eq_(set(self.script.get_heads()), {self.c, "d1"})
+        eq_(self.script.get_revision(self.c).branch_labels, {"bbranch"})
+        eq_(self.script.get_revision("d1").branch_labels, {"bbranch"})
+
+
+class PlanCacheTest(TestBase):
+    def setUp(self):
+        self.env = staging_env()
+        self.cfg = _sqlite_testing_config()
+        self.plan_file = os.path.join(
+            _get_staging_directory(), "revision_plans.json"
+        )
+        self.a, self.b, self.c = three_rev_fixture(self.cfg)
+
+    def tearDown(self):
+        clear_staging_env()
+
+    def _revisions(self, steps):
+        return [step.revision.revision for step in steps]
+
+    @contextmanager
+    def _expect_cached(self, script):
+        with mock.patch.object(
+            script.revision_map,
+            "iterate_revisions",
+            side_effect=Exception("plan was computed"),
+        ):
+            yield
+
+    def test_upgrade_plan_cached(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        steps = script._upgrade_revs("head", (self.a,))
+        eq_(self._revisions(steps), [self.b, self.c])
+
+        with self._expect_cached(script):
+            steps = script._upgrade_revs("head", (self.a,))
+        eq_(self._revisions(steps), [self.b, self.c])
+        is_true(all(step.is_upgrade for step in steps))
+
+    def test_downgrade_plan_cached(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        steps = script._downgrade_revs(self.a, (self.c,))
+        eq_(self._revisions(steps), [self.c, self.b])
+
+        with self._expect_cached(script):
+            steps = script._downgrade_revs(self.a, (self.c,))
+        eq_(self._revisions(steps), [self.c, self.b])
+        is_true(all(step.is_downgrade for step in steps))
+
+    def test_plans_keyed_on_current_heads(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            self._revisions(script._upgrade_revs("head", ())),
+            [
+                self.a,
+                self.b,
+                self.c,
+            ],
+        )
+        eq_(
+            self._revisions(script._upgrade_revs("head", (self.b,))),
+            [self.c],
+        )
+
+    def test_plans_keyed_on_unordered_current_heads(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        d = util.rev_id()
+        script.generate_revision(
+            d, "branch d", head=self.a, splice=True, refresh=True
+        )
+        e = util.rev_id()
+        script.generate_revision(e, "merge", head=[self.c, d], refresh=True)
+
+        eq_(self._revisions(script._upgrade_revs("head", (self.c, d))), [e])
+        with self._expect_cached(script):
+            steps = script._upgrade_revs("head", (d, self.c))
+        eq_(self._revisions(steps), [e])
+
+    def test_new_revision_invalidates(self):
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            self._revisions(script._upgrade_revs("head", (self.b,))),
+            [self.c],
+        )
+
+        d = util.rev_id()
+        script.generate_revision(d, "revision d", refresh=True)
+        eq_(
+            self._revisions(script._upgrade_revs("head", (self.b,))),
+            [self.c, d],
+        )
+
+    def test_plan_persisted(self):
+        self.cfg.set_main_option("revision_plan_cache_file", self.plan_file)
+        script = ScriptDirectory.from_config(self.cfg)
+        script._upgrade_revs("head", (self.a,))
+        assert os.path.exists(self.plan_file)
+
+        script = ScriptDirectory.from_config(self.cfg)
+        with self._expect_cached(script):
+            steps = script._upgrade_revs("head", (self.a,))
+        eq_(self._revisions(steps), [self.b, self.c])
+
+        command.upgrade(self.cfg, "head", sql=True)
+
+    def test_persisted_plans_for_previous_map_discarded(self):
+        self.cfg.set_main_option("revision_plan_cache_file", self.plan_file)
+        script = ScriptDirectory.from_config(self.cfg)
+        script._upgrade_revs("head", (self.a,))
+
+        d = util.rev_id()
+        script.generate_revision(d, "revision d", refresh=True)
+        script = ScriptDirectory.from_config(self.cfg)
+        eq_(
+            self._revisions(script._upgrade_revs("head", (self.b,))),
+            [self.c, d],
+        )
+
+        with open(self.plan_file) as file_:
+            data = json.load(file_)
+        eq_(data["fingerprint"], script.revision_map._fingerprint)
+        eq_(
+            list(data["plans"].values()),
+            [[self.c, d]],
+        )
@@ -1514,7 +1514,10 @@ def downgrade():
     def tearDown(self):
         clear_staging_env()
 
-    def test_env_emits_warning(self):
+    @testing.variation("load_workers", [True, False])
+    def test_env_emits_warning(self, load_workers):
+        if load_workers:
+            self.cfg.set_main_option("revision_load_workers", "4")
         msg = (
             "File %s loaded twice! ignoring. "
             "Please ensure version_locations is unique."
@@ -1,4 +1,5 @@
 from sqlalchemy import Column
+from sqlalchemy import event
 from sqlalchemy import inspect
 from sqlalchemy import Integer
 from sqlalchemy import MetaData
@@ -10,6 +11,7 @@ from sqlalchemy.engine import default
 
 from alembic import migration
 from alembic.ddl import impl
+from alembic.operations import Operations
 from alembic.testing import assert_raises
 from alembic.testing import assert_raises_message
 from alembic.testing import config
@@ -206,6 +208,42 @@ class UpdateRevTest(TestBase):
         eq_(set(self.context.get_current_heads()), set(heads))
         eq_(self.updater.heads, set(heads))
 
+    def test_statements_reused(self):
+        executed = []
+
+        @event.listens_for(self.connection, "before_execute")
+        def before_execute(
+            conn, clauseelement, multiparams, params, execution_options
+        ):
+            executed.append((clauseelement, params))
+
+        with self.connection.begin():
+            self.updater.update_to_step(_up(None, "a", True))
+            self.updater.update_to_step(_up("a", "b"))
+            self.updater.update_to_step(_up("b", "c"))
+            self.updater.update_to_step(_up(None, "d", True))
+            self.updater.update_to_step(_down("d", None, True))
+
+        insert_stmt = self.updater._insert_stmt
+        update_stmt = self.updater._update_stmt
+        delete_stmt = self.updater._delete_stmt
+        eq_(
+            [params for _, params in executed],
+            [
+                {"version_num": "a"},
+                {"from_version": "a", "to_version": "b"},
+                {"from_version": "b", "to_version": "c"},
+                {"version_num": "d"},
+                {"from_version": "d"},
+            ],
+        )
+        for (stmt, _), expected in zip(
+            executed,
+            [insert_stmt, update_stmt, update_stmt, insert_stmt, delete_stmt],
+        ):
+            assert stmt is expected
+        self._assert_heads(("c",))
+
     def test_update_none_to_single(self):
         with self.connection.begin():
             self.updater.update_to_step(_up(None, "a", True))
@@ -382,9 +420,290 @@ class UpdateRevTest(TestBase):
                 self.updater.update_to_step(_down("a", None, True))
 
 
+class CoalescedUpdateRevTest(UpdateRevTest):
+    def setUp(self):
+        super().setUp()
+        self.updater = migration.HeadMaintainer(
+            self.context, (), coalesce=True
+        )
+
+        self.statements = []
+
+        @event.listens_for(self.connection, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            if statement.startswith(("INSERT", "UPDATE", "DELETE")):
+                self.statements.append(statement)
+
+    def _assert_heads(self, heads):
+        self.updater.flush()
+        super()._assert_heads(heads)
+
+    def _table_fixture(self, *versions):
+        for version in versions:
+            self.connection.execute(
+                version_table.insert(), dict(version_num=version)
+            )
+        self.updater = migration.HeadMaintainer(
+            self.context, versions, coalesce=True
+        )
+        self.statements[:] = []
+
+    def test_statements_reused(self):
+        """not relevant when coalescing"""
+
+    def test_writes_deferred(self):
+        with self.connection.begin():
+            self.updater.update_to_step(_up(None, "a", True))
+            self.updater.update_to_step(_up("a", "b"))
+            eq_(self.updater.heads, {"b"})
+            eq_(self.context.get_current_heads(), ())
+            eq_(self.statements, [])
+
+            self.updater.flush()
+            eq_(self.context.get_current_heads(), ("b",))
+            eq_(len(self.statements), 1)
+
+            self.updater.flush()
+            eq_(len(self.statements), 1)
+
+    def test_net_update(self):
+        with self.connection.begin():
+            self._table_fixture("a")
+            for from_, to_ in [("a", "b"), ("b", "c"), ("c", "d")]:
+                self.updater.update_to_step(_up(from_, to_))
+            self._assert_heads(("d",))
+            eq_(len(self.statements), 1)
+            assert self.statements[0].startswith("UPDATE")
+
+    def test_net_update_and_delete(self):
+        with self.connection.begin():
+            self._table_fixture("a", "d")
+            self.updater.update_to_step(_down("d", None, True))
+            self.updater.update_to_step(_up("a", "b"))
+            self._assert_heads(("b",))
+            eq_(
+                [stmt.split()[0] for stmt in self.statements],
+                ["UPDATE", "DELETE"],
+            )
+
+    def test_net_no_change(self):
+        with self.connection.begin():
+            self._table_fixture("a")
+            self.updater.update_to_step(_up("a", "b"))
+            self.updater.update_to_step(_down("b", "a"))
+            self._assert_heads(("a",))
+            eq_(self.statements, [])
+
+    def test_update_no_match(self):
+        with self.connection.begin():
+            self.updater.update_to_step(_up(None, "a", True))
+            self.updater.heads.add("x")
+            self.updater._written_heads.add("x")
+            self.updater.update_to_step(_up("x", "b"))
+            assert_raises_message(
+                CommandError,
+                "Online migration expected to match one row when updating "
+                "'x' to 'a' in 'version_table'; 0 found",
+                self.updater.flush,
+            )
+
+    def test_update_multi_match(self):
+        with self.connection.begin():
+            self._table_fixture("a", "a")
+            self.updater.update_to_step(_up("a", "b"))
+            assert_raises_message(
+                CommandError,
+                "Online migration expected to match one row when updating "
+                "'a' to 'b' in 'version_table'; 2 found",
+                self.updater.flush,
+            )
+
+    def test_delete_no_match(self):
+        with self.connection.begin():
+            self.updater.update_to_step(_up(None, "a", True))
+            self.updater.flush()
+
+            self.updater.heads.add("x")
+            self.updater._written_heads.add("x")
+            self.updater.update_to_step(_down("x", None, True))
+            assert_raises_message(
+                CommandError,
+                "Online migration expected to match one row when "
+                "deleting 'x' in 'version_table'; 0 found",
+                self.updater.flush,
+            )
+
+    def test_delete_multi_match(self):
+        with self.connection.begin():
+            self._table_fixture("a", "a")
+            self.updater.update_to_step(_down("a", None, True))
+            assert_raises_message(
+                CommandError,
+                "Online migration expected to match one row when "
+                "deleting 'a' in 'version_table'; 2 found",
+                self.updater.flush,
+            )
+
+
 registry.register("custom_version", __name__, "CustomVersionDialect")
 
 
+class TenantVersionTableTest(TestBase):
+    __only_on__ = "sqlite"
+
+    def setUp(self):
+        self.connection = config.db.connect()
+
+        # other tests may have set this to None
+        self._default_schema = mock.patch.object(
+            self.connection.dialect, "default_schema_name", "main"
+        )
+        self._default_schema.start()
+
+        with self.connection.begin():
+            for tenant in ("t1", "t2"):
+                self.connection.exec_driver_sql(
+                    "ATTACH DATABASE ':memory:' AS %s" % tenant
+                )
+
+    def tearDown(self):
+        in_t = getattr(self.connection, "in_transaction", lambda: False)
+        if in_t():
+            self.connection.rollback()
+        with self.connection.begin():
+            alembic_version_table.drop(self.connection, checkfirst=True)
+        for tenant in ("t1", "t2"):
+            self.connection.exec_driver_sql("DETACH DATABASE %s" % tenant)
+        self.connection.close()
+        self._default_schema.stop()
+
+    def make_one(self, tenant, **opts):
+        opts["version_table_tenant"] = tenant
+        return migration.MigrationContext.configure(
+            connection=self.connection, opts=opts
+        )
+
+    def test_version_table(self):
+        context = self.make_one("t1")
+        eq_(context._version.schema, "main")
+        eq_(
+            [col.name for col in context._version.primary_key],
+            ["tenant_id", "version_num"],
+        )
+
+    def test_version_table_explicit(self):
+        context = self.make_one(
+            "t1",
+            version_table_schema="t2",
+            version_table_tenant_column="tenant",
+        )
+        eq_(context._version.schema, "t2")
+        eq_(
+            [col.name for col in context._version.primary_key],
+            ["tenant", "version_num"],
+        )
+
+    def test_offline_not_supported(self):
+        assert_raises_message(
+            CommandError,
+            "The version_table_tenant option can't be used in --sql mode",
+            migration.MigrationContext.configure,
+            dialect_name="sqlite",
+            opts={"version_table_tenant": "t1", "as_sql": True},
+        )
+
+    def test_heads_per_tenant(self):
+        with self.connection.begin():
+            t1 = self.make_one("t1")
+            t2 = self.make_one("t2")
+            t1._ensure_version_table()
+
+            t1_updater = migration.HeadMaintainer(t1, ())
+            t2_updater = migration.HeadMaintainer(t2, ())
+            t1_updater.update_to_step(_up(None, "a", True))
+            t2_updater.update_to_step(_up(None, "a", True))
+            t1_updater.update_to_step(_up("a", "b"))
+            t2_updater.update_to_step(_up(None, "c", True))
+            t2_updater.update_to_step(_down("a", None, True))
+
+            eq_(t1.get_current_heads(), ("b",))
+            eq_(t2.get_current_heads(), ("c",))
+            eq_(t1.get_tenant_heads(), {"t1": ("b",), "t2": ("c",)})
+
+            t2._ensure_version_table(purge=True)
+            eq_(t1.get_tenant_heads(), {"t1": ("b",)})
+
+    def test_tenant_heads_no_table(self):
+        context = self.make_one("t1")
+        with mock.patch.object(
+            context, "_has_version_table", return_value=False
+        ) as has_table:
+            eq_(context.get_tenant_heads(), {})
+        eq_(has_table.mock_calls, [mock.call()])
+
+    def test_tenant_heads_single_select(self):
+        with self.connection.begin():
+            t1 = self.make_one("t1")
+            t1._ensure_version_table()
+            migration.HeadMaintainer(t1, ()).update_to_step(
+                _up(None, "a", True)
+            )
+
+        statements = []
+
+        @event.listens_for(self.connection, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *arg):
+            statements.append(statement)
+
+        eq_(t1.get_tenant_heads(), {"t1": ("a",)})
+        eq_(len(statements), 1)
+
+    def test_tenant_heads_without_tenant(self):
+        with self.connection.begin():
+            t1 = self.make_one("t1", version_table_tenant_column="tenant")
+            t1._ensure_version_table()
+            migration.HeadMaintainer(t1, ()).update_to_step(
+                _up(None, "a", True)
+            )
+            t2 = self.make_one("t2", version_table_tenant_column="tenant")
+            migration.HeadMaintainer(t2, ()).update_to_step(
+                _up(None, "b", True)
+            )
+            migration.HeadMaintainer(t2, ("b",)).update_to_step(
+                _up(None, "c", True)
+            )
+
+        context = migration.MigrationContext.configure(
+            connection=self.connection,
+            opts={"version_table_tenant_column": "tenant"},
+        )
+        eq_(context.get_tenant_heads(), {"t1": ("a",), "t2": ("b", "c")})
+
+    def test_schema_translate_map(self):
+        for tenant in ("t1", "t2"):
+            connection = self.connection.execution_options(
+                schema_translate_map={None: tenant}
+            )
+            context = self.make_one(tenant)
+            with connection.begin():
+                context._ensure_version_table()
+                Operations(context).create_table(
+                    "account", Column("id", Integer, primary_key=True)
+                )
+                migration.HeadMaintainer(context, ()).update_to_step(
+                    _up(None, "a", True)
+                )
+
+        connection = self.connection.execution_options(
+            schema_translate_map=None
+        )
+        insp = inspect(connection)
+        eq_(insp.get_table_names(), ["alembic_version"])
+        eq_(insp.get_table_names(schema="t1"), ["account"])
+        eq_(insp.get_table_names(schema="t2"), ["account"])
+        eq_(context.get_tenant_heads(), {"t1": ("a",), "t2": ("a",)})
+
+
 class CustomVersionDialect(default.DefaultDialect):
     name = "custom_version"
 
@@ -0,0 +1,377 @@
+"""Benchmarks for :class:`alembic.script.revision.RevisionMap`.
+
+Usage::
+
+    python tools/revision_benchmarks.py timing --sizes 1000 10000
+    python tools/revision_benchmarks.py timing --json > results.json
+    python tools/revision_benchmarks.py timing --graphs large_map \
+        --sizes 50000 --benchmarks partial_ids
+    python tools/revision_benchmarks.py memory --count 50000
+
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from collections.abc import Callable
+import gc
+import json
+from pathlib import Path
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any
+from typing import Optional
+from typing import Union
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+if True:  # avoid flake/zimports messing with the order
+    import alembic
+    from alembic.script.base import ScriptDirectory
+    from alembic.script.revision import Revision
+    from alembic.script.revision import RevisionError
+    from alembic.script.revision import RevisionMap
+    from tests import _large_map
+
+
+_Header = tuple[str, Union[str, tuple[str, ...], None], Optional[str]]
+"""revision, down_revision and depends_on of a generated revision."""
+
+
+def _ids(count: int, seed: int) -> list[str]:
+    rand = random.Random(seed)
+    ids: set[str] = set()
+    while len(ids) < count:
+        ids.add("%012x" % rand.getrandbits(48))
+    return sorted(ids, key=lambda id_: rand.random())
+
+
+def linear_graph(count: int) -> list[_Header]:
+    """A single line of revisions."""
+
+    ids = _ids(count, 1)
+    return [
+        (rev_id, ids[idx - 1] if idx else None, None)
+        for idx, rev_id in enumerate(ids)
+    ]
+
+
+def wide_graph(count: int, width: int = 100) -> list[_Header]:
+    """A single base from which ``width`` branches descend, never merged."""
+
+    ids = _ids(count, 2)
+    headers: list[_Header] = [(ids[0], None, None)]
+    tips = [ids[0]] * width
+    for idx, rev_id in enumerate(ids[1:]):
+        branch = idx % width
+        headers.append((rev_id, tips[branch], None))
+        tips[branch] = rev_id
+    return headers
+
+
+def merge_graph(count: int, width: int = 4) -> list[_Header]:
+    """A line of "diamonds", where each revision branches into ``width``
+    revisions that are then merged back into one.
+
+    """
+
+    ids = iter(_ids(count, 3))
+    tip = next(ids)
+    headers: list[_Header] = [(tip, None, None)]
+    while len(headers) < count:
+        branches = []
+        for rev_id in ids:
+            headers.append((rev_id, tip, None))
+            branches.append(rev_id)
+            if len(branches) == width or len(headers) == count:
+                break
+        if len(headers) == count:
+            break
+        tip = next(ids)
+        headers.append((tip, tuple(branches), None))
+    return headers
+
+
+def dependency_graph(count: int, width: int = 20) -> list[_Header]:
+    """``width`` independent lines of revisions, where many revisions
+    ``depends_on`` a revision of another line.
+
+    """
+
+    rand = random.Random(4)
+    ids = _ids(count, 4)
+    lines: list[list[str]] = [[] for _ in range(width)]
+    headers: list[_Header] = []
+    for idx, rev_id in enumerate(ids):
+        line = lines[idx % width]
+        depends_on = None
+        if idx >= width and rand.random() < 0.3:
+            other = rand.choice(
+                [other for other in lines if other is not line]
+            )
+            depends_on = rand.choice(other)
+        headers.append((rev_id, line[-1] if line else None, depends_on))
+        line.append(rev_id)
+    return headers
+
+
+def large_map_graph(count: int) -> list[_Header]:
+    """Successive copies of the graph in ``tests/_large_map.py``, each
+    descending from the head of the previous one.
+
+    """
+
+    return [
+        (rev.revision, rev._versioned_down_revisions, None)
+        for rev in _large_map.scaled_data(count)
+    ]
+
+
+graphs: dict[str, Callable[[int], list[_Header]]] = {
+    "linear": linear_graph,
+    "wide": wide_graph,
+    "merge": merge_graph,
+    "dependency": dependency_graph,
+    "large_map": large_map_graph,
+}
+
+
+def _revision_map(headers: list[_Header]) -> RevisionMap:
+    revisions = [
+        Revision(rev_id, down_revision, dependencies=depends_on)
+        for rev_id, down_revision, depends_on in headers
+    ]
+    return RevisionMap(lambda: revisions)
+
+
+def _built_revision_map(headers: list[_Header]) -> RevisionMap:
+    map_ = _revision_map(headers)
+    map_.heads
+    return map_
+
+
+def _script_directory(headers: list[_Header]) -> ScriptDirectory:
+    # only the revision map of the ScriptDirectory is used by _stamp_revs()
+    script = ScriptDirectory.__new__(ScriptDirectory)
+    script.__dict__["revision_map"] = _built_revision_map(headers)
+    return script
+
+
+def _partial_ids(headers: list[_Header], count: int = 1000) -> list[str]:
+    rand = random.Random(5)
+    return [rev_id[:10] for rev_id, _, _ in rand.choices(headers, k=count)]
+
+
+def _relative_start(headers: list[_Header]) -> str:
+    return headers[len(headers) // 4][0]
+
+
+# each benchmark is a pair of a "setup" function, called with the generated
+# revisions and not timed, and a function which is timed, called with the
+# result of setup
+benchmarks: dict[str, tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "build": (_revision_map, lambda map_: map_.heads),
+    "get_revisions_heads": (
+        _built_revision_map,
+        lambda map_: map_.get_revisions("heads"),
+    ),
+    "iterate_upgrade": (
+        _built_revision_map,
+        lambda map_: list(
+            map_.iterate_revisions("heads", "base", implicit_base=True)
+        ),
+    ),
+    "iterate_downgrade": (
+        _built_revision_map,
+        lambda map_: list(
+            map_.iterate_revisions("heads", "base", select_for_downgrade=True)
+        ),
+    ),
+    "stamp_revs": (
+        _script_directory,
+        lambda script: script._stamp_revs("heads", ()),
+    ),
+    "relative_upgrade": (
+        lambda headers: (
+            _built_revision_map(headers),
+            _relative_start(headers),
+        ),
+        lambda args: list(
+            args[0].iterate_revisions("+5", args[1], implicit_base=True)
+        ),
+    ),
+    "relative_downgrade": (
+        lambda headers: (
+            _built_revision_map(headers),
+            _relative_start(headers),
+        ),
+        lambda args: list(
+            args[0].iterate_revisions(args[1], "-3", select_for_downgrade=True)
+        ),
+    ),
+    "partial_ids": (
+        lambda headers: (_built_revision_map(headers), _partial_ids(headers)),
+        lambda args: [args[0].get_revision(id_) for id_ in args[1]],
+    ),
+}
+
+
+def timing(
+    sizes: list[int],
+    graph_names: list[str],
+    benchmark_names: list[str],
+    repeat: int,
+) -> list[dict[str, Any]]:
+    """Time common :class:`.RevisionMap` operations against generated
+    revision graphs of several shapes and sizes.
+
+    """
+
+    results = []
+    for graph_name in graph_names:
+        for size in sizes:
+            headers = graphs[graph_name](size)
+            for benchmark_name in benchmark_names:
+                setup, fn = benchmarks[benchmark_name]
+                result: dict[str, Any] = {
+                    "graph": graph_name,
+                    "size": size,
+                    "benchmark": benchmark_name,
+                    "repeat": repeat,
+                }
+                timings = []
+                try:
+                    for _ in range(repeat):
+                        arg = setup(headers)
+                        gc.collect()
+                        start = time.perf_counter()
+                        fn(arg)
+                        timings.append(time.perf_counter() - start)
+                        del arg
+                except RevisionError as err:
+                    # e.g. relative steps are ambiguous on merge-heavy
+                    # graphs; report the operation as not applicable
+                    result.update(min=None, median=None, error=str(err))
+                else:
+                    result.update(
+                        min=min(timings), median=statistics.median(timings)
+                    )
+                results.append(result)
+    return results
+
+
+def memory(count: int) -> None:
+    """Report the memory used per revision by a :class:`.RevisionMap`
+    built from ``count`` revisions, generated by repeating the graph in
+    ``tests/_large_map.py``.
+
+    """
+
+    # generate the identifiers as new, uninterned strings, as they would be
+    # when read from revision files
+    headers = [
+        (
+            "".join(rev.revision),
+            tuple("".join(down) for down in rev._versioned_down_revisions),
+        )
+        for rev in _large_map.scaled_data(count)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+
+    revisions = [Revision(rev_id, down) for rev_id, down in headers]
+    map_ = RevisionMap(lambda: revisions)
+    map_.heads
+
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    print(f"revisions: {len(revisions)}")
+    print(f"total bytes: {used}")
+    print(f"bytes per revision: {used / len(revisions):.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    timing_parser = subparsers.add_parser("timing", help=timing.__doc__)
+    timing_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000],
+        help="number of revisions in each generated graph",
+    )
+    timing_parser.add_argument(
+        "--graphs",
+        nargs="+",
+        choices=list(graphs),
+        default=list(graphs),
+        help="shapes of graph to generate",
+    )
+    timing_parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=list(benchmarks),
+        default=list(benchmarks),
+        help="operations to time",
+    )
+    timing_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of times each operation is timed",
+    )
+    timing_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="write the results to stdout as JSON",
+    )
+
+    memory_parser = subparsers.add_parser("memory", help=memory.__doc__)
+    memory_parser.add_argument(
+        "--count",
+        type=int,
+        default=50000,
+        help="number of revisions to generate",
+    )
+
+    args = parser.parse_args()
+    if args.benchmark == "timing":
+        results = timing(args.sizes, args.graphs, args.benchmarks, args.repeat)
+        if args.json:
+            json.dump(
+                {
+                    "alembic": alembic.__version__,
+                    "python": platform.python_version(),
+                    "results": results,
+                },
+                sys.stdout,
+                indent=2,
+            )
+            print()
+        else:
+            for result in results:
+                line = "{graph:<12} {size:>8} {benchmark:<22} ".format(
+                    **result
+                )
+                if result["min"] is None:
+                    print(line + "n/a: " + result["error"])
+                else:
+                    print(
+                        line
+                        + "min {min:.6f}s median {median:.6f}s".format(
+                            **result
+                        )
+                    )
+    elif args.benchmark == "memory":
+        memory(args.count)